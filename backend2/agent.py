@@ -0,0 +1,202 @@
+import json
+import time
+import hashlib
+from typing import Any, Type
+from pydantic import BaseModel
+from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.tools import BaseTool
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain.agents import AgentExecutor, create_openai_functions_agent
+from langchain_core.agents import AgentActionMessageLog
+from timing import metrics, record_span
+
+# LangChain agent for the free-text endpoints. main imports this module on the
+# first agent request, so cold starts that never reach the agent skip langchain.
+# Tools call back into the app module passed to build_agent_executor.
+
+# LangChain Tools
+class GetHydrogeologicalDataTool(BaseTool):
+    name: str = "get_hydrogeological_data"
+    description: str = "Essential for finding the aquifer type, groundwater level, climate data, and average annual rainfall for a given geographic location."
+    args_schema: Type[BaseModel] = None
+    api: Any = None
+
+    def _run(self, *args, **kwargs):
+        raise NotImplementedError("This tool does not support synchronous execution.")
+
+    async def _arun(self, latitude: float, longitude: float):
+        return self.api.project_for_agent(self.name, await self.api.get_hydrogeological_data(latitude, longitude))
+
+class CalculateHarvestingPotentialTool(BaseTool):
+    name: str = "calculate_harvesting_potential"
+    description: str = "Calculates the total annual runoff in liters and provides accurate annual savings based on real-world benefits like reduced borewell costs."
+    args_schema: Type[BaseModel] = None
+    api: Any = None
+
+    def _run(self, *args, **kwargs):
+        raise NotImplementedError("This tool does not support synchronous execution.")
+
+    async def _arun(self, roof_area_sqm: float, annual_rainfall_mm: int):
+        return self.api.project_for_agent(self.name, await self.api.calculate_harvesting_potential(roof_area_sqm, annual_rainfall_mm))
+
+class RecommendRechargeStructureTool(BaseTool):
+    name: str = "recommend_recharge_structure"
+    description: str = "ADVANCED structure recommendation using engineering-based evaluation system. Analyzes site conditions to score and select optimal structure with confidence scores and detailed rationale."
+    args_schema: Type[BaseModel] = None
+    api: Any = None
+
+    def _run(self, *args, **kwargs):
+        raise NotImplementedError("This tool does not support synchronous execution.")
+
+    async def _arun(self, roof_area_sqm: float, groundwater_depth_meters: float, runoff_liters: int, latitude: float = 12.9716, longitude: float = 77.5946):
+        return self.api.project_for_agent(self.name, await self.api.recommend_recharge_structure(roof_area_sqm, groundwater_depth_meters, runoff_liters, latitude, longitude))
+
+class FormatFinalReportTool(BaseTool):
+    name: str = "format_final_report"
+    description: str = "Use this as your final step to format the complete report for the user with all technical and financial details."
+    args_schema: Type[BaseModel] = None
+    api: Any = None
+    # The report is the answer; sending it back to the model would only cost another call
+    return_direct: bool = True
+
+    def _run(self, *args, **kwargs):
+        raise NotImplementedError("This tool does not support synchronous execution.")
+        
+    async def _arun(self, ai_recommendation: str, annual_savings_inr: int, payback_period_years: float):
+        return await self.api.format_final_report(ai_recommendation, annual_savings_inr, payback_period_years)
+
+def build_tools(api) -> list:
+    return [
+        GetHydrogeologicalDataTool(api=api, args_schema=api.HydrogeologyInput),
+        CalculateHarvestingPotentialTool(api=api, args_schema=api.RunoffInput),
+        RecommendRechargeStructureTool(api=api, args_schema=api.StructureInput),
+        FormatFinalReportTool(api=api, args_schema=api.FinalReport),
+    ]
+
+# Agent Prompt
+prompt = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert hydrogeologist AI assistant for the 'JalSetu' app.
+Your goal is to provide a complete and dynamic feasibility report using real-world location-specific data and accurate calculations.
+
+You must proceed in the following order:
+1. First, use the `get_hydrogeological_data` tool to find essential environmental data including coordinates.
+2. Second, use the `calculate_harvesting_potential` tool with the roof area and rainfall data.
+3. Third, use the `recommend_recharge_structure` tool with ALL parameters INCLUDING the latitude and longitude from step 1.
+4. Finally, use the `format_final_report` tool as your final action.
+
+CRITICAL: When calling recommend_recharge_structure, ALWAYS pass the latitude and longitude from the hydrogeological data to ensure location-specific, dynamic recommendations.
+
+The recommend_recharge_structure tool uses an advanced engineering-based evaluation system that analyzes site conditions comprehensively and provides detailed rationale for the selection.
+
+When creating the ai_recommendation, include:
+- Structure type and detailed technical justification based on the scoring system
+- Confidence score and selection rationale provided by the tool
+- Real-world dimensions calculated for the specific location and requirements
+- Location-specific factors (geological formations, climate zone, soil infiltration rates)
+- Detailed cost breakdown with realistic pricing and available subsidies
+- Accurate savings analysis focusing on borewell cost reduction
+- Performance metrics including capacity, recharge efficiency, and payback analysis
+
+Make the recommendation comprehensive yet user-friendly, explaining the engineering rationale in accessible language."""),
+    ("human", "{input}"),
+    MessagesPlaceholder(variable_name="agent_scratchpad"),
+])
+
+def build_agent_executor(llm, api) -> AgentExecutor:
+    tools = build_tools(api)
+    agent = create_openai_functions_agent(llm, tools, prompt)
+    return AgentExecutor(
+        agent=agent,
+        tools=tools,
+        verbose=True,
+        return_intermediate_steps=True
+    )
+
+def report_version(llm, tools: list) -> str:
+    # Cached reports are only reused while the prompt, tools and model stay the same
+    return hashlib.sha256(json.dumps({
+        "prompt": prompt.pretty_repr(),
+        "tools": [(tool.name, tool.description) for tool in tools],
+        "model": llm.model_name,
+        "temperature": llm.temperature,
+    }).encode()).hexdigest()[:16]
+
+def extract_final_report(result: dict):
+    if "intermediate_steps" in result and result["intermediate_steps"]:
+        last_action, last_observation = result["intermediate_steps"][-1]
+        if isinstance(last_action, AgentActionMessageLog) and last_action.tool == "format_final_report":
+            if isinstance(last_observation, dict) and "ai_recommendation" in last_observation:
+                return last_observation
+    return None
+
+def response_usage(response) -> dict:
+    # Token usage of a chat completion. Plain calls report it in llm_output;
+    # streamed ones carry it on the message when the model was created with
+    # stream usage on (see main.get_llm), and report nothing otherwise.
+    output = response.llm_output or {}
+    usage = output.get("token_usage") or {}
+    message = next((getattr(g, "message", None) for generations in response.generations for g in generations), None)
+    metadata = getattr(message, "usage_metadata", None) or {}
+    return {
+        "prompt_tokens": usage.get("prompt_tokens", metadata.get("input_tokens", 0)),
+        "completion_tokens": usage.get("completion_tokens", metadata.get("output_tokens", 0)),
+        "model": output.get("model_name") or (getattr(message, "response_metadata", None) or {}).get("model_name", "unknown"),
+    }
+
+class TokenUsageHandler(AsyncCallbackHandler):
+    # Adds the usage OpenAI reports for each agent step to a request's token report
+    def __init__(self, report: dict):
+        self.report = report
+
+    async def on_llm_end(self, response, **kwargs):
+        usage = response_usage(response)
+        self.report["llm_calls"] += 1
+        self.report["prompt_tokens"] += usage["prompt_tokens"]
+        self.report["completion_tokens"] += usage["completion_tokens"]
+
+class LLMMetricsHandler(AsyncCallbackHandler):
+    # Latency and token counts of every chat completion, agent steps and
+    # pipeline narratives alike, for /metrics
+    def __init__(self):
+        self._started = {}
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            record_span("llm.chat", started, time.perf_counter())
+        usage = response_usage(response)
+        metrics.increment("rwh_llm_tokens_total", usage["prompt_tokens"], model=usage["model"], kind="prompt")
+        metrics.increment("rwh_llm_tokens_total", usage["completion_tokens"], model=usage["model"], kind="completion")
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            record_span("llm.chat_error", started, time.perf_counter())
+
+class AgentTimingHandler(AsyncCallbackHandler):
+    # Records each agent LLM step and tool call as a span on the request's timer
+    def __init__(self, timer):
+        self.timer = timer
+        self.llm_steps = 0
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self.llm_steps += 1
+        self.timer.start(f"agent.llm_step_{self.llm_steps}", key=run_id)
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        self.timer.end(key=run_id)
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        self.timer.end(key=run_id)
+
+    async def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self.timer.start(f"agent.tool.{(serialized or {}).get('name', 'tool')}", key=run_id)
+
+    async def on_tool_end(self, output, *, run_id, **kwargs):
+        self.timer.end(key=run_id)
+
+    async def on_tool_error(self, error, *, run_id, **kwargs):
+        self.timer.end(key=run_id)
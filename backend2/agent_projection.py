@@ -0,0 +1,69 @@
+import json
+
+# Tools the agent is built with (agent.build_tools), listed here so /health does
+# not have to import langchain
+AGENT_TOOL_NAMES = ["get_hydrogeological_data", "calculate_harvesting_potential", "recommend_recharge_structure", "format_final_report"]
+
+# Fields each tool sends back to the agent. The full dicts stay in the
+# per-request agent data store, where format_final_report picks them up.
+AGENT_TOOL_FIELDS = {
+    "get_hydrogeological_data": [
+        "latitude", "longitude", "district", "principal_aquifer", "groundwater_depth_meters",
+        "annual_rainfall_mm", "average_temperature_celsius", "climate_zone",
+    ],
+    "calculate_harvesting_potential": ["runoff_liters", "annual_savings_inr", "savings_breakdown"],
+    "recommend_recharge_structure": [
+        "suggested_structure", "selection_rationale", "confidence_score", "recommended_dimensions",
+        "volume_m3", "capacity_liters", "estimated_cost_inr", "cost_breakdown", "subsidy_available_inr",
+        "net_investment_inr", "annual_savings_inr", "payback_period_years", "soil_infiltration_rate_mm_hr",
+        "aquifer_type", "recharge_efficiency",
+    ],
+}
+
+_encoding = None
+
+def load_encoding():
+    # tiktoken downloads its BPE file on first use, so this blocks; the app
+    # runs it in a worker thread at startup. Until it finishes, or if it
+    # fails, counts are estimated from text length.
+    global _encoding
+    try:
+        import tiktoken
+        _encoding = tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"tiktoken unavailable ({e}); estimating token counts from text length.")
+    return _encoding
+
+def get_encoding():
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+def compact_value(value):
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else round(value, 2)
+    if isinstance(value, dict):
+        return {k: compact_value(v) for k, v in value.items() if v not in (None, 0, "", {})}
+    return value
+
+def project_tool_output(tool_name: str, result: dict) -> tuple:
+    # Returns (text for the agent, tokens of the full output, tokens of the projection)
+    full_text = json.dumps(result, default=str)
+    fields = AGENT_TOOL_FIELDS.get(tool_name)
+    summary = {k: compact_value(result[k]) for k in fields if k in result} if fields else result
+    text = json.dumps(summary, default=str, separators=(",", ":"), ensure_ascii=False)
+    return text, count_tokens(full_text), count_tokens(text)
+
+def new_token_report() -> dict:
+    return {
+        "llm_calls": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "tool_calls": 0,
+        "tool_output_tokens": 0,
+        "tool_output_tokens_unprojected": 0,
+    }
@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+# Result files shared by micro_bench.py and load_test.py. Each file records the
+# commit it was measured on and a flat {case: {metric: value}} table, so any two
+# runs can be compared:
+#
+#     python benchmarks/bench_results.py results/load-abc123.json results/load-def456.json
+#
+# Metrics ending in _ms or _us are latencies (lower is better); throughput_rps
+# and ops_per_s are rates (higher is better). Maxima are a single sample and
+# too noisy to compare; they and anything else are informational.
+
+LOWER_IS_BETTER = ("_ms", "_us")
+HIGHER_IS_BETTER = ("throughput_rps", "ops_per_s")
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def latency_summary(seconds: list, unit: str = "ms") -> dict:
+    scale = 1000 if unit == "ms" else 1_000_000
+    values = np.asarray(seconds, dtype=np.float64) * scale
+    if not len(values):
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(values),
+        f"mean_{unit}": round(float(values.mean()), 3),
+        f"p50_{unit}": round(float(p50), 3),
+        f"p95_{unit}": round(float(p95), 3),
+        f"p99_{unit}": round(float(p99), 3),
+        f"max_{unit}": round(float(values.max()), 3),
+    }
+
+def save_results(benchmark: str, params: dict, results: dict, path: str = None) -> str:
+    commit = git_commit()
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{benchmark}-{commit}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    document = {
+        "benchmark": benchmark,
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": params,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    return path
+
+def load_results(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+def metric_direction(metric: str) -> int:
+    # +1 when a larger value is better, -1 when smaller is better, 0 when neither
+    if metric.startswith("max_"):
+        return 0
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    if metric.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+def compare_results(baseline: dict, current: dict, threshold_pct: float = 10.0) -> list:
+    # Rows of (case, metric, baseline, current, change %, regressed) for the
+    # metrics both runs have
+    rows = []
+    for case, metrics in current["results"].items():
+        before = baseline["results"].get(case)
+        if before is None:
+            continue
+        for metric, value in metrics.items():
+            direction = metric_direction(metric)
+            old = before.get(metric)
+            if not direction or not isinstance(old, (int, float)) or not isinstance(value, (int, float)) or old == 0:
+                continue
+            change = (value - old) / abs(old) * 100
+            rows.append((case, metric, old, value, change, -direction * change > threshold_pct))
+    return rows
+
+def print_comparison(rows: list, baseline: dict, current: dict):
+    print(f"{baseline['benchmark']}: {baseline['commit']} -> {current['commit']}")
+    if baseline["params"] != current["params"]:
+        print("  note: runs used different parameters")
+    print(f"{'case':<36} {'metric':<16} {'before':>12} {'after':>12} {'change':>9}")
+    for case, metric, old, value, change, regressed in rows:
+        print(f"{case:<36} {metric:<16} {old:>12.3f} {value:>12.3f} {change:>+8.1f}%{'  REGRESSION' if regressed else ''}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change counted as a regression.")
+    args = parser.parse_args(argv)
+
+    baseline, current = load_results(args.baseline), load_results(args.current)
+    if baseline["benchmark"] != current["benchmark"]:
+        print(f"Cannot compare a {baseline['benchmark']} run with a {current['benchmark']} run")
+        return 2
+    rows = compare_results(baseline, current, args.threshold)
+    print_comparison(rows, baseline, current)
+    return 1 if any(row[5] for row in rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Measures what a fresh serverless instance pays before its first response:
+# module import time (python -X importtime), then for each endpoint a new
+# process that imports main, runs startup and serves one request. Network
+# calls fail fast (HTTP_MAX_RETRIES=0) so timings reflect local work only.
+
+ENDPOINTS = {
+    "health": ("GET", "/health", None),
+    "predict_gwl": ("POST", "/predict-gwl", {"district": "Bengaluru Urban", "latitude": 12.97, "longitude": 77.59}),
+    "structured": ("POST", "/get-recommendation/structured", {"latitude": 12.97, "longitude": 77.59, "area": 120, "district": "Bengaluru Urban"}),
+    "agent_build": (None, None, None),
+}
+
+PROBE = """
+import sys, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+method, path, body = json.loads(sys.argv[1])
+with TestClient(main.app) as client:
+    ready = time.perf_counter()
+    if method is None:
+        status = 200 if main.get_agent_executor() is not None else 500
+    else:
+        status = client.request(method, path, json=body).status_code
+    done = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "first_response_ms": (done - ready) * 1000,
+    "total_ms": (done - started) * 1000,
+    "langchain_imported": "langchain.agents" in sys.modules,
+    "status": status,
+}))
+"""
+
+def probe_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "cold-start-bench")
+    env.setdefault("HTTP_MAX_RETRIES", "0")
+    env.setdefault("CLIMATE_CACHE_PATH", "")
+    env.setdefault("REPORT_CACHE_PATH", "")
+    return env
+
+def import_profile(top: int) -> list:
+    # -X importtime writes "import time: self [us] | cumulative | imported package" to stderr
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR, env=probe_env(), capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nesting is shown by two spaces per level; list the modules main imports directly
+        if len(name) - len(name.lstrip()) != 3:
+            continue
+        rows.append((name.strip(), int(cumulative_us) / 1000))
+    return sorted(rows, key=lambda row: -row[1])[:top]
+
+def run_probe(endpoint: str) -> dict:
+    proc = subprocess.run([sys.executable, "-c", PROBE, json.dumps(ENDPOINTS[endpoint])], cwd=BACKEND_DIR, env=probe_env(), capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "probe failed")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start import and first-response timings for main.py.")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh processes per endpoint; the median is reported.")
+    parser.add_argument("--top", type=int, default=12, help="Modules to list by cumulative import time.")
+    args = parser.parse_args(argv)
+
+    print("Imports made by main, by cumulative time (ms)")
+    for name, ms in import_profile(args.top):
+        print(f"  {name:<40} {ms:>8.1f}")
+
+    print(f"\n{'endpoint':>12} {'import':>8} {'startup':>8} {'first':>8} {'total':>8} {'langchain':>10} {'status':>7}")
+    for endpoint in args.endpoints:
+        runs = sorted((run_probe(endpoint) for _ in range(args.repeat)), key=lambda run: run["total_ms"])
+        run = runs[len(runs) // 2]
+        print(f"{endpoint:>12} {run['import_ms']:>8.0f} {run['startup_ms']:>8.0f} {run['first_response_ms']:>8.0f} "
+              f"{run['total_ms']:>8.0f} {str(run['langchain_imported']):>10} {run['status']:>7}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
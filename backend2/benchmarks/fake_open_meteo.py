@@ -0,0 +1,140 @@
+import sys
+import json
+import math
+import zlib
+import random
+import asyncio
+import argparse
+import datetime
+import functools
+import numpy as np
+from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse, Response
+
+# Local stand-in for the Open-Meteo archive API. It answers
+# /v1/archive?latitude=..&longitude=..&start_date=..&end_date=..&daily=..
+# with a response shaped like the real one: the full daily series (12 418 days
+# for the 1990-2023 range the app asks for, ~270 KB of JSON), snapped to a
+# 0.1° grid. Rainfall follows a monsoon season whose annual total rises
+# towards the west coast and the north-east, so different sites give
+# different recommendations. Series are deterministic per grid cell.
+#
+#     OPEN_METEO_ARCHIVE_URL=http://127.0.0.1:8101/v1/archive uvicorn main:app
+#     python benchmarks/fake_open_meteo.py --port 8101 --latency-ms 150
+
+GRID_DEG = 0.1
+DEFAULT_START_DATE = "1990-01-01"
+DEFAULT_END_DATE = "2023-12-31"
+DAILY_UNITS = {"time": "iso8601", "precipitation_sum": "mm", "temperature_2m_max": "°C"}
+RATE_LIMIT_REASON = "Minutely API request limit exceeded. Please try again in one minute."
+
+def snap(value: float) -> float:
+    return round(round(value / GRID_DEG) * GRID_DEG, 2)
+
+@functools.lru_cache(maxsize=16)
+def date_axis(start_date: str, end_date: str) -> tuple:
+    start, end = datetime.date.fromisoformat(start_date), datetime.date.fromisoformat(end_date)
+    days = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+    return [day.isoformat() for day in days], np.array([day.timetuple().tm_yday for day in days]), np.array([day.year for day in days])
+
+def annual_rainfall_mm(latitude: float, longitude: float) -> float:
+    # ~700 mm on the Deccan plateau, ~3000 mm on the Western Ghats coast, wetter again in the north-east
+    west_coast = 2300 * math.exp(-((longitude - 74.0) / 1.6) ** 2) * (1 if latitude < 21 else 0.4)
+    north_east = 1800 * math.exp(-((longitude - 92.0) / 3.0) ** 2) * (1 if latitude > 22 else 0.3)
+    return 700 + west_coast + north_east
+
+def daily_series(latitude: float, longitude: float, start_date: str, end_date: str) -> dict:
+    dates, day_of_year, year = date_axis(start_date, end_date)
+    rng = np.random.default_rng(zlib.crc32(f"{latitude:.2f},{longitude:.2f}".encode()))
+
+    # Wet-day probability and amount peak in the south-west monsoon (mid-July)
+    monsoon = np.exp(-(((day_of_year - 200) / 42.0) ** 2))
+    wet_probability = 0.05 + 0.6 * monsoon
+    # Whole years run wetter or drier than the mean
+    years = np.unique(year)
+    year_factor = dict(zip(years.tolist(), rng.lognormal(0.0, 0.2, len(years)).tolist()))
+    shape = 0.7
+    scale = annual_rainfall_mm(latitude, longitude) * len(dates) / 365.25 / (shape * wet_probability.sum())
+    wet = rng.random(len(dates)) < wet_probability
+    amount = rng.gamma(shape, scale, len(dates)) * np.array([year_factor[y] for y in year.tolist()])
+    precipitation = np.round(np.where(wet, amount, 0.0), 1)
+
+    # Hottest before the monsoon (late April); cooler further north in winter
+    seasonal = 3.5 * np.cos(2 * np.pi * (day_of_year - 115) / 365.25)
+    temperature = 31.0 - 0.15 * max(latitude - 13.0, 0.0) * (1 - np.cos(2 * np.pi * (day_of_year - 15) / 365.25)) + seasonal
+    temperature = np.round(temperature + rng.normal(0.0, 1.2, len(dates)), 1)
+    return {"time": dates, "precipitation_sum": precipitation.tolist(), "temperature_2m_max": temperature.tolist()}
+
+@functools.lru_cache(maxsize=512)
+def archive_body(latitude: float, longitude: float, start_date: str, end_date: str, daily: str) -> bytes:
+    series = daily_series(latitude, longitude, start_date, end_date)
+    variables = [name for name in daily.split(",") if name in series]
+    payload = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "generationtime_ms": 0.0,
+        "utc_offset_seconds": 0,
+        "timezone": "GMT",
+        "timezone_abbreviation": "GMT",
+        "elevation": round(900.0 - 850.0 * math.exp(-((longitude - 74.0) / 1.6) ** 2), 1),
+        "daily_units": {name: DAILY_UNITS[name] for name in ["time", *variables]},
+        "daily": {name: series[name] for name in ["time", *variables]},
+    }
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+def archive_payload(latitude: float, longitude: float, start_date: str = DEFAULT_START_DATE, end_date: str = DEFAULT_END_DATE, daily: str = "precipitation_sum,temperature_2m_max") -> bytes:
+    # The response body for a point, as served; micro_bench.py parses the same bytes
+    return archive_body(snap(latitude), snap(longitude), start_date, end_date, daily)
+
+def create_app(latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0) -> FastAPI:
+    app = FastAPI(title="Fake Open-Meteo archive")
+    rng = random.Random(seed)
+    stats = {"requests": 0, "rate_limited": 0, "cells": set()}
+
+    @app.get("/v1/archive")
+    async def archive(
+        latitude: float,
+        longitude: float,
+        start_date: str = DEFAULT_START_DATE,
+        end_date: str = DEFAULT_END_DATE,
+        daily: str = Query(default="precipitation_sum,temperature_2m_max"),
+    ):
+        stats["requests"] += 1
+        delay = max(latency_ms + rng.uniform(-jitter_ms, jitter_ms), 0.0)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if rng.random() < error_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse({"error": True, "reason": RATE_LIMIT_REASON}, status_code=429)
+        cell = (snap(latitude), snap(longitude))
+        stats["cells"].add(cell)
+        # Building a series takes a few ms; run it off the loop so latency stays as configured
+        body = await asyncio.to_thread(archive_body, *cell, start_date, end_date, daily)
+        return Response(body, media_type="application/json")
+
+    @app.get("/stats")
+    async def get_stats():
+        return {"requests": stats["requests"], "rate_limited": stats["rate_limited"], "distinct_cells": len(stats["cells"])}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the Open-Meteo archive API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added to every response.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- spread around --latency-ms.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms, args.error_rate, args.seed), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
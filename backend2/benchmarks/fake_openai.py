@@ -0,0 +1,231 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_projection import AGENT_TOOL_NAMES
+
+# Local stand-in for the OpenAI chat completions API. Instead of a model it
+# runs the script the agent prompt asks for: one call to each of the four tools
+# in order, taking each call's arguments from the user message and from the
+# tool results already in the conversation. format_final_report returns
+# directly, so a run costs four completions, like a well-behaved model.
+# Requests without functions (the template-free narrative) get a short
+# scripted paragraph. Both function calling styles and streaming are served.
+#
+#     OPENAI_API_BASE=http://127.0.0.1:8102/v1 OPENAI_API_KEY=x uvicorn main:app
+#     python benchmarks/fake_openai.py --port 8102 --latency-ms 400
+#
+# The user message is read for "latitude 12.97", "longitude 77.59" and
+# "120 square meters" (load_test.py writes its inputs that way).
+
+DEFAULT_LATITUDE = 12.9716
+DEFAULT_LONGITUDE = 77.5946
+DEFAULT_ROOF_AREA_SQM = 100.0
+NARRATIVE_TEXT = (
+    "Based on the site data, the recommended structure captures most of the roof runoff "
+    "and recharges it into the local aquifer; the design, cost and payback figures above "
+    "are sized for this roof and rainfall."
+)
+
+NUMBER = r"(-?\d+(?:\.\d+)?)"
+LATITUDE_PATTERN = re.compile(r"latitude[^\d-]{0,5}" + NUMBER, re.IGNORECASE)
+LONGITUDE_PATTERN = re.compile(r"longitude[^\d-]{0,5}" + NUMBER, re.IGNORECASE)
+AREA_PATTERN = re.compile(NUMBER + r"\s*(?:sq\.?\s*m|square\s*met(?:er|re)s?|m2|m²)", re.IGNORECASE)
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+def parse_site(text: str) -> dict:
+    def first(pattern, default):
+        match = pattern.search(text or "")
+        return float(match.group(1)) if match else default
+    return {
+        "latitude": first(LATITUDE_PATTERN, DEFAULT_LATITUDE),
+        "longitude": first(LONGITUDE_PATTERN, DEFAULT_LONGITUDE),
+        "roof_area_sqm": first(AREA_PATTERN, DEFAULT_ROOF_AREA_SQM),
+    }
+
+def tool_results(messages: list) -> dict:
+    # Results by tool name, from "function" messages or from "tool" messages
+    # matched to the assistant tool call they answer
+    call_names = {}
+    for message in messages:
+        for call in message.get("tool_calls") or []:
+            call_names[call["id"]] = call["function"]["name"]
+    results = {}
+    for message in messages:
+        name = message.get("name") if message.get("role") == "function" else call_names.get(message.get("tool_call_id"))
+        if message.get("role") in ("function", "tool") and name:
+            try:
+                results[name] = json.loads(message.get("content") or "{}")
+            except json.JSONDecodeError:
+                results[name] = {}
+    return results
+
+def recommendation_text(site: dict, structure: dict) -> str:
+    return (
+        f"For a {site['roof_area_sqm']:.0f} m² roof at ({site['latitude']:.4f}, {site['longitude']:.4f}) we recommend a "
+        f"{structure.get('suggested_structure', 'recharge pit')} sized at {structure.get('recommended_dimensions', 'the calculated dimensions')}. "
+        f"It holds about {structure.get('capacity_liters', 0)} liters, costs roughly ₹{structure.get('estimated_cost_inr', 0)} "
+        f"before a ₹{structure.get('subsidy_available_inr', 0)} subsidy, and pays back in about "
+        f"{structure.get('payback_period_years', 0)} years. {structure.get('selection_rationale', '')}"
+    ).strip()
+
+def next_call(messages: list):
+    # (tool name, arguments) for the next step of the script, or None once it is done
+    user_text = " ".join(m.get("content") or "" for m in messages if m.get("role") == "user")
+    site = parse_site(user_text)
+    results = tool_results(messages)
+    hydrogeology = results.get("get_hydrogeological_data", {})
+    harvesting = results.get("calculate_harvesting_potential", {})
+    structure = results.get("recommend_recharge_structure", {})
+    arguments = {
+        "get_hydrogeological_data": lambda: {"latitude": site["latitude"], "longitude": site["longitude"]},
+        "calculate_harvesting_potential": lambda: {
+            "roof_area_sqm": site["roof_area_sqm"],
+            "annual_rainfall_mm": int(hydrogeology.get("annual_rainfall_mm", 970)),
+        },
+        "recommend_recharge_structure": lambda: {
+            "roof_area_sqm": site["roof_area_sqm"],
+            "groundwater_depth_meters": hydrogeology.get("groundwater_depth_meters", 15.5),
+            "runoff_liters": int(harvesting.get("runoff_liters", 50000)),
+            "latitude": hydrogeology.get("latitude", site["latitude"]),
+            "longitude": hydrogeology.get("longitude", site["longitude"]),
+        },
+        "format_final_report": lambda: {
+            "ai_recommendation": recommendation_text(site, structure),
+            "annual_savings_inr": int(structure.get("annual_savings_inr", 12000)),
+            "payback_period_years": float(structure.get("payback_period_years", 5.0)),
+        },
+    }
+    for name in AGENT_TOOL_NAMES:
+        if name not in results:
+            return name, arguments[name]()
+    return None
+
+class ScriptedChat:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, tokens_per_second: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.rng = random.Random(seed)
+        self.stats = {"completions": 0, "function_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def delay(self, completion_tokens: int) -> tuple:
+        # (seconds to the first token, seconds generating the rest)
+        first_token = max(self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms), 0.0) / 1000
+        generation = completion_tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+        return first_token, generation
+
+    def reply(self, body: dict) -> dict:
+        # The assistant message for this request, in the style it asked for
+        messages = body.get("messages", [])
+        call = next_call(messages) if (body.get("functions") or body.get("tools")) else None
+        if call is None:
+            message, text = {"role": "assistant", "content": NARRATIVE_TEXT}, NARRATIVE_TEXT
+        else:
+            name, arguments = call
+            text = json.dumps(arguments)
+            self.stats["function_calls"] += 1
+            if body.get("tools"):
+                message = {"role": "assistant", "content": None, "tool_calls": [
+                    {"id": f"call_{uuid.uuid4().hex[:24]}", "type": "function", "function": {"name": name, "arguments": text}},
+                ]}
+            else:
+                message = {"role": "assistant", "content": None, "function_call": {"name": name, "arguments": text}}
+        usage = {
+            "prompt_tokens": estimate_tokens(json.dumps(messages) + json.dumps(body.get("functions") or body.get("tools") or [])),
+            "completion_tokens": estimate_tokens(text),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        self.stats["completions"] += 1
+        self.stats["prompt_tokens"] += usage["prompt_tokens"]
+        self.stats["completion_tokens"] += usage["completion_tokens"]
+        return {"message": message, "usage": usage, "finish_reason": "stop" if call is None else ("tool_calls" if body.get("tools") else "function_call")}
+
+def completion_body(body: dict, reply: dict) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [{"index": 0, "message": reply["message"], "logprobs": None, "finish_reason": reply["finish_reason"]}],
+        "usage": reply["usage"],
+        "system_fingerprint": "fp_fake",
+    }
+
+def stream_chunks(body: dict, reply: dict) -> list:
+    # Content arrives a few words at a time; a function call in one delta
+    base = {"id": f"chatcmpl-{uuid.uuid4().hex[:24]}", "object": "chat.completion.chunk", "created": int(time.time()), "model": body.get("model", "gpt-4o")}
+    message = reply["message"]
+    if message.get("content"):
+        words = message["content"].split(" ")
+        deltas = [{"role": "assistant", "content": ""}] + [{"content": " ".join(words[i:i + 4]) + " "} for i in range(0, len(words), 4)]
+    else:
+        deltas = [{"role": "assistant", "content": None, **{k: v for k, v in message.items() if k in ("function_call", "tool_calls")}}]
+        for call in deltas[0].get("tool_calls", []):
+            call["index"] = 0
+    chunks = [{**base, "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": None}]} for delta in deltas]
+    chunks.append({**base, "choices": [{"index": 0, "delta": {}, "logprobs": None, "finish_reason": reply["finish_reason"]}]})
+    if (body.get("stream_options") or {}).get("include_usage"):
+        chunks.append({**base, "choices": [], "usage": reply["usage"]})
+    return chunks
+
+def create_app(latency_ms: float = 0.0, jitter_ms: float = 0.0, tokens_per_second: float = 0.0, seed: int = 0) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI chat completions")
+    chat = ScriptedChat(latency_ms, jitter_ms, tokens_per_second, seed)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        reply = chat.reply(body)
+        first_token, generation = chat.delay(reply["usage"]["completion_tokens"])
+        if not body.get("stream"):
+            await asyncio.sleep(first_token + generation)
+            return JSONResponse(completion_body(body, reply))
+
+        async def events():
+            chunks = stream_chunks(body, reply)
+            await asyncio.sleep(first_token)
+            for chunk in chunks:
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(generation / len(chunks))
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def get_stats():
+        return chat.stats
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a scripted OpenAI-compatible chat completions endpoint.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8102)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added to every completion.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- spread around --latency-ms.")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Generation speed; 0 makes output length free.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms, args.tokens_per_second, args.seed), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import functools
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gwl_inference
+from gwl_batcher import GWLMicroBatcher
+
+# Fires single-point GWL predictions at a steady arrival rate while a ticker
+# coroutine measures how late the event loop wakes it up. Compares inference
+# inline on the loop (the old behaviour), asyncio.to_thread per request, and
+# the micro-batching executor. Tiles are bypassed so every row hits the model.
+
+predict_live_batch = functools.partial(gwl_inference.predict_gwl_batch, use_tiles=False)
+
+def predict_live_one(district: str, latitude: float, longitude: float) -> float:
+    return float(predict_live_batch([district], [latitude], [longitude])[0])
+
+def make_predictor(mode: str, window_ms: float, workers: int):
+    if mode == "inline":
+        async def predict(*args):
+            return predict_live_one(*args)
+        return predict, None
+    if mode == "to_thread":
+        async def predict(*args):
+            return await asyncio.to_thread(predict_live_one, *args)
+        return predict, None
+    batcher = GWLMicroBatcher(
+        predict_fn=predict_live_batch,
+        executor_kind="process" if mode == "batcher_process" else "thread",
+        workers=workers,
+        window_ms=window_ms,
+    )
+    return batcher.predict, batcher
+
+async def ticker(interval: float, lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+async def run_mode(mode: str, requests: int, arrival_ms: float, window_ms: float, workers: int, seed: int) -> dict:
+    predict, batcher = make_predictor(mode, window_ms, workers)
+    rng = random.Random(seed)
+    lags, latencies = [], []
+    stop = asyncio.Event()
+
+    if batcher is not None:
+        # Start the pool (and load the model in worker processes) before timing
+        await batcher.run(predict_live_one, "Bengaluru Urban", 12.97, 77.59)
+
+    async def one(i: int):
+        started = time.perf_counter()
+        await predict("Bengaluru Urban", 12.8 + rng.random() * 0.4, 77.3 + rng.random() * 0.5)
+        latencies.append(time.perf_counter() - started)
+
+    tick = asyncio.create_task(ticker(0.005, lags, stop))
+    started = time.perf_counter()
+    tasks = []
+    for i in range(requests):
+        tasks.append(asyncio.create_task(one(i)))
+        await asyncio.sleep(rng.expovariate(1000 / arrival_ms))
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - started
+    stop.set()
+    await tick
+
+    result = {
+        "mode": mode,
+        "wall_s": round(wall, 3),
+        "loop_lag_p50_ms": round(float(np.percentile(lags, 50)) * 1000, 2),
+        "loop_lag_p99_ms": round(float(np.percentile(lags, 99)) * 1000, 2),
+        "loop_lag_max_ms": round(max(lags) * 1000, 2),
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+        "latency_p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 2),
+        "model_calls": batcher.stats["batches"] if batcher else requests,
+    }
+    if batcher is not None:
+        batcher.shutdown()
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Event-loop lag under concurrent GWL inference.")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--arrival-ms", type=float, default=2.0, help="Mean gap between arriving requests.")
+    parser.add_argument("--window-ms", type=float, default=3.0)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--modes", nargs="+", default=["inline", "to_thread", "batcher_thread", "batcher_process"])
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if not gwl_inference.load_gwl_models():
+        print("The benchmark needs the trained GWL model.")
+        return 1
+
+    print(f"{'mode':>16} {'wall s':>8} {'lag p50':>8} {'lag p99':>8} {'lag max':>8} {'lat p50':>8} {'lat p99':>8} {'calls':>6}")
+    for mode in args.modes:
+        row = asyncio.run(run_mode(mode, args.requests, args.arrival_ms, args.window_ms, args.workers, args.seed))
+        print(f"{row['mode']:>16} {row['wall_s']:>8} {row['loop_lag_p50_ms']:>8} {row['loop_lag_p99_ms']:>8} "
+              f"{row['loop_lag_max_ms']:>8} {row['latency_p50_ms']:>8} {row['latency_p99_ms']:>8} {row['model_calls']:>6}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK_DIR = os.path.join(BACKEND_DIR, "benchmarks")
+sys.path.insert(0, BACKEND_DIR)
+
+from workload import sample_sites
+from bench_results import latency_summary, save_results, load_results, compare_results, print_comparison
+
+# Concurrent load against the recommendation endpoints with every upstream
+# replaced by a local stand-in: fake_open_meteo.py for the climate archive and
+# fake_openai.py for the agent's LLM, each with configurable latency. The app
+# runs under uvicorn in its own process, as in production; disk caches and the
+# offline climate store are switched off so every run starts from the same
+# state. Per endpoint it reports throughput and p50/p95/p99 latency, along with
+# how many upstream calls the requests caused, and saves the results for
+# bench_results.py to compare between commits.
+#
+#     python benchmarks/load_test.py --concurrency 16 --requests 200 --llm-latency-ms 400
+#
+# With --url the requests go to a server that is already running (and its own
+# upstreams) instead.
+
+ENDPOINTS = ("predict-gwl", "get-recommendation", "get-recommendation-with-gwl")
+READY_TIMEOUT_SECONDS = 60
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def build_request(endpoint: str, number: int, sites: list) -> tuple:
+    # Request number picks the site and a roof area unique to the request, so
+    # agent inputs never repeat and the report cache does not short-circuit the run
+    district, latitude, longitude = sites[number % len(sites)]
+    roof_area = 50.0 + number * 0.5
+    text = f"My house is at latitude {latitude}, longitude {longitude} and the roof is {roof_area:.1f} square meters. Which recharge structure should I build?"
+    if endpoint == "predict-gwl":
+        return "/predict-gwl", {"district": district, "latitude": latitude, "longitude": longitude}
+    if endpoint == "get-recommendation":
+        return "/get-recommendation", {"input": text}
+    return "/get-recommendation-with-gwl", {"input": text, "district": district, "latitude": latitude, "longitude": longitude, "area": roof_area}
+
+class LocalStack:
+    # The two fakes and the app, each a subprocess on a free port
+    def __init__(self, args):
+        self.args = args
+        self.processes = []
+        self.log_dir = tempfile.mkdtemp(prefix="rwh-load-")
+
+    def spawn(self, name: str, command: list, env: dict = None) -> str:
+        port = free_port()
+        log = open(os.path.join(self.log_dir, f"{name}.log"), "w")
+        process = subprocess.Popen([*command, "--port", str(port)], cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        self.processes.append((name, process, log))
+        url = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + READY_TIMEOUT_SECONDS
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                break
+            try:
+                if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                    return url
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        log.flush()
+        with open(log.name) as f:
+            tail = f.read()[-2000:]
+        raise RuntimeError(f"{name} did not become ready; log {log.name}:\n{tail}")
+
+    def __enter__(self):
+        args = self.args
+        self.archive_url = self.spawn("fake_open_meteo", [
+            sys.executable, os.path.join(BENCHMARK_DIR, "fake_open_meteo.py"),
+            "--latency-ms", str(args.archive_latency_ms), "--jitter-ms", str(args.archive_jitter_ms),
+            "--error-rate", str(args.archive_error_rate), "--seed", str(args.seed),
+        ])
+        self.llm_url = self.spawn("fake_openai", [
+            sys.executable, os.path.join(BENCHMARK_DIR, "fake_openai.py"),
+            "--latency-ms", str(args.llm_latency_ms), "--jitter-ms", str(args.llm_jitter_ms),
+            "--tokens-per-second", str(args.llm_tokens_per_second), "--seed", str(args.seed),
+        ])
+        env = {
+            **os.environ,
+            "OPEN_METEO_ARCHIVE_URL": f"{self.archive_url}/v1/archive",
+            "OPENAI_API_BASE": f"{self.llm_url}/v1",
+            "OPENAI_API_KEY": "load-test",
+            "CLIMATE_CACHE_PATH": "",
+            "CLIMATE_STORE_PATH": "",
+            "REPORT_CACHE_PATH": "",
+        }
+        self.app_url = self.spawn("app", [sys.executable, "-m", "uvicorn", "main:app", "--log-level", "warning"], env)
+        return self
+
+    def __exit__(self, *exc):
+        for _, process, log in reversed(self.processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            log.close()
+
+    def upstream_stats(self) -> dict:
+        archive = httpx.get(f"{self.archive_url}/stats").json()
+        llm = httpx.get(f"{self.llm_url}/stats").json()
+        return {"archive_requests": archive["requests"], "llm_completions": llm["completions"]}
+
+async def drive(base_url: str, endpoint: str, first_number: int, args, sites: list) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        # Warm-up requests are sequential and not counted: the first agent
+        # request also builds the agent and imports langchain
+        for number in range(first_number, first_number + args.warmup):
+            path, body = build_request(endpoint, number, sites)
+            await client.post(path, json=body)
+
+        numbers = iter(range(first_number + args.warmup, first_number + args.warmup + args.requests))
+        latencies, statuses = [], {}
+
+        async def worker():
+            for number in numbers:
+                path, body = build_request(endpoint, number, sites)
+                started = time.perf_counter()
+                try:
+                    status = (await client.post(path, json=body)).status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        wall = time.perf_counter() - started
+
+    return {
+        **latency_summary(latencies),
+        "errors": sum(count for status, count in statuses.items() if status != "200"),
+        "status_counts": statuses,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2),
+    }
+
+def run_endpoints(base_url: str, args, sites: list, stack: LocalStack = None) -> dict:
+    results = {}
+    print(f"{'endpoint':<30} {'reqs':>6} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'archive':>8} {'llm':>6}")
+    for i, endpoint in enumerate(args.endpoints):
+        before = stack.upstream_stats() if stack else None
+        # Each endpoint gets its own request numbers, so no two requests send the same input
+        result = asyncio.run(drive(base_url, endpoint, i * (args.requests + args.warmup), args, sites))
+        if stack:
+            after = stack.upstream_stats()
+            result.update({f"upstream_{key}": after[key] - before[key] for key in after})
+        results[endpoint] = result
+        print(f"{endpoint:<30} {result['count']:>6} {result['errors']:>7} {result['throughput_rps']:>8.1f} "
+              f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} "
+              f"{result.get('upstream_archive_requests', '-'):>8} {result.get('upstream_llm_completions', '-'):>6}")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent load test of the recommendation endpoints against local upstream stand-ins.")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint.")
+    parser.add_argument("--warmup", type=int, default=3, help="Unmeasured requests per endpoint, sent first.")
+    parser.add_argument("--sites", type=int, default=64, help="Distinct locations the requests cycle through.")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--archive-latency-ms", type=float, default=150.0)
+    parser.add_argument("--archive-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--archive-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=400.0, help="Time to first token of every completion.")
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--url", help="Load an already running server instead of starting the app and the fakes.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file; defaults to benchmarks/results/load-<commit>-<time>.json.")
+    parser.add_argument("--compare", help="Earlier result file to compare against.")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change counted as a regression.")
+    args = parser.parse_args(argv)
+
+    sites = sample_sites(args.sites, args.seed)
+    if args.url:
+        results = run_endpoints(args.url.rstrip("/"), args, sites)
+    else:
+        with LocalStack(args) as stack:
+            print(f"app {stack.app_url}, archive {stack.archive_url}, llm {stack.llm_url}, logs in {stack.log_dir}\n")
+            results = run_endpoints(stack.app_url, args, sites, stack)
+
+    params = {key: value for key, value in vars(args).items() if key not in ("output", "compare", "threshold")}
+    path = save_results("load", params, results, args.output)
+    print(f"\nSaved {path}")
+    if args.compare:
+        baseline = load_results(args.compare)
+        current = load_results(path)
+        rows = compare_results(baseline, current, args.threshold)
+        print()
+        print_comparison(rows, baseline, current)
+        return 1 if any(row[5] for row in rows) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "not-used")
+os.environ.setdefault("CLIMATE_CACHE_PATH", "")
+os.environ.setdefault("REPORT_CACHE_PATH", "")
+
+import main
+from climate import daily_precipitation, summarize_daily
+from gwl_inference import load_gwl_models, predict_gwl, predict_gwl_batch
+from structure_engine import STRUCTURE_TYPES
+from fake_open_meteo import archive_payload
+from workload import sample_sites
+from bench_results import latency_summary, save_results, load_results, compare_results, print_comparison
+
+# Per-call timings of the functions on the recommendation path that run
+# without the network: GWL prediction, site evaluation, structure sizing, and
+# the aggregation of a 34-year archive response (JSON decode, annual summary,
+# daily series) that get_hydrogeological_data pays on a climate cache miss.
+# Inputs cycle through sites around cities across India so branches and
+# caches see a realistic mix. Results are saved for bench_results.py to compare.
+
+def site_inputs(n: int, seed: int) -> list:
+    # (roof_area_sqm, groundwater_depth, soil_infiltration, daily_runoff) spanning every category
+    rng = np.random.default_rng(seed)
+    roof_area = rng.uniform(40, 400, n)
+    rainfall = rng.uniform(500, 3000, n)
+    return list(zip(
+        roof_area.tolist(),
+        rng.uniform(2, 40, n).tolist(),
+        rng.choice([6.5, 12.0, 15.5, 25.5, 42.5], n).tolist(),
+        (roof_area * rainfall * 0.85 / 365).tolist(),
+    ))
+
+def time_calls(fn, inputs: list, iterations: int, warmup: int) -> dict:
+    for i in range(warmup):
+        fn(*inputs[i % len(inputs)])
+    samples = []
+    for i in range(iterations):
+        args = inputs[i % len(inputs)]
+        started = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - started)
+    summary = latency_summary(samples, unit="us")
+    summary["ops_per_s"] = round(len(samples) / sum(samples), 1)
+    return summary
+
+def build_cases(args) -> dict:
+    # name -> (function, inputs, iterations); slow cases run fewer iterations
+    sites = sample_sites(args.sites, args.seed)
+    conditions = site_inputs(args.sites, args.seed)
+    dimension_inputs = [
+        (structure, runoff, runoff * 2.5, infiltration, depth)
+        for structure in STRUCTURE_TYPES for _, depth, infiltration, runoff in conditions
+    ]
+    districts, latitudes, longitudes = (list(column) for column in zip(*sites))
+    payloads = [archive_payload(lat, lon) for _, lat, lon in sites[:args.archive_sites]]
+    decoded = [json.loads(payload) for payload in payloads]
+    slow = max(args.iterations // 100, 20)
+    return {
+        "predict_gwl": (predict_gwl, sites, args.iterations),
+        "predict_gwl.model": (lambda d, lat, lon: predict_gwl_batch([d], [lat], [lon], use_tiles=False), sites, args.iterations),
+        f"predict_gwl_batch.model_{args.batch}": (
+            lambda: predict_gwl_batch(districts[:args.batch], latitudes[:args.batch], longitudes[:args.batch], use_tiles=False),
+            [()], max(args.iterations // 10, 20),
+        ),
+        "evaluate_site_conditions": (main.evaluate_site_conditions, conditions, args.iterations),
+        "calculate_structure_dimensions": (main.calculate_structure_dimensions, dimension_inputs, args.iterations),
+        "hydrogeology.archive_json_decode": (json.loads, [(payload,) for payload in payloads], slow),
+        "hydrogeology.summarize_daily": (summarize_daily, [(data,) for data in decoded], slow),
+        "hydrogeology.daily_precipitation": (daily_precipitation, [(data,) for data in decoded], slow),
+    }
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the GWL model, structure engine and archive aggregation.")
+    parser.add_argument("--iterations", type=int, default=2000, help="Calls per case; the archive cases run 1/100 of this.")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--sites", type=int, default=256)
+    parser.add_argument("--archive-sites", type=int, default=8, help="Distinct 34-year archive payloads to aggregate.")
+    parser.add_argument("--batch", type=int, default=256, help="Rows per batched GWL prediction.")
+    parser.add_argument("--cases", nargs="+", help="Only run cases whose name starts with one of these.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file; defaults to benchmarks/results/micro-<commit>-<time>.json.")
+    parser.add_argument("--compare", help="Earlier result file to compare against.")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change counted as a regression.")
+    args = parser.parse_args(argv)
+
+    load_gwl_models()
+    results = {}
+    print(f"{'case':<40} {'calls':>7} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} {'ops/s':>12}")
+    for name, (fn, inputs, iterations) in build_cases(args).items():
+        if args.cases and not name.startswith(tuple(args.cases)):
+            continue
+        result = results[name] = time_calls(fn, inputs, iterations, min(args.warmup, iterations))
+        print(f"{name:<40} {result['count']:>7} {result['p50_us']:>10.1f} {result['p95_us']:>10.1f} {result['p99_us']:>10.1f} {result['ops_per_s']:>12.1f}")
+
+    params = {key: value for key, value in vars(args).items() if key not in ("output", "compare", "threshold")}
+    path = save_results("micro", params, results, args.output)
+    print(f"\nSaved {path}")
+    if args.compare:
+        baseline = load_results(args.compare)
+        current = load_results(path)
+        rows = compare_results(baseline, current, args.threshold)
+        print()
+        print_comparison(rows, baseline, current)
+        return 1 if any(row[5] for row in rows) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(cli())
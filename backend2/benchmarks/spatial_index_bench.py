@@ -0,0 +1,210 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spatial_index import SpatialIndex, SPATIAL_LAYERS_PATH, SPATIAL_INDEX_CELL_DEG
+
+# Checks the spatial index against the if/elif chains it replaced (kept below
+# verbatim as the reference) and times single and batch lookups. Test points
+# include every box edge exactly and just either side of it, since the chains
+# are order-dependent there.
+
+def legacy_soil_infiltration_rate(latitude: float, longitude: float) -> float:
+    if 8 <= latitude <= 12:
+        if 76 <= longitude <= 78:
+            return 8.5
+        elif 75 <= longitude <= 77:
+            return 22.0
+        else:
+            return 12.0
+    elif 12 <= latitude <= 15:
+        if 74 <= longitude <= 78:
+            return 15.5
+        elif 77 <= longitude <= 80:
+            return 6.5
+        else:
+            return 11.0
+    elif 15 <= latitude <= 20:
+        if 72 <= longitude <= 78:
+            return 9.2
+        elif 78 <= longitude <= 82:
+            return 18.5
+        else:
+            return 12.8
+    elif 20 <= latitude <= 24:
+        if 75 <= longitude <= 82:
+            return 25.5
+        elif 82 <= longitude <= 87:
+            return 16.2
+        else:
+            return 19.0
+    elif 24 <= latitude <= 28:
+        if 70 <= longitude <= 78:
+            return 35.8
+        elif 78 <= longitude <= 85:
+            return 42.5
+        else:
+            return 28.0
+    elif 28 <= latitude <= 32:
+        if 74 <= longitude <= 78:
+            return 31.2
+        elif 75 <= longitude <= 77:
+            return 26.8
+        else:
+            return 33.5
+    else:
+        return 20.0
+
+def legacy_aquifer_type(latitude: float, longitude: float) -> str:
+    if 8 <= latitude <= 15:
+        if 72 <= longitude <= 76:
+            return "Fractured Rock Aquifer in Precambrian Crystallines"
+        else:
+            return "Phreatic Aquifer in Peninsular Gneissic Complex"
+    elif 15 <= latitude <= 23:
+        return "Mixed Aquifer in Deccan Trap Basalts"
+    elif 23 <= latitude <= 30:
+        return "Alluvial Aquifer in Indo-Gangetic Plains"
+    else:
+        return "Mountain Aquifer in Tertiary Formations"
+
+def legacy_district(latitude: float, longitude: float) -> str:
+    if 12.8 <= latitude <= 13.2 and 77.3 <= longitude <= 77.8:
+        return "Bengaluru Urban"
+    elif 12.4 <= latitude <= 12.8 and 77.0 <= longitude <= 77.4:
+        return "Ramanagara"
+    elif 12.2 <= latitude <= 12.6 and 76.5 <= longitude <= 77.0:
+        return "Mysuru"
+    elif 13.0 <= latitude <= 13.5 and 77.0 <= longitude <= 77.6:
+        return "Tumakuru"
+    elif 13.3 <= latitude <= 13.8 and 77.2 <= longitude <= 77.8:
+        return "Chikkaballapur"
+    elif 12.0 <= latitude <= 12.4 and 77.4 <= longitude <= 78.0:
+        return "Chamarajanagar"
+    elif 12.8 <= latitude <= 13.3 and 79.8 <= longitude <= 80.3:
+        return "Chennai"
+    elif 11.0 <= latitude <= 11.5 and 76.8 <= longitude <= 77.3:
+        return "Coimbatore"
+    elif 10.7 <= latitude <= 11.2 and 78.0 <= longitude <= 78.5:
+        return "Madurai"
+    elif 17.2 <= latitude <= 17.8 and 78.2 <= longitude <= 78.8:
+        return "Hyderabad"
+    elif 15.8 <= latitude <= 16.4 and 80.8 <= longitude <= 81.4:
+        return "Vijayawada"
+    elif 9.8 <= latitude <= 10.2 and 76.2 <= longitude <= 76.8:
+        return "Kochi"
+    elif 8.4 <= latitude <= 8.9 and 76.8 <= longitude <= 77.4:
+        return "Thiruvananthapuram"
+    elif 18.8 <= latitude <= 19.4 and 72.6 <= longitude <= 73.2:
+        return "Mumbai Suburban"
+    elif 18.4 <= latitude <= 18.8 and 73.6 <= longitude <= 74.2:
+        return "Pune"
+    elif 8 <= latitude <= 15:
+        return "Bengaluru Urban"
+    elif 15 <= latitude <= 20:
+        return "Pune"
+    elif 20 <= latitude <= 25:
+        return "Bhopal"
+    elif 25 <= latitude <= 32:
+        return "Delhi"
+    else:
+        return "Bengaluru Urban"
+
+LEGACY = {
+    "district": legacy_district,
+    "soil_infiltration_mm_hr": legacy_soil_infiltration_rate,
+    "aquifer_type": legacy_aquifer_type,
+}
+
+# Single lookups behind one recommend_recharge_structure call after a
+# hydrogeology lookup: district for the GWL model and the location cost factor,
+# aquifer for the site, soil for the design and the water balance
+LOOKUPS_PER_RECOMMENDATION = {"district": 2, "soil_infiltration_mm_hr": 2, "aquifer_type": 1}
+
+def test_points(index: SpatialIndex, n_random: int, seed: int) -> tuple:
+    rng = np.random.default_rng(seed)
+    latitudes = [rng.uniform(5, 36, n_random)]
+    longitudes = [rng.uniform(66, 99, n_random)]
+
+    # Every edge value, exactly and one ulp either side, crossed with the other axis's edges
+    edge_lats, edge_lons = set(), set()
+    for layer in index.layers.values():
+        edge_lats.update(v for v in np.concatenate([layer.min_lat, layer.max_lat]) if np.isfinite(v))
+        edge_lons.update(v for v in np.concatenate([layer.min_lon, layer.max_lon]) if np.isfinite(v))
+    widen = lambda values: np.unique(np.concatenate([np.nextafter(values, -np.inf), values, np.nextafter(values, np.inf)]))
+    lat_grid, lon_grid = np.meshgrid(widen(np.array(sorted(edge_lats))), widen(np.array(sorted(edge_lons))), indexing="ij")
+    latitudes.append(lat_grid.ravel())
+    longitudes.append(lon_grid.ravel())
+
+    # Off-grid and invalid coordinates fall through to the defaults
+    latitudes.append(np.array([-90.0, 90.0, 0.0, np.nan, 12.97, np.inf]))
+    longitudes.append(np.array([0.0, 180.0, 77.5, 77.5, np.nan, 77.5]))
+    return np.concatenate(latitudes), np.concatenate(longitudes)
+
+def check_equivalence(index: SpatialIndex, latitudes: np.ndarray, longitudes: np.ndarray) -> dict:
+    mismatches = {}
+    for name, legacy in LEGACY.items():
+        expected = [legacy(float(lat), float(lon)) for lat, lon in zip(latitudes, longitudes)]
+        batch = index.lookup_many(name, latitudes, longitudes).tolist()
+        single = [index.lookup(name, float(lat), float(lon)) for lat, lon in zip(latitudes, longitudes)]
+        bad = [i for i, (e, b, s) in enumerate(zip(expected, batch, single)) if not (e == b == s)]
+        mismatches[name] = {"points": len(expected), "mismatches": len(bad), "examples": [
+            (float(latitudes[i]), float(longitudes[i]), expected[i], batch[i], single[i]) for i in bad[:5]
+        ]}
+    return mismatches
+
+def time_lookups(index: SpatialIndex, n: int, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    latitudes, longitudes = rng.uniform(8, 32, n), rng.uniform(68, 90, n)
+    rows = []
+    for name, legacy in LEGACY.items():
+        started = time.perf_counter()
+        for lat, lon in zip(latitudes.tolist(), longitudes.tolist()):
+            legacy(lat, lon)
+        legacy_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for lat, lon in zip(latitudes.tolist(), longitudes.tolist()):
+            index.lookup(name, lat, lon)
+        single_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        index.lookup_many(name, latitudes, longitudes)
+        batch_s = time.perf_counter() - started
+        rows.append((name, legacy_s / n * 1e6, single_s / n * 1e6, batch_s / n * 1e6))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Spatial index equivalence check and benchmark.")
+    parser.add_argument("--layers", default=SPATIAL_LAYERS_PATH)
+    parser.add_argument("--cell-deg", type=float, default=SPATIAL_INDEX_CELL_DEG)
+    parser.add_argument("--points", type=int, default=20000, help="Random points for the equivalence check.")
+    parser.add_argument("--timing-points", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    index = SpatialIndex.load(args.layers, args.cell_deg)
+    latitudes, longitudes = test_points(index, args.points, args.seed)
+    failed = False
+    for name, result in check_equivalence(index, latitudes, longitudes).items():
+        print(f"{name:>24}: {result['mismatches']} mismatches in {result['points']} points")
+        for example in result["examples"]:
+            print(f"{'':>26}lat={example[0]!r} lon={example[1]!r} legacy={example[2]!r} batch={example[3]!r} single={example[4]!r}")
+        failed = failed or result["mismatches"] > 0
+
+    print(f"\n{'layer':>24} {'legacy us':>10} {'single us':>10} {'batch us':>10}")
+    rows = time_lookups(index, args.timing_points, args.seed)
+    for name, legacy_us, single_us, batch_us in rows:
+        print(f"{name:>24} {legacy_us:>10.3f} {single_us:>10.3f} {batch_us:>10.3f}")
+    legacy_total = sum(LOOKUPS_PER_RECOMMENDATION[name] * legacy_us for name, legacy_us, _, _ in rows)
+    single_total = sum(LOOKUPS_PER_RECOMMENDATION[name] * single_us for name, _, single_us, _ in rows)
+    print(f"{'per recommendation':>24} {legacy_total:>10.3f} {single_total:>10.3f} {'':>10}  "
+          f"({sum(LOOKUPS_PER_RECOMMENDATION.values())} single lookups, {single_total - legacy_total:+.2f} us net)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
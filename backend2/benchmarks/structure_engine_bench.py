@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "not-used")
+
+import main
+import structure_engine as engine
+
+# Checks the array engine against the scalar functions in main.py and compares
+# per-site cost. Both sides design all four structure types for every site.
+# The measured speedup is reported against --target-speedup; missing either the
+# exact match or the target makes the run fail.
+
+def random_sites(n: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    roof_area = np.round(rng.uniform(20, 2000, n), 1)
+    # Include round values so category thresholds are hit exactly
+    roof_area[: n // 20] = rng.choice([100.0, 200.0], n // 20)
+    groundwater_depth = rng.uniform(0.5, 60, n)
+    soil_infiltration = rng.choice([6.5, 8.5, 9.2, 11.0, 12.0, 12.8, 15.5, 16.2, 18.5, 19.0, 20.0, 22.0, 25.5, 26.8, 28.0, 31.2, 33.5, 35.8, 42.5], n)
+    annual_rainfall = rng.uniform(300, 3000, n)
+    runoff_liters = (roof_area * annual_rainfall * 0.85).astype(np.int64)
+    location_factor = rng.uniform(0.8, 1.4, n)
+    return {
+        "roof_area": roof_area,
+        "groundwater_depth": groundwater_depth,
+        "soil_infiltration": soil_infiltration,
+        "runoff_liters": runoff_liters,
+        "location_factor": location_factor,
+    }
+
+def scalar_design(sites: dict) -> dict:
+    n = len(sites["roof_area"])
+    out = {
+        "scores": np.zeros((n, 4), dtype=np.int64),
+        "recommended": np.zeros(n, dtype=np.int64),
+        "volume_m3": np.zeros((n, 4)),
+        "dimensions": np.empty((n, 4), dtype=object),
+        "total_cost": np.zeros((n, 4), dtype=np.int64),
+        "subsidy": np.zeros((n, 4), dtype=np.int64),
+        "total_savings": np.zeros(n, dtype=np.int64),
+    }
+    for i in range(n):
+        area = float(sites["roof_area"][i])
+        depth = float(sites["groundwater_depth"][i])
+        infiltration = float(sites["soil_infiltration"][i])
+        runoff = int(sites["runoff_liters"][i])
+        daily_runoff = runoff / 365
+        peak_runoff = daily_runoff * 2.5
+
+        evaluation = main.evaluate_site_conditions(area, depth, infiltration, daily_runoff)
+        out["scores"][i] = [evaluation["structure_scores"][s] for s in engine.STRUCTURE_TYPES]
+        out["recommended"][i] = engine.STRUCTURE_TYPES.index(evaluation["recommended_structure"])
+        for j, structure in enumerate(engine.STRUCTURE_TYPES):
+            dimensions = main.calculate_structure_dimensions(structure, daily_runoff, peak_runoff, infiltration, depth)
+            cost = main.calculate_realistic_structure_cost(structure, dimensions["volume_m3"], float(sites["location_factor"][i]))
+            out["volume_m3"][i, j] = dimensions["volume_m3"]
+            out["dimensions"][i, j] = dimensions["dimensions"]
+            out["total_cost"][i, j] = cost["total_cost"]
+            out["subsidy"][i, j] = main.get_government_subsidy(structure, cost["total_cost"])
+        out["total_savings"][i] = main.calculate_accurate_rwh_savings(runoff, depth, area)["savings_breakdown"]["total_annual_savings"]
+    return out
+
+def engine_design(sites: dict) -> dict:
+    return engine.design_sites(
+        sites["roof_area"],
+        sites["groundwater_depth"],
+        sites["soil_infiltration"],
+        sites["runoff_liters"],
+        sites["location_factor"],
+    )
+
+def compare(scalar: dict, vector: dict, check_strings: int) -> list:
+    mismatches = []
+    checks = {
+        "scores": vector["evaluation"]["structure_scores"],
+        "recommended": vector["evaluation"]["recommended_structure"],
+        "volume_m3": vector["volume_m3"],
+        "total_cost": vector["costs"]["total_cost"],
+        "subsidy": vector["subsidy"],
+        "total_savings": vector["savings"]["total_annual_savings"],
+    }
+    for name, values in checks.items():
+        differs = np.asarray(values) != scalar[name]
+        bad = np.flatnonzero(differs.any(axis=1) if differs.ndim == 2 else differs)
+        if len(bad):
+            mismatches.append(f"{name}: {len(bad)} sites differ, first at {bad[0]}")
+    for i in range(min(check_strings, len(scalar["dimensions"]))):
+        for j in range(4):
+            if engine.format_dimensions(vector["dimensions"], j, i) != scalar["dimensions"][i, j]:
+                mismatches.append(f"dimensions text differs at site {i}, structure {j}")
+    return mismatches
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Equivalence check and benchmark for the vectorized structure engine.")
+    parser.add_argument("--sites", type=int, default=100_000)
+    parser.add_argument("--scalar-sites", type=int, default=10_000, help="Sites timed on the scalar path (per-site cost is extrapolated).")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--target-speedup", type=float, default=100.0, help="Required engine speedup per site over the scalar path.")
+    args = parser.parse_args(argv)
+
+    sites = random_sites(args.sites, args.seed)
+    scalar_subset = {k: v[: args.scalar_sites] for k, v in sites.items()}
+
+    started = time.perf_counter()
+    scalar = scalar_design(scalar_subset)
+    scalar_per_site = (time.perf_counter() - started) / args.scalar_sites
+
+    engine_design(sites)  # warm-up
+    started = time.perf_counter()
+    vector = engine_design(sites)
+    vector_per_site = (time.perf_counter() - started) / args.sites
+
+    vector_subset = engine_design(scalar_subset)
+    mismatches = compare(scalar, vector_subset, check_strings=2000)
+
+    print(f"scalar: {scalar_per_site * 1e6:8.2f} us/site ({args.scalar_sites} sites)")
+    print(f"engine: {vector_per_site * 1e6:8.3f} us/site ({args.sites} sites)")
+    speedup = scalar_per_site / vector_per_site
+    target_met = speedup >= args.target_speedup
+    print(f"speedup: {speedup:.1f}x (target {args.target_speedup:.0f}x: {'met' if target_met else 'NOT met'})")
+    if mismatches:
+        print("MISMATCH:")
+        for line in mismatches:
+            print(f"  {line}")
+        return 1
+    print(f"engine matches scalar functions on {args.scalar_sites} sites x 4 structures")
+    return 0 if target_met else 2
+
+if __name__ == "__main__":
+    sys.exit(cli())
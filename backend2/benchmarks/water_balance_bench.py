@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import water_balance
+from structure_engine import design_sites
+
+# Checks both simulation paths (prefix scan and day loop) against a plain
+# Python loop over the days, then times the simulation per site over a
+# synthetic monsoon series of the archive's length.
+
+def synthetic_rainfall(days: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    day_of_year = np.arange(days) % 365
+    monsoon = (day_of_year >= 150) & (day_of_year < 275)
+    wet = rng.random(days) < np.where(monsoon, 0.6, 0.08)
+    return np.where(wet, rng.gamma(0.8, np.where(monsoon, 18, 6)), 0.0).astype(np.float32)
+
+def reference_totals(precipitation: np.ndarray, inflow_per_mm: np.ndarray, drain: np.ndarray, capacity: np.ndarray) -> dict:
+    n = len(capacity)
+    totals = {"final_storage": np.zeros(n), "overflow": np.zeros(n), "overflow_days": np.zeros(n), "full_days": np.zeros(n)}
+    for s in range(n):
+        level = 0.0
+        for rain in precipitation.tolist():
+            level += rain * inflow_per_mm[s] - drain[s]
+            excess = max(level - capacity[s], 0.0)
+            totals["overflow"][s] += excess
+            totals["overflow_days"][s] += excess > 1e-9
+            level = min(max(level, 0.0), capacity[s])
+            totals["full_days"][s] += level >= capacity[s] - 1e-9
+        totals["final_storage"][s] = level
+    return totals
+
+def random_designs(n: int, seed: int) -> tuple:
+    rng = np.random.default_rng(seed)
+    roof_area = rng.uniform(20, 2000, n)
+    soil_infiltration = rng.choice([6.5, 12.0, 15.5, 25.5, 42.5], n)
+    runoff_liters = (roof_area * rng.uniform(400, 2500, n) * 0.85).astype(np.int64)
+    design = design_sites(roof_area, rng.uniform(1, 40, n), soil_infiltration, runoff_liters, rng.uniform(0.8, 1.4, n))
+    return roof_area, soil_infiltration, design
+
+def time_call(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return sorted(times)[len(times) // 2]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Water-balance simulation equivalence check and benchmark.")
+    parser.add_argument("--years", type=int, default=34)
+    parser.add_argument("--check-scenarios", type=int, default=12)
+    parser.add_argument("--sites", type=int, nargs="+", default=[1, 4, 16, 64, 256])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    days = int(args.years * water_balance.DAYS_PER_YEAR)
+    rainfall = synthetic_rainfall(days, args.seed)
+    rng = np.random.default_rng(args.seed)
+    inflow_per_mm = rng.uniform(20, 2000, args.check_scenarios) * water_balance.RUNOFF_COEFFICIENT / 1000
+    drain = rng.uniform(0.1, 5, args.check_scenarios)
+    capacity = rng.uniform(0.1, 10, args.check_scenarios)
+    expected = reference_totals(rainfall.astype(np.float64), inflow_per_mm, drain, capacity)
+    errors = {}
+    for name, path in (("scan", water_balance.scanned_totals), ("day loop", water_balance.stepped_totals)):
+        totals = path(rainfall.astype(np.float64)[:, None], inflow_per_mm, drain, capacity)
+        errors[name] = max(float(np.abs(totals[key] - expected[key]).max()) for key in expected)
+    print("max error vs Python loop: " + ", ".join(f"{name} {error:.2e}" for name, error in errors.items()))
+
+    print(f"\n{'sites':>6} {'scenarios':>10} {'ms':>8} {'ms/site':>8} {'ms/site-decade':>15}")
+    for n in args.sites:
+        roof_area, soil_infiltration, design = random_designs(n, args.seed)
+        seconds = time_call(lambda: water_balance.simulate_designs(rainfall, roof_area, design, soil_infiltration), args.repeat)
+        ms = seconds * 1000
+        print(f"{n:>6} {n * 4:>10} {ms:>8.1f} {ms / n:>8.2f} {ms / n / (args.years / 10):>15.2f}")
+    return 1 if max(errors.values()) > 1e-9 else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
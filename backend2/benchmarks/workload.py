@@ -0,0 +1,36 @@
+import numpy as np
+from spatial_index import get_spatial_index
+
+# Sites for micro_bench.py and load_test.py: points scattered around city
+# centres across India, so every one is on land and the district, soil and
+# aquifer layers, the GWL model and the fake archive's rainfall all vary.
+
+CITY_CENTRES = [
+    (12.97, 77.59),  # Bengaluru
+    (12.30, 76.64),  # Mysuru
+    (12.91, 74.86),  # Mangaluru
+    (13.08, 80.27),  # Chennai
+    (11.02, 76.96),  # Coimbatore
+    (9.93, 76.27),   # Kochi
+    (17.39, 78.49),  # Hyderabad
+    (16.51, 80.65),  # Vijayawada
+    (18.52, 73.86),  # Pune
+    (19.08, 72.88),  # Mumbai
+    (21.15, 79.09),  # Nagpur
+    (23.26, 77.41),  # Bhopal
+    (23.02, 72.57),  # Ahmedabad
+    (26.91, 75.79),  # Jaipur
+    (28.61, 77.21),  # Delhi
+    (26.85, 80.95),  # Lucknow
+    (22.57, 88.36),  # Kolkata
+    (26.14, 91.74),  # Guwahati
+]
+SPREAD_DEG = 0.25
+
+def sample_sites(n: int, seed: int = 0) -> list:
+    # [(district, latitude, longitude)], cycling through the cities
+    rng = np.random.default_rng(seed)
+    centres = np.array([CITY_CENTRES[i % len(CITY_CENTRES)] for i in range(n)])
+    points = np.round(centres + rng.uniform(-SPREAD_DEG, SPREAD_DEG, (n, 2)), 4)
+    index = get_spatial_index()
+    return [(index.lookup("district", lat, lon), lat, lon) for lat, lon in points.tolist()]
@@ -0,0 +1,353 @@
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import asyncio
+import argparse
+import numpy as np
+from collections import OrderedDict
+from http_pool import http_client
+from singleflight import climate_flight
+from timing import span
+
+# Open-Meteo archive settings; the URL can point at a local stand-in (benchmarks/fake_open_meteo.py)
+ARCHIVE_URL = os.getenv("OPEN_METEO_ARCHIVE_URL", "https://archive-api.open-meteo.com/v1/archive")
+ARCHIVE_START_DATE = "1990-01-01"
+ARCHIVE_END_DATE = "2023-12-31"
+
+DEFAULT_ANNUAL_RAINFALL_MM = 970
+DEFAULT_TEMPERATURE_CELSIUS = 25.0
+
+# Cache settings
+CLIMATE_GRID_DEG = float(os.getenv("CLIMATE_GRID_DEG", "0.05"))
+CLIMATE_CACHE_SIZE = int(os.getenv("CLIMATE_CACHE_SIZE", "4096"))
+# A 34-year daily series is ~50 KB, so far fewer of them are kept in memory
+CLIMATE_SERIES_CACHE_SIZE = int(os.getenv("CLIMATE_SERIES_CACHE_SIZE", "128"))
+CLIMATE_CACHE_PATH = os.getenv(
+    "CLIMATE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "climate_cache.sqlite3"),
+)
+
+def snap_to_grid(latitude: float, longitude: float, grid_deg: float = None) -> tuple:
+    grid = grid_deg or CLIMATE_GRID_DEG
+    # Round the snapped value so float noise does not leak into the cache key
+    return (
+        round(round(latitude / grid) * grid, 6),
+        round(round(longitude / grid) * grid, 6),
+    )
+
+def summarize_daily(weather_data: dict) -> dict:
+    daily = weather_data.get('daily', {})
+    daily_precip = daily.get('precipitation_sum', [])
+    daily_temp_max = daily.get('temperature_2m_max', [])
+
+    if not daily_precip:
+        raise ValueError("Archive response contains no precipitation data")
+
+    valid_precip = [p for p in daily_precip if p is not None]
+    total_precip = sum(valid_precip)
+    num_years = len(daily['time']) / 365.25
+    avg_annual_rainfall_mm = round(total_precip / num_years) if num_years > 0 else DEFAULT_ANNUAL_RAINFALL_MM
+
+    valid_temp = [t for t in daily_temp_max if t is not None]
+    avg_temp = sum(valid_temp) / len(valid_temp) if valid_temp else DEFAULT_TEMPERATURE_CELSIUS
+
+    return {
+        "annual_rainfall_mm": avg_annual_rainfall_mm,
+        "average_temperature_celsius": avg_temp,
+    }
+
+def daily_precipitation(weather_data: dict) -> np.ndarray:
+    values = weather_data.get('daily', {}).get('precipitation_sum', [])
+    return np.array([np.nan if p is None else p for p in values], dtype=np.float32)
+
+async def fetch_archive(latitude: float, longitude: float) -> dict:
+    params = {
+        "latitude": latitude,
+        "longitude": longitude,
+        "start_date": ARCHIVE_START_DATE,
+        "end_date": ARCHIVE_END_DATE,
+        "daily": "precipitation_sum,temperature_2m_max",
+    }
+    async with span("open_meteo.archive"):
+        response = await http_client.get(ARCHIVE_URL, params=params)
+        response.raise_for_status()
+        return response.json()
+
+# Both fetchers keep what the other cache needs from the same download, so a
+# cell is fetched once whichever of its summary or daily series is asked for first
+
+async def fetch_climate_summary(latitude: float, longitude: float) -> dict:
+    weather_data = await fetch_archive(latitude, longitude)
+    summary = summarize_daily(weather_data)
+    climate_series.put(latitude, longitude, daily_precipitation(weather_data))
+    return summary
+
+async def fetch_daily_precipitation(latitude: float, longitude: float) -> np.ndarray:
+    weather_data = await fetch_archive(latitude, longitude)
+    precipitation = daily_precipitation(weather_data)
+    climate_cache.put(latitude, longitude, summarize_daily(weather_data))
+    return precipitation
+
+class ClimateCache:
+    def __init__(self, max_entries: int = CLIMATE_CACHE_SIZE, db_path: str = CLIMATE_CACHE_PATH, grid_deg: float = CLIMATE_GRID_DEG):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.grid_deg = grid_deg
+        self._memory = OrderedDict()
+        self._disk_enabled = bool(db_path)
+        self.stats = {"store_hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "disk_errors": 0}
+        if self._disk_enabled:
+            self._init_disk()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5.0)
+
+    def _init_disk(self):
+        try:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS climate_summary ("
+                    "cell TEXT PRIMARY KEY, payload TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+        except sqlite3.Error as e:
+            print(f"Climate disk cache unavailable ({e}); using in-memory tier only.")
+            self._disk_enabled = False
+
+    def key_for(self, latitude: float, longitude: float) -> str:
+        lat, lon = snap_to_grid(latitude, longitude, self.grid_deg)
+        return f"{self.grid_deg}:{lat:.6f}:{lon:.6f}"
+
+    def _remember(self, key: str, value: dict):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _disk_get(self, key: str):
+        if not self._disk_enabled:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT payload FROM climate_summary WHERE cell = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            self.stats["disk_errors"] += 1
+            return None
+        return json.loads(row[0]) if row else None
+
+    def _disk_put(self, key: str, value: dict):
+        if not self._disk_enabled:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO climate_summary (cell, payload, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), time.time()),
+                )
+        except sqlite3.Error:
+            self.stats["disk_errors"] += 1
+
+    def get(self, latitude: float, longitude: float):
+        key = self.key_for(latitude, longitude)
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return self._memory[key]
+
+        value = self._disk_get(key)
+        if value is not None:
+            self.stats["disk_hits"] += 1
+            self._remember(key, value)
+            return value
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, latitude: float, longitude: float, value: dict):
+        key = self.key_for(latitude, longitude)
+        self._remember(key, value)
+        self._disk_put(key, value)
+
+    async def get_or_fetch(self, latitude: float, longitude: float, fetcher=fetch_climate_summary) -> dict:
+        cached = self.get(latitude, longitude)
+        if cached is not None:
+            return cached
+
+        # Fetch at the cell centre so every point in the cell shares one value,
+        # and let concurrent misses for the same cell share a single download
+        cell_lat, cell_lon = snap_to_grid(latitude, longitude, self.grid_deg)
+
+        async def fetch_and_store():
+            value = await fetcher(cell_lat, cell_lon)
+            self.put(cell_lat, cell_lon, value)
+            return value
+
+        return await climate_flight.do(self.key_for(latitude, longitude), fetch_and_store)
+
+    def get_stats(self) -> dict:
+        hits = self.stats["store_hits"] + self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "grid_deg": self.grid_deg,
+            "disk_enabled": self._disk_enabled,
+        }
+
+class ClimateSeriesCache(ClimateCache):
+    # Daily precipitation per cell for the water-balance simulation, stored on
+    # disk as zlib-compressed float32 next to the summaries
+    def __init__(self, max_entries: int = CLIMATE_SERIES_CACHE_SIZE, db_path: str = CLIMATE_CACHE_PATH, grid_deg: float = CLIMATE_GRID_DEG):
+        super().__init__(max_entries, db_path, grid_deg)
+
+    def _init_disk(self):
+        try:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS climate_series ("
+                    "cell TEXT PRIMARY KEY, precipitation BLOB NOT NULL, created_at REAL NOT NULL)"
+                )
+        except sqlite3.Error as e:
+            print(f"Climate series disk cache unavailable ({e}); using in-memory tier only.")
+            self._disk_enabled = False
+
+    def key_for(self, latitude: float, longitude: float) -> str:
+        # Distinct from the summary keys, which share the single-flight group
+        return "series:" + super().key_for(latitude, longitude)
+
+    def _disk_get(self, key: str):
+        if not self._disk_enabled:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT precipitation FROM climate_series WHERE cell = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            self.stats["disk_errors"] += 1
+            return None
+        return np.frombuffer(zlib.decompress(row[0]), dtype=np.float32) if row else None
+
+    def _disk_put(self, key: str, value: np.ndarray):
+        if not self._disk_enabled:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO climate_series (cell, precipitation, created_at) VALUES (?, ?, ?)",
+                    (key, zlib.compress(np.asarray(value, dtype=np.float32).tobytes()), time.time()),
+                )
+        except sqlite3.Error:
+            self.stats["disk_errors"] += 1
+
+climate_cache = ClimateCache()
+climate_series = ClimateSeriesCache()
+
+async def get_climate_summary(latitude: float, longitude: float) -> dict:
+    # Imported here because the store builder reuses summarize_daily from this module
+    from climate_store import get_climate_store
+
+    store = get_climate_store()
+    if store is not None:
+        summary = store.lookup(latitude, longitude)
+        if summary is not None:
+            climate_cache.stats["store_hits"] += 1
+            return summary
+
+    return await climate_cache.get_or_fetch(latitude, longitude)
+
+def stored_daily_precipitation(latitude: float, longitude: float):
+    from climate_store import get_climate_store
+
+    store = get_climate_store()
+    series = store.daily_series(latitude, longitude) if store is not None else None
+    if series is None:
+        return None
+    climate_series.stats["store_hits"] += 1
+    return series["precipitation_sum"]
+
+def cached_daily_precipitation(latitude: float, longitude: float):
+    # Store or cache only, never the network; None when the cell has no series yet
+    precipitation = stored_daily_precipitation(latitude, longitude)
+    return precipitation if precipitation is not None else climate_series.get(latitude, longitude)
+
+async def get_daily_precipitation(latitude: float, longitude: float) -> np.ndarray:
+    precipitation = stored_daily_precipitation(latitude, longitude)
+    if precipitation is not None:
+        return precipitation
+    return await climate_series.get_or_fetch(latitude, longitude, fetch_daily_precipitation)
+
+def read_coordinates(path: str) -> list:
+    coordinates = []
+    with open(path) as f:
+        for line in f:
+            parts = [p.strip() for p in line.replace(";", ",").split(",")]
+            if len(parts) < 2:
+                continue
+            try:
+                coordinates.append((float(parts[0]), float(parts[1])))
+            except ValueError:
+                # Header row or malformed line
+                continue
+    return coordinates
+
+async def warm_cache(coordinates: list, concurrency: int = 4) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    cells = {}
+    for lat, lon in coordinates:
+        cells.setdefault(climate_cache.key_for(lat, lon), (lat, lon))
+
+    failed = []
+
+    async def warm_one(lat: float, lon: float):
+        async with semaphore:
+            try:
+                await climate_cache.get_or_fetch(lat, lon)
+            except Exception as e:
+                failed.append({"latitude": lat, "longitude": lon, "error": str(e)})
+
+    await asyncio.gather(*(warm_one(lat, lon) for lat, lon in cells.values()))
+    return {"requested": len(coordinates), "cells": len(cells), "failed": failed, "stats": climate_cache.get_stats()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rainfall climatology cache tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    warm = subparsers.add_parser("warm", help="Pre-fill the cache for a CSV of latitude,longitude rows.")
+    warm.add_argument("coordinates_file")
+    warm.add_argument("--concurrency", type=int, default=4)
+
+    subparsers.add_parser("stats", help="Show cache statistics for the on-disk tier.")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "warm":
+        coordinates = read_coordinates(args.coordinates_file)
+        print(f"Warming climate cache for {len(coordinates)} coordinates...")
+
+        async def run_warm():
+            try:
+                return await warm_cache(coordinates, args.concurrency)
+            finally:
+                await http_client.aclose()
+
+        summary = asyncio.run(run_warm())
+        print(json.dumps(summary, indent=2))
+        return 1 if summary["failed"] else 0
+
+    if args.command == "stats":
+        if not climate_cache._disk_enabled:
+            print("Disk tier disabled.")
+            return 1
+        with climate_cache._connect() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM climate_summary").fetchone()[0]
+        print(json.dumps({"disk_entries": count, "db_path": climate_cache.db_path, "grid_deg": climate_cache.grid_deg}, indent=2))
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+import os
+import sys
+import csv
+import json
+import glob
+import argparse
+import numpy as np
+from climate import CLIMATE_GRID_DEG, summarize_daily
+
+# File layout: MAGIC | uint32 header length | JSON header | padding | columns.
+# Every column starts on a 64-byte boundary so it can be memory-mapped directly.
+MAGIC = b"RWHCLIM1"
+ALIGNMENT = 64
+KEY_OFFSET = 1 << 20
+
+CLIMATE_STORE_PATH = os.getenv(
+    "CLIMATE_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "climate_store.bin"),
+)
+
+def grid_index(latitude, longitude, grid_deg: float):
+    lat_idx = np.rint(np.asarray(latitude, dtype=np.float64) / grid_deg).astype(np.int64)
+    lon_idx = np.rint(np.asarray(longitude, dtype=np.float64) / grid_deg).astype(np.int64)
+    return lat_idx, lon_idx
+
+def cell_key(latitude, longitude, grid_deg: float):
+    lat_idx, lon_idx = grid_index(latitude, longitude, grid_deg)
+    return ((lat_idx + KEY_OFFSET) << 32) | (lon_idx + KEY_OFFSET)
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def load_open_meteo_json(path: str) -> list:
+    with open(path) as f:
+        data = json.load(f)
+    # Accept both a single archive response and a list of responses
+    responses = data if isinstance(data, list) else [data]
+    cells = []
+    for response in responses:
+        daily = response.get("daily", {})
+        cells.append({
+            "latitude": float(response["latitude"]),
+            "longitude": float(response["longitude"]),
+            "time": daily.get("time", []),
+            "precipitation_sum": daily.get("precipitation_sum", []),
+            "temperature_2m_max": daily.get("temperature_2m_max", []),
+        })
+    return cells
+
+def load_daily_csv(path: str) -> list:
+    # Long format: latitude,longitude,time,precipitation_sum,temperature_2m_max
+    cells = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            key = (float(row["latitude"]), float(row["longitude"]))
+            cell = cells.setdefault(key, {
+                "latitude": key[0],
+                "longitude": key[1],
+                "time": [],
+                "precipitation_sum": [],
+                "temperature_2m_max": [],
+            })
+            cell["time"].append(row["time"])
+            cell["precipitation_sum"].append(float(row["precipitation_sum"]) if row.get("precipitation_sum") not in (None, "") else None)
+            cell["temperature_2m_max"].append(float(row["temperature_2m_max"]) if row.get("temperature_2m_max") not in (None, "") else None)
+    return list(cells.values())
+
+def _to_float32(values: list, n_days: int) -> np.ndarray:
+    column = np.full(n_days, np.nan, dtype=np.float32)
+    column[:len(values)] = np.array([np.nan if v is None else v for v in values], dtype=np.float32)
+    return column
+
+def build_store(cells: list, output_path: str, grid_deg: float = CLIMATE_GRID_DEG) -> dict:
+    if not cells:
+        raise ValueError("No climate cells to ingest")
+
+    # Later inputs for the same grid cell replace earlier ones
+    by_key = {}
+    for cell in cells:
+        by_key[int(cell_key(cell["latitude"], cell["longitude"], grid_deg))] = cell
+
+    keys = np.array(sorted(by_key), dtype=np.int64)
+    ordered = [by_key[int(k)] for k in keys]
+    n_cells = len(ordered)
+    n_days = max(len(c["time"]) for c in ordered)
+    start_date = min((c["time"][0] for c in ordered if c["time"]), default=None)
+
+    # Summaries are computed from the original values with the same code as the
+    # live path, so stored answers match a network fetch exactly.
+    annual_rainfall = np.zeros(n_cells, dtype=np.int32)
+    avg_temp = np.zeros(n_cells, dtype=np.float64)
+    precip = np.empty((n_cells, n_days), dtype=np.float32)
+    temp_max = np.empty((n_cells, n_days), dtype=np.float32)
+    for i, cell in enumerate(ordered):
+        summary = summarize_daily({"daily": cell})
+        annual_rainfall[i] = summary["annual_rainfall_mm"]
+        avg_temp[i] = summary["average_temperature_celsius"]
+        precip[i] = _to_float32(cell["precipitation_sum"], n_days)
+        temp_max[i] = _to_float32(cell["temperature_2m_max"], n_days)
+
+    columns = [
+        ("keys", keys),
+        ("annual_rainfall_mm", annual_rainfall),
+        ("average_temperature_celsius", avg_temp),
+        ("precipitation_sum", precip),
+        ("temperature_2m_max", temp_max),
+    ]
+
+    header = {"grid_deg": grid_deg, "n_cells": n_cells, "n_days": n_days, "start_date": start_date, "columns": {}}
+    # Two passes: the header length depends on the offsets it records
+    for _ in range(2):
+        header_bytes = json.dumps(header).encode()
+        offset = _aligned(len(MAGIC) + 4 + len(header_bytes) + ALIGNMENT)
+        for name, array in columns:
+            header["columns"][name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+            offset = _aligned(offset + array.nbytes)
+
+    header_bytes = json.dumps(header).encode()
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint32(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+        for name, array in columns:
+            f.write(b"\0" * (header["columns"][name]["offset"] - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+    # Atomic swap so running workers never map a half-written file
+    os.replace(tmp_path, output_path)
+
+    return {"path": output_path, "cells": n_cells, "days": n_days, "bytes": os.path.getsize(output_path)}
+
+class ClimateStore:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a climate store file")
+            header_len = int(np.frombuffer(f.read(4), dtype=np.uint32)[0])
+            self.header = json.loads(f.read(header_len))
+
+        self.grid_deg = self.header["grid_deg"]
+        self.n_cells = self.header["n_cells"]
+        self.n_days = self.header["n_days"]
+        self.start_date = self.header["start_date"]
+        self.columns = {
+            name: np.memmap(path, mode="r", dtype=np.dtype(spec["dtype"]), offset=spec["offset"], shape=tuple(spec["shape"]))
+            for name, spec in self.header["columns"].items()
+        }
+        self.keys = self.columns["keys"]
+
+    def find(self, latitude, longitude):
+        keys = cell_key(latitude, longitude, self.grid_deg)
+        idx = np.searchsorted(self.keys, keys)
+        idx = np.minimum(idx, self.n_cells - 1)
+        found = self.keys[idx] == keys
+        return np.where(found, idx, -1)
+
+    def lookup(self, latitude: float, longitude: float):
+        idx = int(self.find(latitude, longitude))
+        if idx < 0:
+            return None
+        return {
+            "annual_rainfall_mm": int(self.columns["annual_rainfall_mm"][idx]),
+            "average_temperature_celsius": float(self.columns["average_temperature_celsius"][idx]),
+        }
+
+    def lookup_many(self, latitudes, longitudes) -> dict:
+        idx = np.atleast_1d(self.find(latitudes, longitudes))
+        found = idx >= 0
+        safe = np.where(found, idx, 0)
+        return {
+            "found": found,
+            "annual_rainfall_mm": np.where(found, self.columns["annual_rainfall_mm"][safe], 0),
+            "average_temperature_celsius": np.where(found, self.columns["average_temperature_celsius"][safe], np.nan),
+        }
+
+    def daily_series(self, latitude: float, longitude: float):
+        idx = int(self.find(latitude, longitude))
+        if idx < 0:
+            return None
+        return {
+            "precipitation_sum": self.columns["precipitation_sum"][idx],
+            "temperature_2m_max": self.columns["temperature_2m_max"][idx],
+        }
+
+_store = None
+_store_checked = False
+
+def get_climate_store():
+    global _store, _store_checked
+    if not _store_checked:
+        _store_checked = True
+        if CLIMATE_STORE_PATH and os.path.exists(CLIMATE_STORE_PATH):
+            try:
+                _store = ClimateStore(CLIMATE_STORE_PATH)
+                print(f"Climate store loaded: {_store.n_cells} cells x {_store.n_days} days.")
+            except Exception as e:
+                print(f"Error loading climate store: {e}")
+                _store = None
+    return _store
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the offline columnar climate store.")
+    parser.add_argument("inputs", nargs="+", help="Open-Meteo archive JSON files, long-format CSV files or directories of them.")
+    parser.add_argument("--output", default=CLIMATE_STORE_PATH)
+    parser.add_argument("--grid-deg", type=float, default=CLIMATE_GRID_DEG)
+    args = parser.parse_args(argv)
+
+    paths = []
+    for item in args.inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, "*.json")) + glob.glob(os.path.join(item, "*.csv"))))
+        else:
+            paths.append(item)
+
+    cells = []
+    for path in paths:
+        cells.extend(load_daily_csv(path) if path.endswith(".csv") else load_open_meteo_json(path))
+
+    print(f"Ingesting {len(cells)} cells from {len(paths)} files...")
+    summary = build_store(cells, args.output, args.grid_deg)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
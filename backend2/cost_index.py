@@ -0,0 +1,86 @@
+import os
+import json
+import hashlib
+from functools import lru_cache
+import numpy as np
+from structure_engine import STRUCTURE_TYPES, structure_costs, government_subsidy
+
+COST_INDEX_PATH = os.getenv("COST_INDEX_PATH", "")
+COST_INDEX_GRID_DEG = float(os.getenv("COST_INDEX_GRID_DEG", "0.1"))
+COST_INDEX_MIN = 1.05
+COST_INDEX_MAX = 1.25
+COST_SIMULATION_SPREAD = float(os.getenv("COST_SIMULATION_SPREAD", "0.08"))
+COST_SIMULATION_MAX_DRAWS = int(os.getenv("COST_SIMULATION_MAX_DRAWS", "100000"))
+
+# Construction cost multipliers relative to the base rates in
+# calculate_realistic_structure_cost; metros carry higher labour and material costs.
+DISTRICT_COST_INDEX = {
+    "Mumbai Suburban": 1.25,
+    "Bengaluru Urban": 1.22,
+    "Chennai": 1.20,
+    "Hyderabad": 1.18,
+    "Pune": 1.17,
+    "Kochi": 1.14,
+    "Coimbatore": 1.12,
+    "Thiruvananthapuram": 1.12,
+    "Mysuru": 1.10,
+    "Madurai": 1.09,
+    "Vijayawada": 1.09,
+    "Tumakuru": 1.07,
+    "Ramanagara": 1.07,
+    "Chikkaballapur": 1.06,
+    "Chamarajanagar": 1.05,
+}
+
+def load_cost_index(path: str = COST_INDEX_PATH) -> tuple:
+    # Optional JSON override: {"districts": {name: factor}, "cells": {"lat,lon": factor}}
+    if not path or not os.path.exists(path):
+        return dict(DISTRICT_COST_INDEX), {}
+    with open(path) as f:
+        table = json.load(f)
+    return {**DISTRICT_COST_INDEX, **table.get("districts", {})}, table.get("cells", {})
+
+district_cost_index, cell_cost_index = load_cost_index()
+
+def cell_key(latitude: float, longitude: float, grid_deg: float = COST_INDEX_GRID_DEG) -> str:
+    return f"{round(latitude / grid_deg) * grid_deg:.4f},{round(longitude / grid_deg) * grid_deg:.4f}"
+
+def hashed_cell_factor(key: str) -> float:
+    # Stable across processes and restarts, unlike hash() or random
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    fraction = int.from_bytes(digest, "big") / 2 ** 64
+    return round(COST_INDEX_MIN + fraction * (COST_INDEX_MAX - COST_INDEX_MIN), 3)
+
+@lru_cache(maxsize=4096)
+def location_cost_factor(latitude: float, longitude: float, district: str = None) -> float:
+    key = cell_key(latitude, longitude)
+    if key in cell_cost_index:
+        return float(cell_cost_index[key])
+    if district in district_cost_index:
+        return float(district_cost_index[district])
+    return hashed_cell_factor(key)
+
+def simulate_structure_costs(volume_m3, location_factor: float, draws: int = 1000, seed: int = 0, spread: float = COST_SIMULATION_SPREAD, percentiles=(5, 50, 95)) -> dict:
+    # Monte Carlo over the location multiplier; every draw is costed for all
+    # four structure types in one structure_costs call
+    draws = max(1, min(int(draws), COST_SIMULATION_MAX_DRAWS))
+    rng = np.random.default_rng(seed)
+    factors = rng.uniform(location_factor * (1 - spread), location_factor * (1 + spread), draws)
+    volumes = np.broadcast_to(np.asarray(volume_m3, dtype=np.float64), (draws, len(STRUCTURE_TYPES)))
+    total_cost = structure_costs(volumes, factors)["total_cost"]
+    net_investment = total_cost - government_subsidy(total_cost)
+
+    total_percentiles = np.percentile(total_cost, percentiles, axis=0)
+    net_percentiles = np.percentile(net_investment, percentiles, axis=0)
+    return {
+        "draws": draws,
+        "seed": seed,
+        "spread": spread,
+        "structures": {
+            structure_type: {
+                "total_cost_inr": {f"p{p}": int(total_percentiles[k, j]) for k, p in enumerate(percentiles)},
+                "net_investment_inr": {f"p{p}": int(net_percentiles[k, j]) for k, p in enumerate(percentiles)},
+            }
+            for j, structure_type in enumerate(STRUCTURE_TYPES)
+        },
+    }
@@ -0,0 +1,146 @@
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import gwl_inference
+from timing import metrics, span
+
+GWL_EXECUTOR = os.getenv("GWL_EXECUTOR", "thread").lower()
+GWL_EXECUTOR_WORKERS = int(os.getenv("GWL_EXECUTOR_WORKERS", "1"))
+GWL_MICROBATCH_WINDOW_MS = float(os.getenv("GWL_MICROBATCH_WINDOW_MS", "3"))
+GWL_MICROBATCH_MAX_SIZE = int(os.getenv("GWL_MICROBATCH_MAX_SIZE", "256"))
+
+def predict_counting_rows(predict_fn, *args) -> tuple:
+    # Runs in a worker process, where the gwl_inference.gwl_stats row counters
+    # and the loaded model are the worker's own; the change in the counters and
+    # whether the model is loaded come back with the predictions
+    before = dict(gwl_inference.gwl_stats)
+    predictions = predict_fn(*args)
+    rows = {field: gwl_inference.gwl_stats[field] - before.get(field, 0) for field in gwl_inference.gwl_stats}
+    return predictions, rows, gwl_inference.gwl_models_loaded()
+
+class GWLMicroBatcher:
+    # Single-point predictions arriving within the window are merged into one
+    # predict_gwl_batch call, which runs on a dedicated pool instead of the event loop
+    def __init__(
+        self,
+        predict_fn=gwl_inference.predict_gwl_batch,
+        executor_kind: str = GWL_EXECUTOR,
+        workers: int = GWL_EXECUTOR_WORKERS,
+        window_ms: float = GWL_MICROBATCH_WINDOW_MS,
+        max_batch: int = GWL_MICROBATCH_MAX_SIZE,
+    ):
+        self.predict_fn = predict_fn
+        self.executor_kind = executor_kind
+        self.workers = workers
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._executor = None
+        self._pending = []
+        self._flush_handle = None
+        self._in_flight = 0
+        self._workers_loaded = False
+        self.stats = {"requests": 0, "batches": 0, "batched_rows": 0, "largest_batch": 0, "errors": 0}
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            if self.executor_kind == "process":
+                # Each worker process loads its own copy of the model
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=gwl_inference.load_gwl_models)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="gwl-inference")
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        if self.executor_kind != "process":
+            return await loop.run_in_executor(self.executor, fn, *args)
+        predictions, rows, loaded = await loop.run_in_executor(self.executor, predict_counting_rows, fn, *args)
+        for field, count in rows.items():
+            gwl_inference.gwl_stats[field] = gwl_inference.gwl_stats.get(field, 0) + count
+        self._workers_loaded = loaded
+        return predictions
+
+    def models_loaded(self) -> bool:
+        # Worker processes load their own model and never touch the parent's
+        # globals, so their state is the one the last batch reported. Threads
+        # share the parent's model.
+        if self.executor_kind == "process":
+            return self._workers_loaded
+        return gwl_inference.gwl_models_loaded()
+
+    async def predict(self, district: str, latitude: float, longitude: float) -> float:
+        async with span("gwl.predict"):
+            return await self._enqueue(district, latitude, longitude)
+
+    async def _enqueue(self, district: str, latitude: float, longitude: float) -> float:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((district, latitude, longitude, future))
+        self.stats["requests"] += 1
+
+        if len(self._pending) >= self.max_batch:
+            self._dispatch()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._on_window)
+        return await future
+
+    def _on_window(self):
+        self._flush_handle = None
+        self._dispatch()
+
+    def _dispatch(self):
+        # While every worker is busy, requests keep collecting and go out as one
+        # batch when a worker frees up, so batches grow with load
+        if not self._pending or self._in_flight >= self.workers:
+            return
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending[: self.max_batch], self._pending[self.max_batch :]
+        self._in_flight += 1
+        asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch: list):
+        self.stats["batches"] += 1
+        self.stats["batched_rows"] += len(batch)
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        started = time.perf_counter()
+        columns = ([row[0] for row in batch], [row[1] for row in batch], [row[2] for row in batch])
+        try:
+            predictions = await self.run(self.predict_fn, *columns)
+        except Exception as e:
+            self.stats["errors"] += 1
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            # Straight to the histogram: a batch serves several requests, so it
+            # belongs to none of their Server-Timing headers
+            metrics.observe("rwh_span_duration_seconds", time.perf_counter() - started, span="gwl.batch_inference")
+            self._in_flight -= 1
+            self._dispatch()
+        for (*_, future), value in zip(batch, predictions):
+            if not future.done():
+                future.set_result(float(value))
+
+    def get_stats(self) -> dict:
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "avg_batch_size": round(self.stats["batched_rows"] / batches, 2) if batches else 0.0,
+            "executor": self.executor_kind,
+            "models_loaded": self.models_loaded(),
+            "workers": self.workers,
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+        }
+
+gwl_batcher = GWLMicroBatcher()
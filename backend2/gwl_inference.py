@@ -0,0 +1,168 @@
+import os
+import sys
+import argparse
+import threading
+import numpy as np
+from gwl_tiles import get_gwl_tiles
+from gwl_scorer import GWLScorer, export_scorer_arrays
+
+GWL_MODEL_DIR = os.getenv("GWL_MODEL_DIR", os.path.dirname(os.path.abspath(__file__)))
+GWL_BATCH_CHUNK_SIZE = int(os.getenv("GWL_BATCH_CHUNK_SIZE", "4096"))
+
+# Flat NumPy form of the joblib pipeline (see gwl_scorer), written by
+# `python gwl_inference.py export`. Loading it needs neither pandas,
+# scikit-learn nor xgboost; the joblib files remain the fallback.
+GWL_SCORER_FILE = "gwl_scorer.npz"
+NUMERIC_FEATURES = ["Latitude", "Longitude", "lat_x_lon", "lat_squared", "lon_squared"]
+
+# Global variables
+gwl_preprocessor = None
+gwl_model = None
+gwl_scorer = None
+gwl_stats = {"tile_rows": 0, "live_rows": 0, "fallback_rows": 0}
+_load_lock = threading.Lock()
+_load_attempted = False
+
+def load_gwl_models():
+    global gwl_preprocessor, gwl_model, gwl_scorer
+    try:
+        scorer_path = os.path.join(GWL_MODEL_DIR, GWL_SCORER_FILE)
+        if os.path.exists(scorer_path):
+            gwl_scorer = GWLScorer.load(scorer_path)
+            print("GWL scorer loaded successfully.")
+            return True
+        import joblib
+        gwl_preprocessor = joblib.load(os.path.join(GWL_MODEL_DIR, 'final_preprocessor.joblib'))
+        gwl_model = joblib.load(os.path.join(GWL_MODEL_DIR, 'final_model.joblib'))
+        print("GWL Model and preprocessor loaded successfully.")
+        return True
+    except FileNotFoundError:
+        print("GWL Model files not found. Application will continue without GWL prediction functionality.")
+        return False
+    except Exception as e:
+        print(f"Error loading GWL models: {e}")
+        return False
+
+def ensure_gwl_models() -> bool:
+    # Loaded on first prediction rather than at startup, so cold starts that
+    # never touch the model do not pay for it. The attempt is only marked once
+    # it has finished, so a concurrent caller waits on the lock instead of
+    # predicting with the fallback while the first one is still loading.
+    global _load_attempted
+    if gwl_models_loaded():
+        return True
+    if not _load_attempted:
+        with _load_lock:
+            if not _load_attempted:
+                load_gwl_models()
+                _load_attempted = True
+    return gwl_models_loaded()
+
+def gwl_models_loaded() -> bool:
+    return gwl_scorer is not None or (gwl_preprocessor is not None and gwl_model is not None)
+
+def fallback_gwl(latitudes) -> np.ndarray:
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    return np.select(
+        [(latitudes >= 8) & (latitudes <= 20), (latitudes >= 20) & (latitudes <= 28), (latitudes >= 28) & (latitudes <= 35)],
+        [15.5, 12.0, 8.5],
+        default=12.0,
+    )
+
+def build_gwl_features(districts, latitudes, longitudes):
+    import pandas as pd
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    return pd.DataFrame({
+        'District': np.asarray(districts, dtype=object),
+        'Latitude': latitudes,
+        'Longitude': longitudes,
+        'lat_x_lon': latitudes * longitudes,
+        'lat_squared': latitudes ** 2,
+        'lon_squared': longitudes ** 2
+    })
+
+def predict_chunk(districts, latitudes, longitudes) -> np.ndarray:
+    if gwl_scorer is not None:
+        return gwl_scorer.predict(districts, latitudes, longitudes)
+    input_data_processed = gwl_preprocessor.transform(build_gwl_features(districts, latitudes, longitudes))
+    return gwl_model.predict(input_data_processed)
+
+def predict_gwl_live(districts, latitudes, longitudes, chunk_size: int = GWL_BATCH_CHUNK_SIZE) -> np.ndarray:
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    districts = np.asarray(districts, dtype=object)
+    predictions = fallback_gwl(latitudes)
+
+    if not ensure_gwl_models():
+        gwl_stats["fallback_rows"] += len(latitudes)
+        return predictions
+
+    for start in range(0, len(latitudes), chunk_size):
+        end = start + chunk_size
+        try:
+            predictions[start:end] = predict_chunk(districts[start:end], latitudes[start:end], longitudes[start:end])
+            gwl_stats["live_rows"] += len(latitudes[start:end])
+        except Exception as e:
+            # Chunk keeps the latitude-band fallback values
+            print(f"GWL batch prediction failed for rows {start}-{end}: {e}")
+            gwl_stats["fallback_rows"] += len(latitudes[start:end])
+
+    return predictions
+
+def predict_gwl_batch(districts, latitudes, longitudes, chunk_size: int = GWL_BATCH_CHUNK_SIZE, use_tiles: bool = True) -> np.ndarray:
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    districts = np.asarray(districts, dtype=object)
+
+    tiles = get_gwl_tiles() if use_tiles else None
+    if tiles is None:
+        return predict_gwl_live(districts, latitudes, longitudes, chunk_size)
+
+    predictions, covered = tiles.lookup_many(districts, latitudes, longitudes)
+    gwl_stats["tile_rows"] += int(covered.sum())
+
+    # Only points outside the precomputed tiles go through the model
+    live = np.flatnonzero(~covered)
+    if len(live):
+        predictions[live] = predict_gwl_live(districts[live], latitudes[live], longitudes[live], chunk_size)
+    return predictions
+
+def predict_gwl(district: str, latitude: float, longitude: float):
+    return float(predict_gwl_batch([district], [latitude], [longitude])[0])
+
+def export_scorer(model_dir: str = GWL_MODEL_DIR) -> dict:
+    import joblib
+    preprocessor = joblib.load(os.path.join(model_dir, 'final_preprocessor.joblib'))
+    model = joblib.load(os.path.join(model_dir, 'final_model.joblib'))
+    arrays = export_scorer_arrays(preprocessor, model, NUMERIC_FEATURES)
+    path = os.path.join(model_dir, GWL_SCORER_FILE)
+    np.savez_compressed(path, **arrays)
+
+    # Refuse to leave behind a scorer that disagrees with the pipeline
+    rng = np.random.default_rng(0)
+    categories = list(preprocessor.transformers_[0][1].categories_[0])
+    districts = [categories[i] for i in rng.integers(0, len(categories), 2000)] + ["Unknown district"]
+    latitudes, longitudes = rng.uniform(8, 35, len(districts)), rng.uniform(68, 97, len(districts))
+    expected = model.predict(preprocessor.transform(build_gwl_features(districts, latitudes, longitudes)))
+    max_error = float(np.abs(GWLScorer.load(path).predict(districts, latitudes, longitudes) - expected).max())
+    if max_error > 1e-4:
+        os.remove(path)
+        raise ValueError(f"Exported scorer differs from the pipeline by {max_error}")
+    return {"categories": len(categories), "trees": arrays["feature"].shape[0], "depth": int(np.log2(arrays["feature"].shape[1] + 1)) - 1, "max_error": max_error}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GWL model artifact tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="Write the NumPy scorer from the joblib pipeline.")
+    export.add_argument("--model-dir", default=GWL_MODEL_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        summary = export_scorer(args.model_dir)
+        print(f"Exported {summary['trees']} trees (depth {summary['depth']}) and {summary['categories']} districts "
+              f"to {args.model_dir}; max difference from the pipeline {summary['max_error']}")
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
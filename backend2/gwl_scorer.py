@@ -0,0 +1,135 @@
+import json
+import numpy as np
+
+# Pure-NumPy evaluation of the trained GWL pipeline: the District one-hot
+# encoder becomes a category lookup and the XGBoost trees become padded node
+# arrays. Only NumPy is needed at request time.
+#
+# The pipeline hands XGBoost a sparse matrix, so a zero feature is "missing"
+# and follows the node's default branch, exactly like an absent one-hot column.
+
+SCORER_ROW_BLOCK = 256
+
+def export_scorer_arrays(preprocessor, model, numeric_features: list) -> dict:
+    (_, encoder, columns), (_, _, passthrough) = preprocessor.transformers_[:2]
+    if list(columns) != ["District"] or list(preprocessor.feature_names_in_[passthrough]) != numeric_features:
+        raise ValueError("Preprocessor layout differs from District one-hot plus numeric passthrough")
+    if preprocessor.sparse_output_ is False:
+        raise ValueError("The scorer assumes the sparse ColumnTransformer output the model was trained on")
+
+    learner = json.loads(model.get_booster().save_raw("json"))["learner"]
+    booster = learner["gradient_booster"]
+    if booster["name"] != "gbtree" or learner["objective"]["name"] != "reg:squarederror":
+        raise ValueError(f"Unsupported booster {booster['name']} / {learner['objective']['name']}")
+    trees = booster["model"]["trees"]
+
+    def depth(tree, node=0):
+        if tree["left_children"][node] == -1:
+            return 0
+        return 1 + max(depth(tree, tree["left_children"][node]), depth(tree, tree["right_children"][node]))
+
+    # Each tree is padded to a complete binary tree of the forest's depth, so the
+    # children of position i are 2i+1 and 2i+2 and no child arrays are needed.
+    # A leaf above the last level becomes a split that always goes left
+    # (threshold +inf, missing left) down to copies of its value.
+    max_depth = max(depth(tree) for tree in trees)
+    width = 2 ** (max_depth + 1) - 1
+    first_leaf = 2 ** max_depth - 1
+    feature = np.zeros((len(trees), width), dtype=np.int32)
+    threshold = np.full((len(trees), width), np.inf, dtype=np.float32)
+    default_left = np.ones((len(trees), width), dtype=bool)
+    value = np.zeros((len(trees), 2 ** max_depth), dtype=np.float32)
+    for t, tree in enumerate(trees):
+        stack = [(0, 0)]
+        while stack:
+            node, position = stack.pop()
+            if position >= first_leaf:
+                value[t, position - first_leaf] = tree["split_conditions"][node]
+                continue
+            left, right = tree["left_children"][node], tree["right_children"][node]
+            if left == -1:
+                left = right = node
+            else:
+                feature[t, position] = tree["split_indices"][node]
+                threshold[t, position] = tree["split_conditions"][node]
+                default_left[t, position] = tree["default_left"][node]
+            stack += [(left, 2 * position + 1), (right, 2 * position + 2)]
+
+    categories = list(encoder.categories_[0])
+    null_category = next((i for i, c in enumerate(categories) if not isinstance(c, str)), -1)
+    return {
+        "categories": np.asarray([c if isinstance(c, str) else "" for c in categories], dtype=str),
+        "null_category": np.int64(null_category),
+        "numeric_features": np.asarray(numeric_features, dtype=str),
+        "base_score": np.float64(learner["learner_model_param"]["base_score"].strip("[]")),
+        "feature": feature,
+        "threshold": threshold,
+        "default_left": default_left,
+        "value": value,
+    }
+
+class GWLScorer:
+    def __init__(self, arrays):
+        self.categories = list(arrays["categories"])
+        self.null_category = int(arrays["null_category"])
+        self.category_index = {c: i for i, c in enumerate(self.categories) if i != self.null_category}
+        self.n_categories = len(self.categories)
+        self.n_features = self.n_categories + len(arrays["numeric_features"])
+        self.base_score = np.float32(arrays["base_score"])
+        self.n_trees, width = arrays["feature"].shape
+        self.max_depth = int(np.log2(width + 1)) - 1
+        self.feature = arrays["feature"].ravel()
+        self.threshold = arrays["threshold"].ravel()
+        self.default_right = ~arrays["default_left"].ravel()
+        self.value = arrays["value"].ravel()
+        self.tree_offsets = np.arange(self.n_trees, dtype=np.int64) * width
+        self.leaf_offsets = np.arange(self.n_trees, dtype=np.int64) * arrays["value"].shape[1] - (2 ** self.max_depth - 1)
+
+    @classmethod
+    def load(cls, path: str) -> "GWLScorer":
+        with np.load(path) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def category_columns(self, districts) -> np.ndarray:
+        # -1 matches no one-hot column, like handle_unknown="ignore"
+        return np.fromiter(
+            (self.null_category if d is None or d != d else self.category_index.get(d, -1) for d in districts),
+            dtype=np.int64,
+            count=len(districts),
+        )
+
+    def predict(self, districts, latitudes, longitudes) -> np.ndarray:
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        numeric = np.column_stack([latitudes, longitudes, latitudes * longitudes, latitudes ** 2, longitudes ** 2]).astype(np.float32)
+        columns = self.category_columns(districts)
+        predictions = np.empty(len(latitudes), dtype=np.float32)
+        # Rows go through in blocks so the (rows, trees) node matrix stays small
+        for start in range(0, len(latitudes), SCORER_ROW_BLOCK):
+            end = start + SCORER_ROW_BLOCK
+            predictions[start:end] = self.predict_block(columns[start:end], numeric[start:end])
+        return predictions
+
+    def predict_block(self, columns: np.ndarray, numeric: np.ndarray) -> np.ndarray:
+        n = len(columns)
+        # Missing features (absent one-hot columns and zeros) are NaN here
+        features = np.full((n, self.n_features), np.nan, dtype=np.float32)
+        known = np.flatnonzero(columns >= 0)
+        features[known, columns[known]] = 1
+        features[:, self.n_categories:] = np.where(numeric == 0, np.nan, numeric)
+        flat = features.ravel()
+        row_offsets = np.arange(n)[:, None] * self.n_features
+
+        positions = np.zeros((n, self.n_trees), dtype=np.int64)
+        for _ in range(self.max_depth):
+            nodes = self.tree_offsets + positions
+            x = flat[row_offsets + self.feature[nodes]]
+            go_right = np.where(np.isnan(x), self.default_right[nodes], ~(x < self.threshold[nodes]))
+            positions = 2 * positions + 1 + go_right
+
+        # XGBoost adds the trees one at a time in float32 starting from base_score;
+        # a running sum in the same order gives bit-identical predictions
+        leaves = np.empty((n, self.n_trees + 1), dtype=np.float32)
+        leaves[:, 0] = self.base_score
+        leaves[:, 1:] = self.value[self.leaf_offsets + positions]
+        return np.cumsum(leaves, axis=1, dtype=np.float32)[:, -1]
@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import numpy as np
+
+GWL_TILES_PATH = os.getenv(
+    "GWL_TILES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "gwl_tiles"),
+)
+GWL_TILE_RESOLUTION = float(os.getenv("GWL_TILE_RESOLUTION", "0.01"))
+
+# The named district boxes of spatial_layers.json; a JSON file with the
+# same shape can be passed to the build job to cover more districts.
+DEFAULT_TILE_BOUNDS = {
+    "Bengaluru Urban": {"min_lat": 12.8, "max_lat": 13.2, "min_lon": 77.3, "max_lon": 77.8},
+    "Ramanagara": {"min_lat": 12.4, "max_lat": 12.8, "min_lon": 77.0, "max_lon": 77.4},
+    "Mysuru": {"min_lat": 12.2, "max_lat": 12.6, "min_lon": 76.5, "max_lon": 77.0},
+    "Tumakuru": {"min_lat": 13.0, "max_lat": 13.5, "min_lon": 77.0, "max_lon": 77.6},
+    "Chikkaballapur": {"min_lat": 13.3, "max_lat": 13.8, "min_lon": 77.2, "max_lon": 77.8},
+    "Chamarajanagar": {"min_lat": 12.0, "max_lat": 12.4, "min_lon": 77.4, "max_lon": 78.0},
+    "Chennai": {"min_lat": 12.8, "max_lat": 13.3, "min_lon": 79.8, "max_lon": 80.3},
+    "Coimbatore": {"min_lat": 11.0, "max_lat": 11.5, "min_lon": 76.8, "max_lon": 77.3},
+    "Madurai": {"min_lat": 10.7, "max_lat": 11.2, "min_lon": 78.0, "max_lon": 78.5},
+    "Hyderabad": {"min_lat": 17.2, "max_lat": 17.8, "min_lon": 78.2, "max_lon": 78.8},
+    "Vijayawada": {"min_lat": 15.8, "max_lat": 16.4, "min_lon": 80.8, "max_lon": 81.4},
+    "Kochi": {"min_lat": 9.8, "max_lat": 10.2, "min_lon": 76.2, "max_lon": 76.8},
+    "Thiruvananthapuram": {"min_lat": 8.4, "max_lat": 8.9, "min_lon": 76.8, "max_lon": 77.4},
+    "Mumbai Suburban": {"min_lat": 18.8, "max_lat": 19.4, "min_lon": 72.6, "max_lon": 73.2},
+    "Pune": {"min_lat": 18.4, "max_lat": 18.8, "min_lon": 73.6, "max_lon": 74.2},
+}
+
+def tile_grid(bounds: dict, resolution: float) -> tuple:
+    n_lat = int(math.ceil(round((bounds["max_lat"] - bounds["min_lat"]) / resolution, 9))) + 1
+    n_lon = int(math.ceil(round((bounds["max_lon"] - bounds["min_lon"]) / resolution, 9))) + 1
+    latitudes = bounds["min_lat"] + np.arange(n_lat) * resolution
+    longitudes = bounds["min_lon"] + np.arange(n_lon) * resolution
+    return latitudes, longitudes
+
+def evaluate_tiles(predict_fn, bounds_by_district: dict, resolution: float) -> dict:
+    tiles = {}
+    for district, bounds in bounds_by_district.items():
+        latitudes, longitudes = tile_grid(bounds, resolution)
+        lat_grid, lon_grid = np.meshgrid(latitudes, longitudes, indexing="ij")
+        values = predict_fn(
+            np.full(lat_grid.size, district, dtype=object),
+            lat_grid.ravel(),
+            lon_grid.ravel(),
+        )
+        tiles[district] = {
+            "min_lat": float(latitudes[0]),
+            "min_lon": float(longitudes[0]),
+            "max_lat": float(latitudes[-1]),
+            "max_lon": float(longitudes[-1]),
+            "resolution": resolution,
+            "values": np.asarray(values, dtype=np.float32).reshape(lat_grid.shape),
+        }
+    return tiles
+
+def bilinear(tile: dict, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    values = tile["values"]
+    n_lat, n_lon = values.shape
+    fy = (latitudes - tile["min_lat"]) / tile["resolution"]
+    fx = (longitudes - tile["min_lon"]) / tile["resolution"]
+    y0 = np.clip(np.floor(fy).astype(np.int64), 0, max(n_lat - 2, 0))
+    x0 = np.clip(np.floor(fx).astype(np.int64), 0, max(n_lon - 2, 0))
+    y1 = np.minimum(y0 + 1, n_lat - 1)
+    x1 = np.minimum(x0 + 1, n_lon - 1)
+    ty = np.clip(fy - y0, 0.0, 1.0)
+    tx = np.clip(fx - x0, 0.0, 1.0)
+    top = values[y0, x0] * (1 - tx) + values[y0, x1] * tx
+    bottom = values[y1, x0] * (1 - tx) + values[y1, x1] * tx
+    return top * (1 - ty) + bottom * ty
+
+class GWLTiles:
+    def __init__(self, tiles: dict):
+        self.tiles = tiles
+
+    @classmethod
+    def load(cls, path: str):
+        with open(os.path.join(path, "index.json")) as f:
+            index = json.load(f)
+        tiles = {}
+        for district, meta in index["districts"].items():
+            tiles[district] = {**meta, "values": np.load(os.path.join(path, meta["file"]), mmap_mode="r")}
+        return cls(tiles)
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        index = {"created_at": time.time(), "districts": {}}
+        for i, (district, tile) in enumerate(sorted(self.tiles.items())):
+            file_name = f"tile_{i:04d}.npy"
+            np.save(os.path.join(path, file_name), np.asarray(tile["values"], dtype=np.float32))
+            index["districts"][district] = {k: v for k, v in tile.items() if k != "values"}
+            index["districts"][district]["file"] = file_name
+        tmp_path = os.path.join(path, "index.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, os.path.join(path, "index.json"))
+
+    def nbytes(self) -> int:
+        return sum(tile["values"].nbytes for tile in self.tiles.values())
+
+    def lookup_many(self, districts, latitudes, longitudes) -> tuple:
+        districts = np.asarray(districts, dtype=object)
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        values = np.full(len(latitudes), np.nan)
+        covered = np.zeros(len(latitudes), dtype=bool)
+
+        for district in set(districts.tolist()):
+            tile = self.tiles.get(district)
+            if tile is None:
+                continue
+            rows = np.flatnonzero(
+                (districts == district)
+                & (latitudes >= tile["min_lat"]) & (latitudes <= tile["max_lat"])
+                & (longitudes >= tile["min_lon"]) & (longitudes <= tile["max_lon"])
+            )
+            if len(rows):
+                values[rows] = bilinear(tile, latitudes[rows], longitudes[rows])
+                covered[rows] = True
+        return values, covered
+
+    def lookup(self, district: str, latitude: float, longitude: float):
+        values, covered = self.lookup_many([district], [latitude], [longitude])
+        return float(values[0]) if covered[0] else None
+
+_tiles = None
+_tiles_checked = False
+
+def get_gwl_tiles():
+    global _tiles, _tiles_checked
+    if not _tiles_checked:
+        _tiles_checked = True
+        if GWL_TILES_PATH and os.path.exists(os.path.join(GWL_TILES_PATH, "index.json")):
+            try:
+                _tiles = GWLTiles.load(GWL_TILES_PATH)
+                print(f"GWL tiles loaded for {len(_tiles.tiles)} districts.")
+            except Exception as e:
+                print(f"Error loading GWL tiles: {e}")
+                _tiles = None
+    return _tiles
+
+def accuracy_report(predict_fn, bounds_by_district: dict, resolutions: list, samples_per_district: int = 500, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    districts, latitudes, longitudes = [], [], []
+    for district, bounds in bounds_by_district.items():
+        districts.extend([district] * samples_per_district)
+        latitudes.append(rng.uniform(bounds["min_lat"], bounds["max_lat"], samples_per_district))
+        longitudes.append(rng.uniform(bounds["min_lon"], bounds["max_lon"], samples_per_district))
+    districts = np.asarray(districts, dtype=object)
+    latitudes = np.concatenate(latitudes)
+    longitudes = np.concatenate(longitudes)
+    live = np.asarray(predict_fn(districts, latitudes, longitudes), dtype=np.float64)
+
+    report = []
+    for resolution in resolutions:
+        started = time.perf_counter()
+        tiles = GWLTiles(evaluate_tiles(predict_fn, bounds_by_district, resolution))
+        build_seconds = time.perf_counter() - started
+        interpolated, covered = tiles.lookup_many(districts, latitudes, longitudes)
+        error = np.abs(interpolated[covered] - live[covered])
+        report.append({
+            "resolution_deg": resolution,
+            "tile_bytes": tiles.nbytes(),
+            "build_seconds": round(build_seconds, 3),
+            "samples": int(covered.sum()),
+            "mae_m": round(float(error.mean()), 4),
+            "rmse_m": round(float(np.sqrt((error ** 2).mean())), 4),
+            "p95_abs_error_m": round(float(np.percentile(error, 95)), 4),
+            "max_abs_error_m": round(float(error.max()), 4),
+        })
+    return report
+
+def load_bounds(path: str = None) -> dict:
+    if not path:
+        return DEFAULT_TILE_BOUNDS
+    with open(path) as f:
+        return json.load(f)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute GWL raster tiles from the trained model.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Evaluate the model over each district grid and save tiles.")
+    build.add_argument("--bounds", help="JSON file of {district: {min_lat, max_lat, min_lon, max_lon}}.")
+    build.add_argument("--resolution", type=float, default=GWL_TILE_RESOLUTION)
+    build.add_argument("--output", default=GWL_TILES_PATH)
+
+    report = subparsers.add_parser("report", help="Compare interpolated tiles against live inference.")
+    report.add_argument("--bounds")
+    report.add_argument("--resolutions", type=float, nargs="+", default=[0.005, 0.01, 0.02, 0.05])
+    report.add_argument("--samples", type=int, default=500)
+    report.add_argument("--output", help="Optional path for the JSON report.")
+
+    args = parser.parse_args(argv)
+
+    import gwl_inference
+    if not gwl_inference.load_gwl_models():
+        print("Tiles need the trained GWL model.")
+        return 1
+    bounds = load_bounds(args.bounds)
+
+    if args.command == "build":
+        tiles = GWLTiles(evaluate_tiles(gwl_inference.predict_gwl_live, bounds, args.resolution))
+        tiles.save(args.output)
+        print(f"Saved {len(tiles.tiles)} tiles ({tiles.nbytes()} bytes) to {args.output}")
+        return 0
+
+    if args.command == "report":
+        results = accuracy_report(gwl_inference.predict_gwl_live, bounds, args.resolutions, args.samples)
+        print(f"{'resolution':>10} {'bytes':>10} {'mae':>8} {'rmse':>8} {'p95':>8} {'max':>8}")
+        for row in results:
+            print(f"{row['resolution_deg']:>10} {row['tile_bytes']:>10} {row['mae_m']:>8} {row['rmse_m']:>8} {row['p95_abs_error_m']:>8} {row['max_abs_error_m']:>8}")
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
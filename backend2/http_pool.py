@@ -0,0 +1,196 @@
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import httpx
+
+# Outbound pool settings
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_PER_HOST_CONCURRENCY = int(os.getenv("HTTP_PER_HOST_CONCURRENCY", "8"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "30"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.25"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "4.0"))
+# Longest Retry-After a 429/503 is waited out for; a longer one returns the response
+HTTP_RETRY_AFTER_MAX = float(os.getenv("HTTP_RETRY_AFTER_MAX", "30"))
+HTTP_HEDGE_ENABLED = os.getenv("HTTP_HEDGE_ENABLED", "false").lower() == "true"
+HTTP_HEDGE_PERCENTILE = float(os.getenv("HTTP_HEDGE_PERCENTILE", "95"))
+HTTP_HEDGE_MIN_SAMPLES = int(os.getenv("HTTP_HEDGE_MIN_SAMPLES", "20"))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+def retry_after_seconds(response: httpx.Response):
+    # Retry-After as delta-seconds or an HTTP date; None when absent or unreadable
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class PooledHTTPClient:
+    def __init__(
+        self,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = HTTP_MAX_KEEPALIVE,
+        keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+        per_host_concurrency: int = HTTP_PER_HOST_CONCURRENCY,
+        timeout: float = HTTP_TIMEOUT,
+        max_retries: int = HTTP_MAX_RETRIES,
+        hedge_enabled: bool = HTTP_HEDGE_ENABLED,
+        hedge_percentile: float = HTTP_HEDGE_PERCENTILE,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.per_host_concurrency = per_host_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self._client = None
+        self._host_semaphores = {}
+        self._latencies = deque(maxlen=500)
+        self.stats = {
+            "requests": 0,
+            "attempts": 0,
+            "retries": 0,
+            "errors": 0,
+            "connections_opened": 0,
+            "hedges_fired": 0,
+            "hedges_won": 0,
+        }
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=self.limits, timeout=self.timeout)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _semaphore_for(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self._host_semaphores[host]
+
+    async def _trace(self, event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            self.stats["connections_opened"] += 1
+
+    def _hedge_delay(self):
+        if not self.hedge_enabled or len(self._latencies) < HTTP_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))
+        return ordered[index]
+
+    async def _send_once(self, method: str, url: str, **kwargs) -> httpx.Response:
+        async with self._semaphore_for(url):
+            self.stats["attempts"] += 1
+            started = time.perf_counter()
+            response = await self._client.request(method, url, extensions={"trace": self._trace}, **kwargs)
+            if response.status_code < 500:
+                self._latencies.append(time.perf_counter() - started)
+            return response
+
+    async def _send_hedged(self, method: str, url: str, **kwargs) -> httpx.Response:
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._send_once(method, url, **kwargs)
+
+        primary = asyncio.create_task(self._send_once(method, url, **kwargs))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+
+            self.stats["hedges_fired"] += 1
+            hedge = asyncio.create_task(self._send_once(method, url, **kwargs))
+            pending = {primary, hedge}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.stats["hedges_won"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The losing attempt, or both when the caller is cancelled, must not
+            # keep running and holding the host's semaphore slot
+            for task in pending:
+                task.cancel()
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        await self.start()
+        self.stats["requests"] += 1
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = await self._send_hedged(method, url, **kwargs)
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                    return response
+                retry_after = retry_after_seconds(response)
+                if retry_after is not None and retry_after > HTTP_RETRY_AFTER_MAX:
+                    return response
+            except (httpx.TransportError, httpx.TimeoutException):
+                if attempt == self.max_retries:
+                    self.stats["errors"] += 1
+                    raise
+
+            self.stats["retries"] += 1
+            if retry_after is not None:
+                # The server said when to come back (rate limits, maintenance)
+                await asyncio.sleep(retry_after)
+            else:
+                # Exponential backoff with full jitter
+                backoff = min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt))
+                await asyncio.sleep(random.uniform(0, backoff))
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    def get_stats(self) -> dict:
+        try:
+            open_connections = len(self._client._transport._pool.connections) if self._client else 0
+        except AttributeError:
+            open_connections = None
+
+        attempts = self.stats["attempts"]
+        return {
+            **self.stats,
+            "connection_reuse_ratio": round(1 - self.stats["connections_opened"] / attempts, 4) if attempts else 0.0,
+            "open_connections": open_connections,
+            "http2": HTTP2_AVAILABLE,
+            "hedge_enabled": self.hedge_enabled,
+            "hedge_delay_seconds": self._hedge_delay(),
+            "per_host_concurrency": self.per_host_concurrency,
+            "max_connections": self.limits.max_connections,
+        }
+
+http_client = PooledHTTPClient()
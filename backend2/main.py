@@ -1,35 +1,69 @@
 import os
+import io
+import codecs
+import tempfile
+import csv
+import json
+import time
+import sys
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
-import httpx
 import traceback
 import math
-import random
+import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from contextvars import ContextVar
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.tools import BaseTool
-from langchain.agents import AgentExecutor, create_openai_functions_agent
-from langchain_core.agents import AgentActionMessageLog
-from typing import Type
-import pandas as pd
-import joblib
-
-# Global variables
-gwl_preprocessor = None
-gwl_model = None
-agent_data_store = {}
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import List, Literal, Optional
+from climate import climate_cache, climate_series, get_climate_summary, get_daily_precipitation, cached_daily_precipitation, DEFAULT_ANNUAL_RAINFALL_MM, DEFAULT_TEMPERATURE_CELSIUS
+from climate_store import get_climate_store
+from gwl_tiles import get_gwl_tiles
+from http_pool import http_client
+from gwl_inference import predict_gwl_batch, gwl_stats
+from gwl_batcher import gwl_batcher
+from singleflight import quantize, hydrogeology_flight, gwl_flight, get_coalescing_stats
+from structure_engine import STRUCTURE_TYPES, design_sites, format_dimensions, pareto_front
+from size_optimizer import size_optimizer, DESIGN_LIFE_YEARS
+from session_graph import build_recommendation_graph, session_store
+from water_balance import simulate, simulate_designs, design_drain_m3_per_day, storm_percentiles, RUNOFF_COEFFICIENT
+from cost_index import location_cost_factor, simulate_structure_costs
+from spatial_index import get_spatial_index
+from report_cache import report_cache, report_flight, report_key
+from agent_projection import AGENT_TOOL_NAMES, project_tool_output, new_token_report, load_encoding
+from timing import StageTimer, TimingMiddleware, metrics, span, timed
+
+# Per-request tool outputs; each request gets its own dict through a context variable
+agent_data_store_var: ContextVar[dict] = ContextVar("agent_data_store")
+
+def get_agent_data_store() -> dict:
+    store = agent_data_store_var.get(None)
+    if store is None:
+        store = new_agent_data_store()
+    return store
+
+def new_agent_data_store() -> dict:
+    store = {}
+    agent_data_store_var.set(store)
+    return store
 
 load_dotenv()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("Starting up Rainwater Harvesting AI Agent...")
-    load_gwl_models()
+    # The GWL model, LLM client and agent load on first use (see get_agent_executor)
+    get_gwl_tiles()
+    get_climate_store()
+    await http_client.start()
+    # The tokenizer may need a download; token counts are estimated until it is in
+    encoding_task = asyncio.create_task(asyncio.to_thread(load_encoding))
     yield
     print("Shutting down...")
+    encoding_task.cancel()
+    await http_client.aclose()
+    gwl_batcher.shutdown()
 
 app = FastAPI(
     title="Rainwater Harvesting AI Agent",
@@ -45,8 +79,35 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so endpoint latency includes CORS handling and every span below it
+app.add_middleware(TimingMiddleware)
 
-llm = ChatOpenAI(model="gpt-4o", temperature=0)
+llm = None
+agent_executor = None
+report_version = None
+
+def get_llm():
+    global llm
+    if llm is None:
+        from langchain_openai import ChatOpenAI
+        # The agent and the narrative both stream; streamed completions only
+        # report token usage when asked to, which needs langchain-openai 0.1.9+
+        options = {"stream_usage": True} if "stream_usage" in ChatOpenAI.__fields__ else {}
+        llm = ChatOpenAI(model="gpt-4o", temperature=0, **options)
+    return llm
+
+def get_agent_executor():
+    # langchain is about a second of import time, so a cold start only pays for it
+    # once a request actually needs the agent
+    global agent_executor, report_version
+    if agent_executor is None:
+        try:
+            import agent
+            agent_executor = agent.build_agent_executor(get_llm(), sys.modules[__name__])
+            report_version = agent.report_version(get_llm(), agent_executor.tools)
+        except Exception as e:
+            print(f"Error creating agent: {e}")
+    return agent_executor
 
 # Health check endpoint
 @app.get("/health")
@@ -70,6 +131,14 @@ class GWLResponse(BaseModel):
     district: str = None
     status: str = None
 
+class GWLBatchRequest(BaseModel):
+    locations: List[GWLRequest] = Field(..., description="Locations to score in one call.")
+
+class GWLBatchResponse(BaseModel):
+    predictions: List[GWLResponse]
+    count: int
+    status: str
+
 class CombinedRequest(BaseModel):
     input: str
     district: str = None
@@ -100,104 +169,48 @@ class FinalReport(BaseModel):
 class AgentInput(BaseModel):
     input: str
 
-def load_gwl_models():
-    global gwl_preprocessor, gwl_model
-    try:
-        gwl_preprocessor = joblib.load('final_preprocessor.joblib')
-        gwl_model = joblib.load('final_model.joblib')
-        print("GWL Model and preprocessor loaded successfully.")
-        return True
-    except FileNotFoundError:
-        print("GWL Model files not found. Application will continue without GWL prediction functionality.")
-        return False
-    except Exception as e:
-        print(f"Error loading GWL models: {e}")
-        return False
+class StructuredRecommendationRequest(BaseModel):
+    latitude: float = Field(..., description="Latitude of the location.")
+    longitude: float = Field(..., description="Longitude of the location.")
+    area: float = Field(..., gt=0, description="The area of the rooftop in square meters.")
+    district: str = Field(default=None, description="District name; derived from the coordinates when omitted.")
+    narrative: Literal["template", "llm"] = Field(default="template", description="Template prose, or one LLM call for the final paragraph.")
+    compare_structures: bool = Field(default=False, description="Also design and cost all four structure types and return the cost/capacity frontier.")
+    cost_simulations: int = Field(default=0, ge=0, le=100000, description="Monte Carlo draws of the location cost factor; 0 disables the cost percentiles.")
+    cost_seed: int = Field(default=0, description="Seed for the cost simulation, so percentiles are reproducible.")
+    optimize_size: bool = Field(default=False, description="Also search structure dimensions for the lowest net investment per m³ recharged, simulated over the daily rainfall record.")
 
-def predict_gwl(district: str, latitude: float, longitude: float):
-    try:
-        if gwl_preprocessor is None or gwl_model is None:
-            if 8 <= latitude <= 20:
-                return 15.5
-            elif 20 <= latitude <= 28:
-                return 12.0
-            elif 28 <= latitude <= 35:
-                return 8.5
-            else:
-                return 12.0
-        
-        lat_x_lon = latitude * longitude
-        lat_squared = latitude ** 2
-        lon_squared = longitude ** 2
-
-        input_data = pd.DataFrame({
-            'District': [district],
-            'Latitude': [latitude],
-            'Longitude': [longitude],
-            'lat_x_lon': [lat_x_lon],
-            'lat_squared': [lat_squared],
-            'lon_squared': [lon_squared]
-        })
+StructureName = Literal["Recharge Pit", "Recharge Trench", "Recharge Shaft", "Injection Well"]
 
-        input_data_processed = gwl_preprocessor.transform(input_data)
-        prediction = gwl_model.predict(input_data_processed)
-        return float(prediction[0])
-        
-    except Exception:
-        if 8 <= latitude <= 20:
-            return 15.5
-        elif 20 <= latitude <= 28:
-            return 12.0
-        elif 28 <= latitude <= 35:
-            return 8.5
-        else:
-            return 12.0
+class SessionCreateRequest(BaseModel):
+    latitude: float = Field(..., description="Latitude of the location.")
+    longitude: float = Field(..., description="Longitude of the location.")
+    area: float = Field(..., gt=0, description="The area of the rooftop in square meters.")
+    district: str = Field(default=None, description="District name; derived from the coordinates when omitted.")
+    structure: Optional[StructureName] = Field(default=None, description="Design this structure instead of the recommended one.")
+
+class SessionUpdateRequest(BaseModel):
+    # Only the fields sent are changed; "structure": null goes back to the recommended one
+    latitude: float = Field(default=None, description="Latitude of the location.")
+    longitude: float = Field(default=None, description="Longitude of the location.")
+    area: float = Field(default=None, gt=0, description="The area of the rooftop in square meters.")
+    district: Optional[str] = Field(default=None, description="District name; derived from the coordinates when null.")
+    structure: Optional[StructureName] = Field(default=None, description="Design this structure instead of the recommended one.")
+
+SESSION_INPUT_NAMES = {"area": "roof_area_sqm"}
+
+def session_inputs(fields: dict) -> dict:
+    return {SESSION_INPUT_NAMES.get(k, k): v for k, v in fields.items()}
+
+async def predict_gwl_shared(district: str, latitude: float, longitude: float) -> float:
+    lat, lon = quantize(latitude, longitude)
+    return await gwl_flight.do(
+        (district, lat, lon),
+        lambda: gwl_batcher.predict(district, lat, lon),
+    )
 
 def calculate_soil_infiltration_rate(latitude: float, longitude: float) -> float:
-    if 8 <= latitude <= 12:
-        if 76 <= longitude <= 78:
-            return 8.5
-        elif 75 <= longitude <= 77:
-            return 22.0
-        else:
-            return 12.0
-    elif 12 <= latitude <= 15:
-        if 74 <= longitude <= 78:
-            return 15.5
-        elif 77 <= longitude <= 80:
-            return 6.5
-        else:
-            return 11.0
-    elif 15 <= latitude <= 20:
-        if 72 <= longitude <= 78:
-            return 9.2
-        elif 78 <= longitude <= 82:
-            return 18.5
-        else:
-            return 12.8
-    elif 20 <= latitude <= 24:
-        if 75 <= longitude <= 82:
-            return 25.5
-        elif 82 <= longitude <= 87:
-            return 16.2
-        else:
-            return 19.0
-    elif 24 <= latitude <= 28:
-        if 70 <= longitude <= 78:
-            return 35.8
-        elif 78 <= longitude <= 85:
-            return 42.5
-        else:
-            return 28.0
-    elif 28 <= latitude <= 32:
-        if 74 <= longitude <= 78:
-            return 31.2
-        elif 75 <= longitude <= 77:
-            return 26.8
-        else:
-            return 33.5
-    else:
-        return 20.0
+    return get_spatial_index().lookup("soil_infiltration_mm_hr", latitude, longitude)
 
 def get_aquifer_characteristics(groundwater_depth: float) -> dict:
     if groundwater_depth < 5:
@@ -267,17 +280,7 @@ def get_government_subsidy(structure_type: str, cost: int) -> int:
     return min(int(cost * rate), max_subsidies.get(structure_type, 30000))
 
 def determine_aquifer_type(latitude: float, longitude: float) -> str:
-    if 8 <= latitude <= 15:
-        if 72 <= longitude <= 76:
-            return "Fractured Rock Aquifer in Precambrian Crystallines"
-        else:
-            return "Phreatic Aquifer in Peninsular Gneissic Complex"
-    elif 15 <= latitude <= 23:
-        return "Mixed Aquifer in Deccan Trap Basalts"
-    elif 23 <= latitude <= 30:
-        return "Alluvial Aquifer in Indo-Gangetic Plains"
-    else:
-        return "Mountain Aquifer in Tertiary Formations"
+    return get_spatial_index().lookup("aquifer_type", latitude, longitude)
 
 def evaluate_site_conditions(roof_area_sqm: float, groundwater_depth: float, soil_infiltration: float, daily_runoff: float) -> dict:
     conditions = {
@@ -432,81 +435,42 @@ def calculate_accurate_rwh_savings(runoff_liters: int, groundwater_depth: float,
     }
 
 def get_district_from_coordinates(latitude: float, longitude: float) -> str:
-    if 12.8 <= latitude <= 13.2 and 77.3 <= longitude <= 77.8:
-        return "Bengaluru Urban"
-    elif 12.4 <= latitude <= 12.8 and 77.0 <= longitude <= 77.4:
-        return "Ramanagara"
-    elif 12.2 <= latitude <= 12.6 and 76.5 <= longitude <= 77.0:
-        return "Mysuru"
-    elif 13.0 <= latitude <= 13.5 and 77.0 <= longitude <= 77.6:
-        return "Tumakuru"
-    elif 13.3 <= latitude <= 13.8 and 77.2 <= longitude <= 77.8:
-        return "Chikkaballapur"
-    elif 12.0 <= latitude <= 12.4 and 77.4 <= longitude <= 78.0:
-        return "Chamarajanagar"
-    elif 12.8 <= latitude <= 13.3 and 79.8 <= longitude <= 80.3:
-        return "Chennai"
-    elif 11.0 <= latitude <= 11.5 and 76.8 <= longitude <= 77.3:
-        return "Coimbatore"
-    elif 10.7 <= latitude <= 11.2 and 78.0 <= longitude <= 78.5:
-        return "Madurai"
-    elif 17.2 <= latitude <= 17.8 and 78.2 <= longitude <= 78.8:
-        return "Hyderabad"
-    elif 15.8 <= latitude <= 16.4 and 80.8 <= longitude <= 81.4:
-        return "Vijayawada"
-    elif 9.8 <= latitude <= 10.2 and 76.2 <= longitude <= 76.8:
-        return "Kochi"
-    elif 8.4 <= latitude <= 8.9 and 76.8 <= longitude <= 77.4:
-        return "Thiruvananthapuram"
-    elif 18.8 <= latitude <= 19.4 and 72.6 <= longitude <= 73.2:
-        return "Mumbai Suburban"
-    elif 18.4 <= latitude <= 18.8 and 73.6 <= longitude <= 74.2:
-        return "Pune"
-    elif 8 <= latitude <= 15:
-        return "Bengaluru Urban"
-    elif 15 <= latitude <= 20:
-        return "Pune"
-    elif 20 <= latitude <= 25:
-        return "Bhopal"
-    elif 25 <= latitude <= 32:
-        return "Delhi"
-    else:
-        return "Bengaluru Urban"
+    return get_spatial_index().lookup("district", latitude, longitude)
 
-async def get_hydrogeological_data(latitude: float, longitude: float) -> dict:
-    start_date = "1990-01-01"
-    end_date = "2023-12-31"
-    api_url = f"https://archive-api.open-meteo.com/v1/archive?latitude={latitude}&longitude={longitude}&start_date={start_date}&end_date={end_date}&daily=precipitation_sum,temperature_2m_max"
-    
+def prefetch_hydrogeological_data(latitude: float, longitude: float, district: str = None) -> asyncio.Task:
+    # Starts this request's lookup for the point, or returns the one already
+    # started. The combined endpoint prefetches with the caller's district; the
+    # agent's tool call for the same point (which passes none) then awaits it.
+    # Concurrent lookups from other requests share one computation.
+    lat, lon = quantize(latitude, longitude)
+    started = get_agent_data_store().setdefault('hydrogeology_results', {})
+    task = started.get((lat, lon))
+    if task is None:
+        task = asyncio.ensure_future(hydrogeology_flight.do((lat, lon, district), lambda: compute_hydrogeological_data(lat, lon, district)))
+        started[(lat, lon)] = task
+    return task
+
+@timed("tool.get_hydrogeological_data")
+async def get_hydrogeological_data(latitude: float, longitude: float, district: str = None) -> dict:
+    # Shielded: a cancelled caller must not cancel a lookup the other one awaits
+    shared = await asyncio.shield(prefetch_hydrogeological_data(latitude, longitude, district))
+    result = {**shared, "latitude": latitude, "longitude": longitude}
+    get_agent_data_store()['environmental_data'] = result
+    return result
+
+async def compute_hydrogeological_data(latitude: float, longitude: float, district: str = None) -> dict:
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(api_url, timeout=30.0)
-            response.raise_for_status()
-            weather_data = response.json()
-            
-        daily_precip = weather_data.get('daily', {}).get('precipitation_sum', [])
-        daily_temp_max = weather_data.get('daily', {}).get('temperature_2m_max', [])
-        
-        if not daily_precip:
-            avg_annual_rainfall_mm = 970
-            avg_temp = 25.0
-        else:
-            valid_precip = [p for p in daily_precip if p is not None]
-            total_precip = sum(valid_precip)
-            num_years = len(weather_data['daily']['time']) / 365.25
-            avg_annual_rainfall_mm = round(total_precip / num_years) if num_years > 0 else 970
-            
-            valid_temp = [t for t in daily_temp_max if t is not None]
-            avg_temp = sum(valid_temp) / len(valid_temp) if valid_temp else 25.0
-            
+        climate = await get_climate_summary(latitude, longitude)
+        avg_annual_rainfall_mm = climate["annual_rainfall_mm"]
+        avg_temp = climate["average_temperature_celsius"]
     except Exception:
-        avg_annual_rainfall_mm = 970
-        avg_temp = 25.0
+        avg_annual_rainfall_mm = DEFAULT_ANNUAL_RAINFALL_MM
+        avg_temp = DEFAULT_TEMPERATURE_CELSIUS
     
-    district = get_district_from_coordinates(latitude, longitude)
+    district = district or get_district_from_coordinates(latitude, longitude)
     
     try:
-        gwl_depth = predict_gwl(district, latitude, longitude)
+        gwl_depth = await predict_gwl_shared(district, latitude, longitude)
         model_status = "ml_model_used"
     except Exception:
         gwl_depth = 15.5
@@ -527,9 +491,9 @@ async def get_hydrogeological_data(latitude: float, longitude: float) -> dict:
         "climate_zone": "Humid Tropical" if avg_annual_rainfall_mm > 1500 else ("Sub-humid Tropical" if avg_annual_rainfall_mm > 1000 else "Semi-arid Tropical")
     }
     
-    agent_data_store['environmental_data'] = result
     return result
 
+@timed("tool.calculate_harvesting_potential")
 async def calculate_harvesting_potential(roof_area_sqm: float, annual_rainfall_mm: int) -> dict:
     try:
         runoff_coefficient = 0.85
@@ -540,96 +504,200 @@ async def calculate_harvesting_potential(roof_area_sqm: float, annual_rainfall_m
         
         result = {"runoff_liters": runoff_liters, "annual_savings_inr": potential_savings_inr, "savings_breakdown": savings_data["savings_breakdown"]}
         
-        agent_data_store['harvesting_data'] = result
+        get_agent_data_store()['harvesting_data'] = result
         return result
         
     except Exception:
         return {"runoff_liters": 50000, "annual_savings_inr": 12000, "savings_breakdown": {}}
 
-async def recommend_recharge_structure(roof_area_sqm: float, groundwater_depth_meters: float, runoff_liters: int, latitude: float = 12.9716, longitude: float = 77.5946) -> dict:
-    try:
-        soil_infiltration = calculate_soil_infiltration_rate(latitude, longitude)
-        aquifer_data = get_aquifer_characteristics(groundwater_depth_meters)
-        location_factor = random.uniform(1.05, 1.25)
-        
-        daily_runoff = runoff_liters / 365
-        peak_runoff = daily_runoff * 2.5
-        
-        site_evaluation = evaluate_site_conditions(roof_area_sqm, groundwater_depth_meters, soil_infiltration, daily_runoff)
-        structure_type = site_evaluation["recommended_structure"]
-        
-        dimension_data = calculate_structure_dimensions(structure_type, daily_runoff, peak_runoff, soil_infiltration, groundwater_depth_meters)
-        volume_m3 = dimension_data["volume_m3"]
-        dimensions = dimension_data["dimensions"]
-        
-        capacity_liters = int(volume_m3 * aquifer_data['porosity'] * 1000 * aquifer_data['recharge_efficiency'])
-        cost_data = calculate_realistic_structure_cost(structure_type, volume_m3, location_factor)
-        estimated_cost = cost_data["total_cost"]
-        subsidy_amount = get_government_subsidy(structure_type, estimated_cost)
-        
-        savings_data = calculate_accurate_rwh_savings(runoff_liters, groundwater_depth_meters, roof_area_sqm)
-        total_annual_savings = savings_data["savings_breakdown"]["total_annual_savings"]
-        
-        net_investment = estimated_cost - subsidy_amount
-        payback_years = round(net_investment / total_annual_savings, 1) if total_annual_savings > 0 else float('inf')
-        
-        result = {
-            "suggested_structure": structure_type,
-            "selection_rationale": f"Selected based on site conditions: {site_evaluation['conditions']['space_availability']} space, {site_evaluation['conditions']['depth_category']} groundwater, {site_evaluation['conditions']['infiltration_category']} infiltration, {site_evaluation['conditions']['runoff_category']} runoff volume",
-            "confidence_score": round(site_evaluation['confidence_score'], 2),
-            "recommended_dimensions": dimensions,
-            "volume_m3": volume_m3,
-            "design_parameters": dimension_data["design_basis"],
-            "estimated_cost_inr": estimated_cost,
-            "cost_breakdown": cost_data["cost_breakdown"],
-            "capacity_liters": capacity_liters,
-            "overflow_capacity_liters": int(capacity_liters * 1.2),
-            "daily_recharge_capacity_liters": int(capacity_liters / 30),
-            "subsidy_available_inr": subsidy_amount,
-            "net_investment_inr": net_investment,
-            "annual_savings_inr": total_annual_savings,
-            "savings_breakdown": savings_data["savings_breakdown"],
-            "payback_period_years": payback_years,
-            "soil_infiltration_rate_mm_hr": round(soil_infiltration, 1),
-            "aquifer_type": aquifer_data['type'],
-            "recharge_efficiency": aquifer_data['recharge_efficiency'],
-            "location_cost_factor": round(location_factor, 2),
-            "alternative_structures": {k: v for k, v in site_evaluation['structure_scores'].items() if k != structure_type}
+def build_structure_result(structure_type: str, site_evaluation: dict, dimension_data: dict, aquifer_data: dict, cost_data: dict, subsidy_amount: int, savings_breakdown: dict, soil_infiltration: float, location_factor: float) -> dict:
+    # The structure recommendation assembled from each design step's output; the
+    # dashboard session graph builds its report through this as well
+    volume_m3 = dimension_data["volume_m3"]
+    capacity_liters = int(volume_m3 * aquifer_data['porosity'] * 1000 * aquifer_data['recharge_efficiency'])
+    estimated_cost = cost_data["total_cost"]
+    total_annual_savings = savings_breakdown["total_annual_savings"]
+    
+    net_investment = estimated_cost - subsidy_amount
+    payback_years = round(net_investment / total_annual_savings, 1) if total_annual_savings > 0 else float('inf')
+    
+    return {
+        "suggested_structure": structure_type,
+        "selection_rationale": f"Selected based on site conditions: {site_evaluation['conditions']['space_availability']} space, {site_evaluation['conditions']['depth_category']} groundwater, {site_evaluation['conditions']['infiltration_category']} infiltration, {site_evaluation['conditions']['runoff_category']} runoff volume",
+        "confidence_score": round(site_evaluation['confidence_score'], 2),
+        "recommended_dimensions": dimension_data["dimensions"],
+        "volume_m3": volume_m3,
+        "design_parameters": dimension_data["design_basis"],
+        "estimated_cost_inr": estimated_cost,
+        "cost_breakdown": cost_data["cost_breakdown"],
+        "capacity_liters": capacity_liters,
+        "overflow_capacity_liters": int(capacity_liters * 1.2),
+        "daily_recharge_capacity_liters": int(capacity_liters / 30),
+        "subsidy_available_inr": subsidy_amount,
+        "net_investment_inr": net_investment,
+        "annual_savings_inr": total_annual_savings,
+        "savings_breakdown": savings_breakdown,
+        "payback_period_years": payback_years,
+        "soil_infiltration_rate_mm_hr": round(soil_infiltration, 1),
+        "aquifer_type": aquifer_data['type'],
+        "recharge_efficiency": aquifer_data['recharge_efficiency'],
+        "location_cost_factor": round(location_factor, 2),
+        "alternative_structures": {k: v for k, v in site_evaluation['structure_scores'].items() if k != structure_type}
+    }
+
+def design_recharge_structure(roof_area_sqm: float, groundwater_depth_meters: float, runoff_liters: int, latitude: float, longitude: float, location_factor: float) -> dict:
+    soil_infiltration = calculate_soil_infiltration_rate(latitude, longitude)
+    aquifer_data = get_aquifer_characteristics(groundwater_depth_meters)
+    
+    daily_runoff = runoff_liters / 365
+    peak_runoff = daily_runoff * 2.5
+    
+    site_evaluation = evaluate_site_conditions(roof_area_sqm, groundwater_depth_meters, soil_infiltration, daily_runoff)
+    structure_type = site_evaluation["recommended_structure"]
+    
+    dimension_data = calculate_structure_dimensions(structure_type, daily_runoff, peak_runoff, soil_infiltration, groundwater_depth_meters)
+    cost_data = calculate_realistic_structure_cost(structure_type, dimension_data["volume_m3"], location_factor)
+    subsidy_amount = get_government_subsidy(structure_type, cost_data["total_cost"])
+    savings_data = calculate_accurate_rwh_savings(runoff_liters, groundwater_depth_meters, roof_area_sqm)
+    
+    return build_structure_result(structure_type, site_evaluation, dimension_data, aquifer_data, cost_data, subsidy_amount, savings_data["savings_breakdown"], soil_infiltration, location_factor)
+
+def compare_recharge_structures(roof_area_sqm: float, groundwater_depth_meters: float, runoff_liters: int, latitude: float, longitude: float, location_factor: float) -> dict:
+    # All four structure types designed in one engine pass for side-by-side comparison
+    soil_infiltration = calculate_soil_infiltration_rate(latitude, longitude)
+    design = design_sites(roof_area_sqm, groundwater_depth_meters, soil_infiltration, runoff_liters, location_factor)
+    total_cost = design["costs"]["total_cost"][0]
+    capacity = design["capacity_liters"][0]
+    on_frontier = pareto_front(total_cost, capacity)
+    
+    structures = []
+    for j, structure_type in enumerate(STRUCTURE_TYPES):
+        structures.append({
+            "structure": structure_type,
+            "suitability_score": int(design["evaluation"]["structure_scores"][0, j]),
+            "recommended_dimensions": format_dimensions(design["dimensions"], j, 0),
+            "volume_m3": float(design["volume_m3"][0, j]),
+            "capacity_liters": int(capacity[j]),
+            "estimated_cost_inr": int(total_cost[j]),
+            "subsidy_available_inr": int(design["subsidy"][0, j]),
+            "net_investment_inr": int(design["net_investment"][0, j]),
+            "payback_period_years": float(design["payback_years"][0, j]),
+            "pareto_optimal": bool(on_frontier[j]),
+        })
+    
+    return {
+        "recommended_structure": STRUCTURE_TYPES[int(design["evaluation"]["recommended_structure"][0])],
+        "annual_savings_inr": int(design["savings"]["total_annual_savings"][0]),
+        "location_cost_factor": round(location_factor, 2),
+        "structures": structures,
+        # Cheapest first; each step up buys more recharge capacity
+        "pareto_frontier": [s["structure"] for s in sorted(structures, key=lambda s: s["estimated_cost_inr"]) if s["pareto_optimal"]],
+    }
+
+def simulate_water_balance(precipitation, roof_area_sqm: float, design: dict, soil_infiltration: float, structure_type: str) -> dict:
+    # Replays the daily rainfall record through each structure as designed; the
+    # sizing rules above still work from the annual average
+    balance = simulate_designs(precipitation, roof_area_sqm, design, soil_infiltration)
+    storms = storm_percentiles(precipitation)
+    drain = balance["drain_m3_per_day"][0]
+    structures = {}
+    for j, name in enumerate(STRUCTURE_TYPES):
+        structures[name] = {
+            "storage_liters": int(design["capacity_liters"][0, j]),
+            "infiltration_liters_per_day": int(drain[j] * 1000),
+            "overflow_days_per_year": round(float(balance["overflow_days_per_year"][0, j]), 1),
+            "realised_recharge_liters_per_year": int(balance["recharge_m3_per_year"][0, j] * 1000),
+            "overflow_liters_per_year": int(balance["overflow_m3_per_year"][0, j] * 1000),
+            "capture_ratio": round(float(balance["capture_ratio"][0, j]), 3),
         }
+    return {
+        "years": round(balance["years"], 1),
+        "storm_percentiles_mm": storms,
+        "design_storm_runoff_liters": int(roof_area_sqm * RUNOFF_COEFFICIENT * storms["p99_mm"]),
+        **structures[structure_type],
+        "structures": structures,
+    }
+
+async def optimize_structure_size(precipitation, result: dict, roof_area_sqm: float, groundwater_depth_meters: float, latitude: float, longitude: float, location_factor: float) -> dict:
+    if precipitation is None:
+        return {"optimal": None, "detail": "Daily rainfall record unavailable for this location"}
+    # Hundreds of simulated candidates on a cold site; kept off the event loop
+    optimization = await asyncio.to_thread(
+        size_optimizer.optimize,
+        climate_series.key_for(latitude, longitude),
+        precipitation,
+        roof_area_sqm,
+        groundwater_depth_meters,
+        calculate_soil_infiltration_rate(latitude, longitude),
+        location_factor,
+    )
+    # The rule-based design on the same scale, for comparison
+    recharge_liters = result["water_balance"]["realised_recharge_liters_per_year"]
+    rule_based = round(result["net_investment_inr"] / (recharge_liters / 1000 * DESIGN_LIFE_YEARS), 2) if recharge_liters > 0 else None
+    return {**optimization, "rule_based_cost_per_m3_recharged_inr": rule_based}
+
+def get_location_cost_factor(latitude: float, longitude: float) -> float:
+    return location_cost_factor(latitude, longitude, get_district_from_coordinates(latitude, longitude))
+
+@timed("tool.recommend_recharge_structure")
+async def recommend_recharge_structure(roof_area_sqm: float, groundwater_depth_meters: float, runoff_liters: int, latitude: float = 12.9716, longitude: float = 77.5946, compare: bool = False, cost_draws: int = 0, cost_seed: int = 0, optimize: bool = False) -> dict:
+    try:
+        location_factor = get_location_cost_factor(latitude, longitude)
+        result = design_recharge_structure(roof_area_sqm, groundwater_depth_meters, runoff_liters, latitude, longitude, location_factor)
+        if compare:
+            result["structure_comparison"] = compare_recharge_structures(roof_area_sqm, groundwater_depth_meters, runoff_liters, latitude, longitude, location_factor)
+        # The water balance only uses a series that is already stored or cached
+        # (the hydrogeology lookup caches it when it fetches the archive), so
+        # agent tool calls and bulk rows never wait on the network here. Size
+        # optimization is asked for explicitly and may fetch the series.
+        precipitation = cached_daily_precipitation(latitude, longitude)
+        if precipitation is None and optimize:
+            try:
+                precipitation = await get_daily_precipitation(latitude, longitude)
+            except Exception as e:
+                print(f"Daily rainfall unavailable, skipping water balance: {e}")
+        if cost_draws > 0 or precipitation is not None:
+            soil_infiltration = calculate_soil_infiltration_rate(latitude, longitude)
+            design = design_sites(roof_area_sqm, groundwater_depth_meters, soil_infiltration, runoff_liters, location_factor)
+        if cost_draws > 0:
+            result["cost_uncertainty"] = simulate_structure_costs(design["volume_m3"][0], location_factor, cost_draws, cost_seed)
+        if precipitation is not None:
+            result["water_balance"] = simulate_water_balance(precipitation, roof_area_sqm, design, soil_infiltration, result["suggested_structure"])
+        if optimize:
+            result["size_optimization"] = await optimize_structure_size(precipitation, result, roof_area_sqm, groundwater_depth_meters, latitude, longitude, location_factor)
         
-        agent_data_store['structure_data'] = result
+        get_agent_data_store()['structure_data'] = result
         return result
         
-    except Exception:
-        fallback_structures = ["Recharge Pit", "Recharge Trench", "Recharge Shaft", "Injection Well"]
-        weights = [0.4, 0.3, 0.2, 0.1]
-        fallback_structure = random.choices(fallback_structures, weights=weights)[0]
-        
-        fallback_cost = random.randint(45000, 85000)
-        fallback_capacity = random.randint(4000, 12000)
-        fallback_savings = random.randint(8000, 18000)
+    except Exception as e:
+        print(f"Structure recommendation failed, using fallback: {e}")
+        # Fixed mid-range values so the same inputs always give the same answer
+        fallback_cost = 65000
+        fallback_capacity = 8000
         
         return {
-            "suggested_structure": fallback_structure,
+            "suggested_structure": "Recharge Pit",
             "selection_rationale": "Fallback recommendation due to calculation error",
             "confidence_score": 0.6,
-            "recommended_dimensions": f"{random.uniform(2.0, 3.0):.1f}m × {random.uniform(2.0, 3.0):.1f}m × {random.uniform(2.0, 3.5):.1f}m",
-            "volume_m3": random.uniform(8, 25),
+            "recommended_dimensions": "2.5m × 2.5m × 2.8m",
+            "volume_m3": 17.5,
             "estimated_cost_inr": fallback_cost,
             "capacity_liters": fallback_capacity,
             "overflow_capacity_liters": int(fallback_capacity * 1.2),
             "daily_recharge_capacity_liters": int(fallback_capacity / 30),
             "subsidy_available_inr": int(fallback_cost * 0.35),
             "net_investment_inr": int(fallback_cost * 0.65),
-            "annual_savings_inr": fallback_savings,
-            "payback_period_years": round(random.uniform(3.5, 8.0), 1),
+            "annual_savings_inr": 13000,
+            "payback_period_years": 3.2,
             "soil_infiltration_rate_mm_hr": 15.0,
             "aquifer_type": "Intermediate Unconfined",
             "recharge_efficiency": 0.7,
             "location_cost_factor": 1.15
         }
 
+@timed("tool.format_final_report")
 async def format_final_report(ai_recommendation: str, annual_savings_inr: int, payback_period_years: float) -> dict:
+    agent_data_store = get_agent_data_store()
     environmental_data = agent_data_store.get('environmental_data', {})
     harvesting_data = agent_data_store.get('harvesting_data', {})
     structure_data = agent_data_store.get('structure_data', {})
@@ -649,105 +717,359 @@ async def format_final_report(ai_recommendation: str, annual_savings_inr: int, p
     
     return result
 
-# LangChain Tools
-class GetHydrogeologicalDataTool(BaseTool):
-    name: str = "get_hydrogeological_data"
-    description: str = "Essential for finding the aquifer type, groundwater level, climate data, and average annual rainfall for a given geographic location."
-    args_schema: Type[BaseModel] = HydrogeologyInput
+def build_template_narrative(environmental_data: dict, harvesting_data: dict, structure_data: dict) -> str:
+    return (
+        f"A {structure_data['suggested_structure']} is recommended for this site "
+        f"(confidence {structure_data['confidence_score']:.2f}). {structure_data['selection_rationale']}. "
+        f"The location in {environmental_data['district']} lies over a {environmental_data['principal_aquifer']} "
+        f"with groundwater at about {environmental_data['groundwater_depth_meters']:.1f} m and an average annual rainfall "
+        f"of {environmental_data['annual_rainfall_mm']} mm ({environmental_data['climate_zone']}). "
+        f"Your roof can harvest roughly {harvesting_data['runoff_liters']:,} liters a year. "
+        f"The suggested design is {structure_data['recommended_dimensions']} ({structure_data['volume_m3']} m³), "
+        f"with a recharge capacity of {structure_data['capacity_liters']:,} liters in soil that infiltrates "
+        f"{structure_data['soil_infiltration_rate_mm_hr']} mm/hr. "
+        f"It is estimated to cost ₹{structure_data['estimated_cost_inr']:,}; after a subsidy of "
+        f"₹{structure_data['subsidy_available_inr']:,} the net investment is ₹{structure_data['net_investment_inr']:,}. "
+        f"With annual savings of about ₹{structure_data['annual_savings_inr']:,}, mainly from reduced borewell running "
+        f"and maintenance costs, the system pays for itself in about {structure_data['payback_period_years']} years."
+    )
+
+def build_narrative_messages(environmental_data: dict, harvesting_data: dict, structure_data: dict) -> list:
+    facts = {
+        "environment": environmental_data,
+        "harvesting": {k: v for k, v in harvesting_data.items() if k != "savings_breakdown"},
+        "structure": structure_data,
+    }
+    return [
+        ("system", "You are an expert hydrogeologist for the 'JalSetu' app. Write one comprehensive yet user-friendly recommendation covering the structure choice and its engineering rationale, dimensions, location factors, cost and subsidy, savings and payback. Use only the figures provided."),
+        ("human", json.dumps(facts, default=str)),
+    ]
+
+async def iter_recommendation_pipeline(latitude: float, longitude: float, roof_area_sqm: float, district: str = None, narrative: str = "template", compare_structures: bool = False, cost_simulations: int = 0, cost_seed: int = 0, optimize_size: bool = False):
+    # Same tool sequence the agent prompt prescribes, without the LLM planning steps.
+    # Yields (stage, payload) as each stage finishes so callers can stream them.
+    new_agent_data_store()
+    environmental_data = await get_hydrogeological_data(latitude, longitude, district)
+    yield "hydrogeology", environmental_data
+    
+    harvesting_data = await calculate_harvesting_potential(roof_area_sqm, environmental_data["annual_rainfall_mm"])
+    yield "harvesting", harvesting_data
+    
+    structure_data = await recommend_recharge_structure(
+        roof_area_sqm,
+        environmental_data["groundwater_depth_meters"],
+        harvesting_data["runoff_liters"],
+        latitude,
+        longitude,
+        compare=compare_structures,
+        cost_draws=cost_simulations,
+        cost_seed=cost_seed,
+        optimize=optimize_size,
+    )
+    yield "structure", structure_data
+    
+    ai_recommendation = None
+    if narrative == "llm":
+        try:
+            import agent
+            tokens = []
+            async with span("llm.narrative"):
+                messages = build_narrative_messages(environmental_data, harvesting_data, structure_data)
+                async for chunk in get_llm().astream(messages, config={"callbacks": [agent.LLMMetricsHandler()]}):
+                    if chunk.content:
+                        tokens.append(chunk.content)
+                        yield "narrative_token", {"text": chunk.content}
+            ai_recommendation = "".join(tokens)
+        except Exception as e:
+            print(f"LLM narrative failed, using template: {e}")
+    if not ai_recommendation:
+        ai_recommendation = build_template_narrative(environmental_data, harvesting_data, structure_data)
+    # Full text, so clients can replace partial tokens if the LLM stream fell back
+    yield "narrative", {"text": ai_recommendation}
+    
+    report = await format_final_report(
+        ai_recommendation,
+        structure_data["annual_savings_inr"],
+        structure_data["payback_period_years"],
+    )
+    yield "report", report
+
+async def run_recommendation_pipeline(latitude: float, longitude: float, roof_area_sqm: float, district: str = None, narrative: str = "template", compare_structures: bool = False, cost_simulations: int = 0, cost_seed: int = 0, optimize_size: bool = False) -> dict:
+    report = None
+    async for stage, payload in iter_recommendation_pipeline(latitude, longitude, roof_area_sqm, district, narrative, compare_structures, cost_simulations, cost_seed, optimize_size):
+        if stage == "report":
+            report = payload
+    return report
 
-    def _run(self, *args, **kwargs):
-        raise NotImplementedError("This tool does not support synchronous execution.")
+def format_stream_event(stage: str, payload: dict, stream_format: str = "sse") -> str:
+    data = json.dumps(payload, default=str, ensure_ascii=False)
+    if stream_format == "ndjson":
+        return json.dumps({"event": stage, "data": payload}, default=str, ensure_ascii=False) + "\n"
+    return f"event: {stage}\ndata: {data}\n\n"
 
-    async def _arun(self, latitude: float, longitude: float):
-        return await get_hydrogeological_data(latitude, longitude)
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "256"))
+BULK_CLIMATE_CONCURRENCY = int(os.getenv("BULK_CLIMATE_CONCURRENCY", "8"))
+BULK_MAX_LINE_BYTES = int(os.getenv("BULK_MAX_LINE_BYTES", "65536"))
+BULK_SPOOL_MEMORY_BYTES = int(os.getenv("BULK_SPOOL_MEMORY_BYTES", str(4 * 1024 * 1024)))
 
-class CalculateHarvestingPotentialTool(BaseTool):
-    name: str = "calculate_harvesting_potential"
-    description: str = "Calculates the total annual runoff in liters and provides accurate annual savings based on real-world benefits like reduced borewell costs."
-    args_schema: Type[BaseModel] = RunoffInput
+BULK_FIELD_ALIASES = {
+    "latitude": ("latitude", "lat"),
+    "longitude": ("longitude", "lon", "lng"),
+    "roof_area_sqm": ("roof_area_sqm", "roof_area", "area"),
+}
 
-    def _run(self, *args, **kwargs):
-        raise NotImplementedError("This tool does not support synchronous execution.")
+BULK_OUTPUT_FIELDS = [
+    "row", "id", "latitude", "longitude", "roof_area_sqm", "district", "groundwater_depth_meters",
+    "annual_rainfall_mm", "runoff_liters", "soil_infiltration_rate_mm_hr", "suggested_structure",
+    "confidence_score", "recommended_dimensions", "volume_m3", "capacity_liters", "estimated_cost_inr",
+    "subsidy_available_inr", "net_investment_inr", "annual_savings_inr", "payback_period_years",
+    "overflow_days_per_year", "realised_recharge_liters", "error",
+]
 
-    async def _arun(self, roof_area_sqm: float, annual_rainfall_mm: int):
-        return await calculate_harvesting_potential(roof_area_sqm, annual_rainfall_mm)
+def parse_bulk_record(record: dict, row_number: int) -> dict:
+    row = {"row": row_number, "id": record.get("id")}
+    try:
+        for field, aliases in BULK_FIELD_ALIASES.items():
+            value = next((record[a] for a in aliases if record.get(a) not in (None, "")), None)
+            if value is None:
+                raise ValueError(f"missing {field}")
+            row[field] = float(value)
+        if row["roof_area_sqm"] <= 0:
+            raise ValueError("roof_area_sqm must be positive")
+    except (TypeError, ValueError) as e:
+        row["error"] = str(e)
+    return row
 
-class RecommendRechargeStructureTool(BaseTool):
-    name: str = "recommend_recharge_structure"
-    description: str = "ADVANCED structure recommendation using engineering-based evaluation system. Analyzes site conditions to score and select optimal structure with confidence scores and detailed rationale."
-    args_schema: Type[BaseModel] = StructureInput
+async def iter_body_lines(chunks):
+    # Decodes the request body incrementally; only one partial line is buffered
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        if len(buffer) > BULK_MAX_LINE_BYTES:
+            raise ValueError("Bulk input line too long")
+        for line in lines:
+            yield line
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
 
-    def _run(self, *args, **kwargs):
-        raise NotImplementedError("This tool does not support synchronous execution.")
+async def iter_bulk_rows(chunks, is_csv: bool):
+    header = None
+    row_number = 0
+    async for line in iter_body_lines(chunks):
+        line = line.strip().lstrip("\ufeff")
+        if not line:
+            continue
+        if is_csv:
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [h.strip().lower() for h in values]
+                continue
+            record = dict(zip(header, values))
+        else:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                record = None
+                error = f"invalid JSON: {e}"
+            else:
+                error = None if isinstance(record, dict) else "each line must be a JSON object"
+            if error:
+                row_number += 1
+                yield {"row": row_number, "error": error}
+                continue
+        row_number += 1
+        yield parse_bulk_record(record, row_number)
+
+async def iter_batches(rows, batch_size: int):
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
-    async def _arun(self, roof_area_sqm: float, groundwater_depth_meters: float, runoff_liters: int, latitude: float = 12.9716, longitude: float = 77.5946):
-        return await recommend_recharge_structure(roof_area_sqm, groundwater_depth_meters, runoff_liters, latitude, longitude)
+async def lookup_climate_batch(coordinates: list) -> dict:
+    # One lookup per climate cell in the batch, with a cap on concurrent fetches
+    semaphore = asyncio.Semaphore(BULK_CLIMATE_CONCURRENCY)
+    cells = {}
+    for lat, lon in coordinates:
+        cells.setdefault(climate_cache.key_for(lat, lon), (lat, lon))
+    
+    async def lookup(key, lat, lon):
+        async with semaphore:
+            try:
+                summary = await get_climate_summary(lat, lon)
+                return key, summary["annual_rainfall_mm"]
+            except Exception:
+                return key, DEFAULT_ANNUAL_RAINFALL_MM
+    
+    results = await asyncio.gather(*(lookup(key, lat, lon) for key, (lat, lon) in cells.items()))
+    return dict(results)
 
-class FormatFinalReportTool(BaseTool):
-    name: str = "format_final_report"
-    description: str = "Use this as your final step to format the complete report for the user with all technical and financial details."
-    args_schema: Type[BaseModel] = FinalReport
+def bulk_water_balance(rows: list, design: dict, soil_infiltration, recommended) -> dict:
+    # Recommended structure per row, one simulation per climate cell. Only cells
+    # whose daily series is already stored or cached are simulated.
+    by_cell = {}
+    for i, row in enumerate(rows):
+        by_cell.setdefault(climate_cache.key_for(row["latitude"], row["longitude"]), []).append(i)
+    drain = design_drain_m3_per_day(design, soil_infiltration)
+    overflow_days, recharge_liters = {}, {}
+    for indices in by_cell.values():
+        precipitation = cached_daily_precipitation(rows[indices[0]]["latitude"], rows[indices[0]]["longitude"])
+        if precipitation is None:
+            continue
+        structures = recommended[indices]
+        balance = simulate(
+            precipitation,
+            [rows[i]["roof_area_sqm"] for i in indices],
+            design["capacity_liters"][indices, structures] / 1000,
+            drain[indices, structures],
+        )
+        for k, i in enumerate(indices):
+            overflow_days[i] = round(float(balance["overflow_days_per_year"][k]), 1)
+            recharge_liters[i] = int(balance["recharge_m3_per_year"][k] * 1000)
+    return {"overflow_days_per_year": overflow_days, "realised_recharge_liters": recharge_liters}
 
-    def _run(self, *args, **kwargs):
-        raise NotImplementedError("This tool does not support synchronous execution.")
-        
-    async def _arun(self, ai_recommendation: str, annual_savings_inr: int, payback_period_years: float):
-        return await format_final_report(ai_recommendation, annual_savings_inr, payback_period_years)
-
-tools = [
-    GetHydrogeologicalDataTool(),
-    CalculateHarvestingPotentialTool(),
-    RecommendRechargeStructureTool(),
-    FormatFinalReportTool(),
-]
+def screen_rows(rows: list, rainfall_by_cell: dict, gwl_depths) -> list:
+    annual_rainfall = [rainfall_by_cell[climate_cache.key_for(row["latitude"], row["longitude"])] for row in rows]
+    runoff_liters = [int(row["roof_area_sqm"] * rainfall * 0.85) for row, rainfall in zip(rows, annual_rainfall)]
+    soil_infiltration = get_spatial_index().lookup_many(
+        "soil_infiltration_mm_hr", [row["latitude"] for row in rows], [row["longitude"] for row in rows]
+    )
+    location_factors = [location_cost_factor(row["latitude"], row["longitude"], row["district"]) for row in rows]
 
-# Agent Prompt
-prompt = ChatPromptTemplate.from_messages([
-    ("system", """You are an expert hydrogeologist AI assistant for the 'JalSetu' app.
-Your goal is to provide a complete and dynamic feasibility report using real-world location-specific data and accurate calculations.
+    # Whole batch goes through the array engine; each row keeps its recommended structure
+    design = design_sites(
+        [row["roof_area_sqm"] for row in rows], gwl_depths, soil_infiltration, runoff_liters, location_factors
+    )
+    recommended = design["evaluation"]["recommended_structure"]
+    balance = bulk_water_balance(rows, design, soil_infiltration, recommended)
 
-You must proceed in the following order:
-1. First, use the `get_hydrogeological_data` tool to find essential environmental data including coordinates.
-2. Second, use the `calculate_harvesting_potential` tool with the roof area and rainfall data.
-3. Third, use the `recommend_recharge_structure` tool with ALL parameters INCLUDING the latitude and longitude from step 1.
-4. Finally, use the `format_final_report` tool as your final action.
+    results = []
+    for i, row in enumerate(rows):
+        structure = int(recommended[i])
+        payback = float(design["payback_years"][i, structure])
+        results.append({
+            **row,
+            "groundwater_depth_meters": round(float(gwl_depths[i]), 2),
+            "annual_rainfall_mm": annual_rainfall[i],
+            "runoff_liters": runoff_liters[i],
+            "soil_infiltration_rate_mm_hr": round(float(soil_infiltration[i]), 1),
+            "suggested_structure": STRUCTURE_TYPES[structure],
+            "confidence_score": round(float(design["evaluation"]["confidence_score"][i]), 2),
+            "recommended_dimensions": format_dimensions(design["dimensions"], structure, i),
+            "volume_m3": float(design["volume_m3"][i, structure]),
+            "capacity_liters": int(design["capacity_liters"][i, structure]),
+            "estimated_cost_inr": int(design["costs"]["total_cost"][i, structure]),
+            "subsidy_available_inr": int(design["subsidy"][i, structure]),
+            "net_investment_inr": int(design["net_investment"][i, structure]),
+            "annual_savings_inr": int(design["savings"]["total_annual_savings"][i]),
+            "payback_period_years": payback,
+            "overflow_days_per_year": balance["overflow_days_per_year"].get(i),
+            "realised_recharge_liters": balance["realised_recharge_liters"].get(i),
+        })
+    return results
 
-CRITICAL: When calling recommend_recharge_structure, ALWAYS pass the latitude and longitude from the hydrogeological data to ensure location-specific, dynamic recommendations.
+async def screen_bulk_batch(batch: list) -> list:
+    valid = [row for row in batch if not row.get("error")]
+    if valid:
+        districts = get_spatial_index().lookup_many("district", [row["latitude"] for row in valid], [row["longitude"] for row in valid])
+        for row, district in zip(valid, districts):
+            row["district"] = district
+        rainfall_by_cell = await lookup_climate_batch([(row["latitude"], row["longitude"]) for row in valid])
+        gwl_depths = await gwl_batcher.run(
+            predict_gwl_batch,
+            [row["district"] for row in valid],
+            [row["latitude"] for row in valid],
+            [row["longitude"] for row in valid],
+        )
+        try:
+            screened = iter(await asyncio.to_thread(screen_rows, valid, rainfall_by_cell, gwl_depths))
+        except Exception as e:
+            screened = iter([{**row, "error": f"screening failed: {e}"} for row in valid])
+    else:
+        screened = iter([])
+    # Keep input order, with invalid rows passed through carrying their error
+    return [row if row.get("error") else next(screened) for row in batch]
 
-The recommend_recharge_structure tool uses an advanced engineering-based evaluation system that analyzes site conditions comprehensively and provides detailed rationale for the selection.
+def format_bulk_rows(rows: list, output_format: str, include_header: bool = False) -> str:
+    if output_format == "csv":
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=BULK_OUTPUT_FIELDS, extrasaction="ignore")
+        if include_header:
+            writer.writeheader()
+        writer.writerows(rows)
+        return out.getvalue()
+    return "".join(json.dumps({k: row.get(k) for k in BULK_OUTPUT_FIELDS if row.get(k) is not None}, default=str) + "\n" for row in rows)
 
-When creating the ai_recommendation, include:
-- Structure type and detailed technical justification based on the scoring system
-- Confidence score and selection rationale provided by the tool
-- Real-world dimensions calculated for the specific location and requirements
-- Location-specific factors (geological formations, climate zone, soil infiltration rates)
-- Detailed cost breakdown with realistic pricing and available subsidies
-- Accurate savings analysis focusing on borewell cost reduction
-- Performance metrics including capacity, recharge efficiency, and payback analysis
+agent_token_totals = {**new_token_report(), "requests": 0}
 
-Make the recommendation comprehensive yet user-friendly, explaining the engineering rationale in accessible language."""),
-    ("human", "{input}"),
-    MessagesPlaceholder(variable_name="agent_scratchpad"),
-])
+def project_for_agent(tool_name: str, result: dict) -> str:
+    text, full_tokens, projected_tokens = project_tool_output(tool_name, result)
+    report = get_agent_data_store().setdefault("token_report", new_token_report())
+    report["tool_calls"] += 1
+    report["tool_output_tokens"] += projected_tokens
+    report["tool_output_tokens_unprojected"] += full_tokens
+    return text
 
-# Create Agent
-try:
-    agent = create_openai_functions_agent(llm, tools, prompt)
-    agent_executor = AgentExecutor(
-        agent=agent,
-        tools=tools,
-        verbose=True,
-        return_intermediate_steps=True
-    )
-except Exception as e:
-    print(f"Error creating agent: {e}")
+async def run_agent_report(agent_input: str, callbacks: list = None, timer: StageTimer = None) -> dict:
+    # Returns {"report": final report or None, "output": agent text}; only runs
+    # that end in format_final_report are cached
+    import agent
+    key = report_key(agent_input, report_version)
+    cached = report_cache.get(key)
+    if cached is not None:
+        return {**cached, "token_report": {**new_token_report(), "cache_hit": True, "coalesced": False}}
+    
+    led = False
+    
+    async def run_agent():
+        nonlocal led
+        led = True
+        started = time.perf_counter()
+        token_report = get_agent_data_store().setdefault("token_report", new_token_report())
+        result = await agent_executor.ainvoke({"input": agent_input}, config={"callbacks": [agent.TokenUsageHandler(token_report), agent.LLMMetricsHandler(), *(callbacks or [])]})
+        payload = {"report": agent.extract_final_report(result), "output": result.get("output")}
+        if payload["report"] is not None:
+            report_cache.put(key, payload, time.perf_counter() - started)
+        
+        agent_token_totals["requests"] += 1
+        for field, value in token_report.items():
+            agent_token_totals[field] += value
+        return {**payload, "token_report": {**token_report, "cache_hit": False, "coalesced": False}}
+    
+    waited = time.perf_counter()
+    result = await report_flight.do(key, run_agent)
+    if led:
+        return result
+    # Joined another request's run: its LLM steps and tool calls were timed by
+    # that request's callbacks. Here the wait is the span, and the usage is the
+    # leader's, marked as shared rather than spent again.
+    if timer is not None:
+        timer.add("agent.report_flight_wait", waited, time.perf_counter())
+    return {**result, "token_report": {**result["token_report"], "coalesced": True}}
+
+def get_agent_token_stats() -> dict:
+    requests = agent_token_totals["requests"]
+    unprojected = agent_token_totals["tool_output_tokens_unprojected"]
+    return {
+        **agent_token_totals,
+        "avg_prompt_tokens_per_request": round(agent_token_totals["prompt_tokens"] / requests, 1) if requests else 0.0,
+        "avg_llm_calls_per_request": round(agent_token_totals["llm_calls"] / requests, 2) if requests else 0.0,
+        "tool_output_reduction": round(1 - agent_token_totals["tool_output_tokens"] / unprojected, 4) if unprojected else 0.0,
+    }
 
 # FastAPI Endpoints
 @app.get("/")
 async def root():
     return {
         "status": "Clean AI Agent is running",
-        "gwl_models_loaded": gwl_preprocessor is not None and gwl_model is not None,
+        "gwl_models_loaded": gwl_batcher.models_loaded(),
         "version": "3.1.0-clean",
         "features": [
             "Engineering-based structure selection",
@@ -762,15 +1084,54 @@ async def root():
 async def health_check():
     return {
         "status": "healthy",
-        "gwl_models_loaded": gwl_preprocessor is not None and gwl_model is not None,
-        "agent_ready": 'agent_executor' in globals(),
-        "tools_count": len(tools)
+        "gwl_models_loaded": gwl_batcher.models_loaded(),
+        "gwl_tiles_loaded": get_gwl_tiles() is not None,
+        "gwl_rows_served": gwl_stats,
+        "agent_loaded": agent_executor is not None,
+        "agent_ready": agent_executor is not None or bool(os.getenv("OPENAI_API_KEY")),
+        "tools_count": len(AGENT_TOOL_NAMES)
     }
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/session-graph/stats")
+async def session_graph_stats():
+    return session_store.get_stats()
+
+@app.get("/size-optimizer/stats")
+async def size_optimizer_stats():
+    return size_optimizer.get_stats()
+
+@app.get("/climate-cache/stats")
+async def climate_cache_stats():
+    return {**climate_cache.get_stats(), "daily_series": climate_series.get_stats()}
+
+@app.get("/http-pool/stats")
+async def http_pool_stats():
+    return http_client.get_stats()
+
+@app.get("/gwl-inference/stats")
+async def gwl_inference_stats():
+    return {**gwl_batcher.get_stats(), "rows_served": gwl_stats}
+
+@app.get("/coalescing/stats")
+async def coalescing_stats():
+    return get_coalescing_stats()
+
+@app.get("/agent/token-stats")
+async def agent_token_stats():
+    return get_agent_token_stats()
+
+@app.get("/report-cache/stats")
+async def report_cache_stats():
+    return {**report_cache.get_stats(), "version": report_version, "coalescing": report_flight.get_stats()}
+
 @app.post("/predict-gwl", response_model=GWLResponse)
 async def predict_groundwater_level(request: GWLRequest):
     try:
-        gwl_prediction = predict_gwl(request.district, request.latitude, request.longitude)
+        gwl_prediction = await predict_gwl_shared(request.district, request.latitude, request.longitude)
         
         if gwl_prediction is not None:
             return GWLResponse(
@@ -778,7 +1139,7 @@ async def predict_groundwater_level(request: GWLRequest):
                 unit="mbgl",
                 success=True,
                 district=request.district,
-                status="success" if (gwl_preprocessor is not None and gwl_model is not None) else "fallback"
+                status="success" if gwl_batcher.models_loaded() else "fallback"
             )
         else:
             raise HTTPException(status_code=500, detail="Failed to predict groundwater level")
@@ -786,27 +1147,44 @@ async def predict_groundwater_level(request: GWLRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"GWL prediction error: {str(e)}")
 
+@app.post("/predict-gwl/batch", response_model=GWLBatchResponse)
+async def predict_groundwater_level_batch(request: GWLBatchRequest):
+    try:
+        locations = request.locations
+        predictions = await gwl_batcher.run(
+            predict_gwl_batch,
+            [loc.district for loc in locations],
+            [loc.latitude for loc in locations],
+            [loc.longitude for loc in locations],
+        )
+        status = "success" if gwl_batcher.models_loaded() else "fallback"
+        
+        return GWLBatchResponse(
+            predictions=[
+                GWLResponse(gwl=round(float(gwl), 2), unit="mbgl", success=True, district=loc.district, status=status)
+                for loc, gwl in zip(locations, predictions)
+            ],
+            count=len(locations),
+            status=status
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"GWL batch prediction error: {str(e)}")
+
 @app.post("/get-recommendation", response_model=FinalReport)
 async def get_agent_recommendation(payload: AgentInput):
     try:
-        global agent_data_store
-        agent_data_store.clear()
+        new_agent_data_store()
         
-        if 'agent_executor' not in globals():
+        if get_agent_executor() is None:
             raise HTTPException(status_code=500, detail="Agent not properly initialized")
         
-        result = await agent_executor.ainvoke({"input": payload.input})
-        
-        if "intermediate_steps" in result and result["intermediate_steps"]:
-            last_step = result["intermediate_steps"][-1]
-            last_action, last_observation = last_step
-            
-            if isinstance(last_action, AgentActionMessageLog) and last_action.tool == "format_final_report":
-                if isinstance(last_observation, dict) and "ai_recommendation" in last_observation:
-                    return FinalReport(**last_observation)
+        result = await run_agent_report(payload.input)
+        if result["report"] is not None:
+            return FinalReport(**result["report"])
 
         return FinalReport(
-            ai_recommendation=result.get("output", "Unable to generate detailed recommendation due to processing error."),
+            ai_recommendation=result["output"] or "Unable to generate detailed recommendation due to processing error.",
             annual_savings_inr=12000,
             payback_period_years=5.2
         )
@@ -814,71 +1192,194 @@ async def get_agent_recommendation(payload: AgentInput):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Agent processing error: {str(e)}")
 
+@app.post("/get-recommendation/structured")
+async def get_structured_recommendation(request: StructuredRecommendationRequest):
+    try:
+        return await run_recommendation_pipeline(
+            request.latitude,
+            request.longitude,
+            request.area,
+            request.district,
+            request.narrative,
+            request.compare_structures,
+            request.cost_simulations,
+            request.cost_seed,
+            request.optimize_size,
+        )
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Pipeline processing error: {str(e)}")
+
+@app.post("/get-recommendation/stream")
+async def stream_structured_recommendation(request: StructuredRecommendationRequest, stream_format: Literal["sse", "ndjson"] = Query(default="sse", alias="format")):
+    async def event_stream():
+        try:
+            async for stage, payload in iter_recommendation_pipeline(
+                request.latitude,
+                request.longitude,
+                request.area,
+                request.district,
+                request.narrative,
+                request.compare_structures,
+                request.cost_simulations,
+                request.cost_seed,
+                request.optimize_size,
+            ):
+                yield format_stream_event(stage, payload, stream_format)
+        except Exception as e:
+            yield format_stream_event("error", {"detail": f"Pipeline processing error: {str(e)}"}, stream_format)
+        yield format_stream_event("done", {}, stream_format)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream" if stream_format == "sse" else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/sessions")
+async def create_session(request: SessionCreateRequest):
+    session = session_store.create(build_recommendation_graph(sys.modules[__name__]), {})
+    try:
+        result = await session.update(session_inputs(request.model_dump()))
+    except Exception as e:
+        session_store.discard(session.id)
+        raise HTTPException(status_code=500, detail=f"Session processing error: {str(e)}")
+    return {"session_id": session.id, "inputs": result["inputs"], "report": session.report, "recomputed": result["recomputed"]}
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"session_id": session.id, "inputs": session.inputs, "report": session.report}
+
+@app.patch("/sessions/{session_id}")
+async def update_session(session_id: str, request: SessionUpdateRequest):
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    try:
+        result = await session.update(session_inputs(request.model_dump(exclude_unset=True)))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Session processing error: {str(e)}")
+    session_store.record(result, len(session.graph.nodes))
+    return result
+
+@app.post("/bulk/screen")
+async def bulk_screen(request: Request, output_format: Literal["ndjson", "csv"] = Query(default="ndjson", alias="format")):
+    is_csv = "csv" in request.headers.get("content-type", "")
+    
+    # The upload is spooled (to disk past BULK_SPOOL_MEMORY_BYTES) because the
+    # streaming response shares the ASGI receive channel. Rows are then read,
+    # screened and written one batch at a time, so the next batch is only
+    # parsed once the previous results have been sent to the client.
+    spool = tempfile.SpooledTemporaryFile(max_size=BULK_SPOOL_MEMORY_BYTES)
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+    
+    async def body_chunks():
+        while True:
+            chunk = spool.read(65536)
+            if not chunk:
+                break
+            yield chunk
+    
+    async def result_stream():
+        first = True
+        try:
+            async for batch in iter_batches(iter_bulk_rows(body_chunks(), is_csv), BULK_BATCH_SIZE):
+                results = await screen_bulk_batch(batch)
+                yield format_bulk_rows(results, output_format, include_header=first)
+                first = False
+            if first and output_format == "csv":
+                yield format_bulk_rows([], output_format, include_header=True)
+        except Exception as e:
+            error_row = {"error": f"Bulk screening aborted: {str(e)}"}
+            yield format_bulk_rows([error_row], output_format, include_header=first)
+        finally:
+            spool.close()
+    
+    return StreamingResponse(
+        result_stream(),
+        media_type="text/csv" if output_format == "csv" else "application/x-ndjson",
+    )
+
 @app.post("/get-recommendation-with-gwl")
 async def get_recommendation_with_gwl(request: CombinedRequest):
     try:
-        global agent_data_store
-        agent_data_store.clear()
+        new_agent_data_store()
+        timer = StageTimer()
         
-        ai_recommendation = None
-        if request.input:
+        async def agent_stage():
+            if not request.input:
+                return {
+                    "ai_recommendation": "No input provided for recommendation.",
+                    "annual_savings_inr": 0,
+                    "payback_period_years": 0.0,
+                    "structure_data": {},
+                    "environmental_data": {}
+                }, None
             try:
-                if 'agent_executor' not in globals():
+                if get_agent_executor() is None:
                     raise Exception("Agent not properly initialized")
                 
-                result = await agent_executor.ainvoke({"input": request.input})
-                
-                if "intermediate_steps" in result and result["intermediate_steps"]:
-                    last_step = result["intermediate_steps"][-1]
-                    last_action, last_observation = last_step
-
-                    if isinstance(last_action, AgentActionMessageLog) and last_action.tool == "format_final_report":
-                        if isinstance(last_observation, dict):
-                            ai_recommendation = last_observation
-                
-                if not ai_recommendation:
-                    ai_recommendation = {
-                        "ai_recommendation": result.get("output", "Unable to generate recommendation"),
-                        "annual_savings_inr": 12000,
-                        "payback_period_years": 5.2,
-                        "structure_data": {},
-                        "environmental_data": {}
-                    }
-                    
+                import agent
+                result = await run_agent_report(request.input, callbacks=[agent.AgentTimingHandler(timer)], timer=timer)
+                if result["report"]:
+                    return result["report"], result["token_report"]
+                return {
+                    "ai_recommendation": result["output"] or "Unable to generate recommendation",
+                    "annual_savings_inr": 12000,
+                    "payback_period_years": 5.2,
+                    "structure_data": {},
+                    "environmental_data": {}
+                }, result["token_report"]
             except Exception as e:
-                ai_recommendation = {
+                return {
                     "ai_recommendation": f"Error generating recommendation: {str(e)}",
                     "annual_savings_inr": 12000,
                     "payback_period_years": 5.5,
                     "structure_data": {},
                     "environmental_data": {}
-                }
-        else:
-            ai_recommendation = {
-                "ai_recommendation": "No input provided for recommendation.",
-                "annual_savings_inr": 0,
-                "payback_period_years": 0.0,
-                "structure_data": {},
-                "environmental_data": {}
-            }
+                }, None
+        
+        async def gwl_stage(hydrogeology):
+            # The lookup was started before the agent, so its climate fetch and GWL
+            # prediction overlap the agent's LLM planning. The agent's
+            # get_hydrogeological_data call for this point awaits the same lookup,
+            # and the GWL reported here is its groundwater depth.
+            result = await timer.track("hydrogeology", asyncio.shield(hydrogeology))
+            if result["gwl_prediction_method"] != "ml_model_used":
+                return None
+            return result["groundwater_depth_meters"]
+        
+        gwl_ready = all([request.district, request.latitude, request.longitude])
+        stages = [timer.track("agent", agent_stage())]
+        if gwl_ready:
+            stages.append(gwl_stage(prefetch_hydrogeological_data(request.latitude, request.longitude, request.district)))
+        results = await asyncio.gather(*stages, return_exceptions=True)
+        
+        if isinstance(results[0], Exception):
+            raise results[0]
+        ai_recommendation, token_report = results[0]
         
         gwl_data = None
-        if all([request.district, request.latitude, request.longitude]):
-            try:
-                gwl_prediction = predict_gwl(request.district, request.latitude, request.longitude)
-                if gwl_prediction is not None:
-                    gwl_data = {
-                        "gwl": round(gwl_prediction, 2),
-                        "unit": "mbgl",
-                        "success": True,
-                        "district": request.district,
-                        "status": "success" if (gwl_preprocessor is not None and gwl_model is not None) else "fallback",
-                        "aquifer_type": determine_aquifer_type(request.latitude, request.longitude)
-                    }
-                else:
-                    gwl_data = {"success": False, "error": "GWL prediction failed"}
-            except Exception as e:
-                gwl_data = {"success": False, "error": f"GWL prediction error: {str(e)}"}
+        if gwl_ready:
+            gwl_prediction = results[1]
+            if isinstance(gwl_prediction, Exception):
+                gwl_data = {"success": False, "error": f"GWL prediction error: {str(gwl_prediction)}"}
+            elif gwl_prediction is not None:
+                gwl_data = {
+                    "gwl": round(gwl_prediction, 2),
+                    "unit": "mbgl",
+                    "success": True,
+                    "district": request.district,
+                    "status": "success" if gwl_batcher.models_loaded() else "fallback",
+                    "aquifer_type": determine_aquifer_type(request.latitude, request.longitude)
+                }
+            else:
+                gwl_data = {"success": False, "error": "GWL prediction failed"}
         else:
             missing_params = []
             if not request.district:
@@ -895,6 +1396,8 @@ async def get_recommendation_with_gwl(request: CombinedRequest):
             "gwl_data": gwl_data,
             "system_info": {
                 "version": "3.1.0-clean",
+                "token_report": token_report,
+                "timing": timer.summary(),
                 "features_enabled": [
                     "Engineering-based structure selection",
                     "Multi-criteria evaluation system",
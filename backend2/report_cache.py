@@ -0,0 +1,166 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+from collections import OrderedDict
+from singleflight import SingleFlight, quantize
+
+# Report cache settings
+REPORT_CACHE_TTL_SECONDS = float(os.getenv("REPORT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "512"))
+REPORT_CACHE_MAX_DISK_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_DISK_ENTRIES", "20000"))
+REPORT_CACHE_PATH = os.getenv(
+    "REPORT_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "report_cache.sqlite3"),
+)
+
+# Field patterns for the agent prompt sent by the Node backend, e.g.
+# "... at latitude 12.97, longitude 77.59, with an area of 120 square meters and district Bengaluru Urban."
+# A district name runs up to the next punctuation mark or the end of the text.
+INPUT_PATTERNS = {
+    "latitude": re.compile(r"latitude\s*(?:of|is|=|:)?\s*(-?\d+(?:\.\d+)?)", re.IGNORECASE),
+    "longitude": re.compile(r"longitude\s*(?:of|is|=|:)?\s*(-?\d+(?:\.\d+)?)", re.IGNORECASE),
+    "area": re.compile(r"area\s*(?:of|is|=|:)?\s*(\d+(?:\.\d+)?)", re.IGNORECASE),
+    "district": re.compile(r"district\s*(?:of|is|=|:)?\s*([A-Za-z][A-Za-z '-]*[A-Za-z])", re.IGNORECASE),
+}
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def normalize_agent_input(text: str) -> dict:
+    # Requests that name the same site the same way share a key. Only the
+    # parsed values are normalized (coordinates quantized, area rounded); the
+    # rest of the prompt stays in the key as whitespace- and case-normalized
+    # text, so two prompts that ask for different things never share a report
+    fields = {name: pattern.search(text) for name, pattern in INPUT_PATTERNS.items()}
+    if not (fields["latitude"] and fields["longitude"] and fields["area"]):
+        return {"text": normalize_text(text)}
+
+    latitude, longitude = quantize(float(fields["latitude"].group(1)), float(fields["longitude"].group(1)))
+    remaining, end = [], 0
+    for name, match in sorted(((name, m) for name, m in fields.items() if m), key=lambda item: item[1].start(1)):
+        if match.start(1) >= end:
+            remaining.append(text[end:match.start(1)] + "{" + name + "}")
+            end = match.end(1)
+    remaining.append(text[end:])
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "area": round(float(fields["area"].group(1)), 1),
+        "district": normalize_text(fields["district"].group(1)) if fields["district"] else None,
+        "text": normalize_text("".join(remaining)),
+    }
+
+def report_key(agent_input: str, version: str) -> str:
+    normalized = json.dumps({"input": normalize_agent_input(agent_input), "version": version}, sort_keys=True)
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+class ReportCache:
+    def __init__(self, max_entries: int = REPORT_CACHE_SIZE, db_path: str = REPORT_CACHE_PATH, ttl_seconds: float = REPORT_CACHE_TTL_SECONDS, max_disk_entries: int = REPORT_CACHE_MAX_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._disk_enabled = bool(db_path)
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0, "disk_errors": 0, "llm_seconds_saved": 0.0}
+        if self._disk_enabled:
+            self._init_disk()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5.0)
+
+    def _init_disk(self):
+        try:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_report ("
+                    "key TEXT PRIMARY KEY, payload TEXT NOT NULL, llm_seconds REAL NOT NULL, "
+                    "created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS llm_report_created ON llm_report (created_at)")
+        except sqlite3.Error as e:
+            print(f"Report disk cache unavailable ({e}); using in-memory tier only.")
+            self._disk_enabled = False
+
+    def _remember(self, key: str, entry: tuple):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _disk_get(self, key: str):
+        if not self._disk_enabled:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT payload, llm_seconds, expires_at FROM llm_report WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            self.stats["disk_errors"] += 1
+            return None
+        return (json.loads(row[0]), row[1], row[2]) if row else None
+
+    def _disk_put(self, key: str, entry: tuple):
+        if not self._disk_enabled:
+            return
+        value, llm_seconds, expires_at = entry
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_report (key, payload, llm_seconds, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, json.dumps(value, default=str), llm_seconds, time.time(), expires_at),
+                )
+                conn.execute("DELETE FROM llm_report WHERE expires_at < ?", (time.time(),))
+                conn.execute(
+                    "DELETE FROM llm_report WHERE key IN (SELECT key FROM llm_report ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                )
+        except sqlite3.Error:
+            self.stats["disk_errors"] += 1
+
+    def get(self, key: str):
+        entry = self._memory.get(key)
+        tier = "memory_hits"
+        if entry is None:
+            entry = self._disk_get(key)
+            tier = "disk_hits"
+
+        if entry is not None and entry[2] < time.time():
+            self._memory.pop(key, None)
+            self.stats["expired"] += 1
+            entry = None
+
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        self._remember(key, entry)
+        self.stats[tier] += 1
+        self.stats["llm_seconds_saved"] += entry[1]
+        return entry[0]
+
+    def put(self, key: str, value: dict, llm_seconds: float):
+        entry = (value, llm_seconds, time.time() + self.ttl_seconds)
+        self.stats["stores"] += 1
+        self._remember(key, entry)
+        self._disk_put(key, entry)
+
+    def get_stats(self) -> dict:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "llm_seconds_saved": round(self.stats["llm_seconds_saved"], 2),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "disk_enabled": self._disk_enabled,
+        }
+
+report_cache = ReportCache()
+report_flight = SingleFlight("llm_report")
@@ -0,0 +1,168 @@
+import os
+import time
+import uuid
+import asyncio
+import inspect
+from collections import OrderedDict
+
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "1024"))
+
+# Memoized computation graph for what-if edits on the dashboard. Each node
+# remembers the argument values it last ran with and only runs again when one
+# of them changes; a node that recomputes to an equal value leaves everything
+# downstream of it untouched. A location edit re-runs the climate and GWL
+# lookups, while a roof area or structure edit only re-runs the design steps.
+
+class Node:
+    def __init__(self, name: str, deps: list, fn):
+        self.name = name
+        self.deps = deps
+        self.fn = fn
+
+class ComputationGraph:
+    def __init__(self, nodes: list):
+        # Nodes are listed in dependency order; deps name inputs or earlier nodes
+        self.nodes = nodes
+        self._memo = {}
+        self.values = {}
+
+    async def evaluate(self, inputs: dict) -> list:
+        values = dict(inputs)
+        recomputed = []
+        for node in self.nodes:
+            args = tuple(values[dep] for dep in node.deps)
+            memo = self._memo.get(node.name)
+            if memo is not None and memo[0] == args:
+                values[node.name] = memo[1]
+                continue
+            value = node.fn(*args)
+            if inspect.isawaitable(value):
+                value = await value
+            self._memo[node.name] = (args, value)
+            values[node.name] = value
+            recomputed.append(node.name)
+        self.values = values
+        return recomputed
+
+def build_recommendation_graph(api) -> ComputationGraph:
+    # api is the main module; these are the same functions design_recharge_structure uses
+
+    def site(latitude: float, longitude: float) -> dict:
+        return {
+            "soil_infiltration": api.calculate_soil_infiltration_rate(latitude, longitude),
+            "location_factor": api.get_location_cost_factor(latitude, longitude),
+        }
+
+    def site_evaluation(roof_area_sqm: float, groundwater_depth: float, site: dict, runoff: dict) -> dict:
+        return api.evaluate_site_conditions(roof_area_sqm, groundwater_depth, site["soil_infiltration"], runoff["runoff_liters"] / 365)
+
+    def dimensions(structure_type: str, runoff: dict, site: dict, groundwater_depth: float) -> dict:
+        daily_runoff = runoff["runoff_liters"] / 365
+        dimension_data = api.calculate_structure_dimensions(structure_type, daily_runoff, daily_runoff * 2.5, site["soil_infiltration"], groundwater_depth)
+        return {**dimension_data, "aquifer": api.get_aquifer_characteristics(groundwater_depth)}
+
+    def cost(structure_type: str, dimensions: dict, site: dict) -> dict:
+        cost_data = api.calculate_realistic_structure_cost(structure_type, dimensions["volume_m3"], site["location_factor"])
+        return {**cost_data, "subsidy": api.get_government_subsidy(structure_type, cost_data["total_cost"])}
+
+    def savings(runoff: dict, groundwater_depth: float, roof_area_sqm: float) -> dict:
+        return api.calculate_accurate_rwh_savings(runoff["runoff_liters"], groundwater_depth, roof_area_sqm)["savings_breakdown"]
+
+    def report(hydrogeology: dict, runoff: dict, site: dict, site_evaluation: dict, structure_type: str, dimensions: dict, cost: dict, savings: dict) -> dict:
+        # The structured recommendation's site fields plus the structure result
+        # design_recharge_structure gives, for the chosen structure
+        return {
+            "district": hydrogeology["district"],
+            "principal_aquifer": hydrogeology["principal_aquifer"],
+            "groundwater_depth_meters": hydrogeology["groundwater_depth_meters"],
+            "annual_rainfall_mm": hydrogeology["annual_rainfall_mm"],
+            "climate_zone": hydrogeology["climate_zone"],
+            "runoff_liters": runoff["runoff_liters"],
+            "recommended_structure": site_evaluation["recommended_structure"],
+            **api.build_structure_result(
+                structure_type, site_evaluation, dimensions, dimensions["aquifer"], cost, cost["subsidy"],
+                savings, site["soil_infiltration"], site["location_factor"],
+            ),
+        }
+
+    return ComputationGraph([
+        Node("hydrogeology", ["latitude", "longitude", "district"], api.get_hydrogeological_data),
+        Node("groundwater_depth", ["hydrogeology"], lambda hydrogeology: hydrogeology["groundwater_depth_meters"]),
+        Node("site", ["latitude", "longitude"], site),
+        Node("runoff", ["roof_area_sqm", "hydrogeology"], lambda roof_area_sqm, hydrogeology: api.calculate_harvesting_potential(roof_area_sqm, hydrogeology["annual_rainfall_mm"])),
+        Node("site_evaluation", ["roof_area_sqm", "groundwater_depth", "site", "runoff"], site_evaluation),
+        Node("structure_type", ["structure", "site_evaluation"], lambda structure, site_evaluation: structure or site_evaluation["recommended_structure"]),
+        Node("dimensions", ["structure_type", "runoff", "site", "groundwater_depth"], dimensions),
+        Node("cost", ["structure_type", "dimensions", "site"], cost),
+        Node("savings", ["runoff", "groundwater_depth", "roof_area_sqm"], savings),
+        Node("report", ["hydrogeology", "runoff", "site", "site_evaluation", "structure_type", "dimensions", "cost", "savings"], report),
+    ])
+
+class RecommendationSession:
+    def __init__(self, graph: ComputationGraph, inputs: dict):
+        self.id = uuid.uuid4().hex
+        self.graph = graph
+        self.inputs = inputs
+        self.report = {}
+        self.lock = asyncio.Lock()
+        self.touched_at = time.monotonic()
+
+    async def update(self, changes: dict) -> dict:
+        # Edits to one session run one at a time; returns only the report fields that changed
+        async with self.lock:
+            inputs = {**self.inputs, **changes}
+            recomputed = await self.graph.evaluate(inputs)
+            report = self.graph.values["report"]
+            changed = {k: v for k, v in report.items() if k not in self.report or self.report[k] != v}
+            self.inputs, self.report = inputs, report
+            self.touched_at = time.monotonic()
+            return {"session_id": self.id, "inputs": inputs, "changed": changed, "recomputed": recomputed}
+
+class SessionStore:
+    def __init__(self, max_entries: int = SESSION_MAX_ENTRIES, ttl_seconds: float = SESSION_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()
+        self.stats = {"created": 0, "updates": 0, "expired": 0, "evictions": 0, "nodes_recomputed": 0, "nodes_reused": 0}
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.touched_at > cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self.stats["expired"] += 1
+
+    def create(self, graph: ComputationGraph, inputs: dict) -> RecommendationSession:
+        self._expire()
+        session = RecommendationSession(graph, inputs)
+        self._sessions[session.id] = session
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+            self.stats["evictions"] += 1
+        self.stats["created"] += 1
+        return session
+
+    def get(self, session_id: str):
+        self._expire()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            # Expiry walks from the front, so the order must follow touched_at
+            session.touched_at = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def discard(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+    def record(self, result: dict, total_nodes: int):
+        self.stats["updates"] += 1
+        self.stats["nodes_recomputed"] += len(result["recomputed"])
+        self.stats["nodes_reused"] += total_nodes - len(result["recomputed"])
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "active_sessions": len(self._sessions), "max_entries": self.max_entries, "ttl_seconds": self.ttl_seconds}
+
+session_store = SessionStore()
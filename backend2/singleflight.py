@@ -0,0 +1,55 @@
+import os
+import asyncio
+
+COALESCE_GRID_DEG = float(os.getenv("COALESCE_GRID_DEG", "0.0001"))
+
+def quantize(latitude: float, longitude: float, grid_deg: float = COALESCE_GRID_DEG) -> tuple:
+    if grid_deg <= 0:
+        return latitude, longitude
+    return (
+        round(round(latitude / grid_deg) * grid_deg, 7),
+        round(round(longitude / grid_deg) * grid_deg, 7),
+    )
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight = {}
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0}
+
+    async def do(self, key, fn):
+        self.stats["calls"] += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.stats["executions"] += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.stats["coalesced"] += 1
+        # Shield so one caller disconnecting does not cancel the shared work
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["errors"] += 1
+
+    def get_stats(self) -> dict:
+        calls = self.stats["calls"]
+        return {
+            **self.stats,
+            "in_flight": len(self._in_flight),
+            "coalescing_ratio": round(self.stats["coalesced"] / calls, 4) if calls else 0.0,
+        }
+
+hydrogeology_flight = SingleFlight("hydrogeology")
+gwl_flight = SingleFlight("predict_gwl")
+climate_flight = SingleFlight("climate_fetch")
+
+def get_coalescing_stats() -> dict:
+    return {
+        "grid_deg": COALESCE_GRID_DEG,
+        **{flight.name: flight.get_stats() for flight in (hydrogeology_flight, gwl_flight, climate_flight)},
+    }
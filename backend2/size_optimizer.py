@@ -0,0 +1,168 @@
+import os
+import threading
+import numpy as np
+from collections import OrderedDict
+from structure_engine import (
+    STRUCTURE_TYPES, PIT, TRENCH, SHAFT, WELL,
+    aquifer_characteristics, format_dimensions, government_subsidy, round_like_python, structure_costs,
+)
+from water_balance import infiltration_area_m2, simulate
+
+OPTIMIZER_GRID_STEPS = int(os.getenv("OPTIMIZER_GRID_STEPS", "12"))
+OPTIMIZER_CACHE_SIZE = int(os.getenv("OPTIMIZER_CACHE_SIZE", "256"))
+DESIGN_LIFE_YEARS = 20
+TRENCH_WIDTH_M = 1.5
+
+# Cost-optimal sizing. Instead of the fixed clamps in calculate_structure_dimensions,
+# every structure type is laid out over a grid of its two free dimensions, each
+# candidate's recharge is simulated over the daily rainfall record, and candidates
+# are ranked by net investment (cost minus subsidy) per m³ recharged over the
+# design life. Candidates use the design_sites layout, (candidates, structures),
+# so the engine's cost, subsidy and formatting functions apply unchanged.
+#
+# Search ranges per structure type, as (low, high) for each free dimension.
+# Depths are limited by the groundwater level, as in calculate_structure_dimensions.
+
+def search_ranges(groundwater_depth: float) -> dict:
+    return {
+        PIT: {"side_length": (1.0, 4.0), "depth": (1.0, min(4.0, groundwater_depth - 1))},
+        TRENCH: {"length": (5.0, 50.0), "depth": (1.0, min(3.0, groundwater_depth * 0.8))},
+        SHAFT: {"diameter": (0.75, 2.5), "depth": (3.0, min(25.0, groundwater_depth - 2))},
+        WELL: {"diameter": (0.2, 0.3), "depth": (min(groundwater_depth + 2, 40.0), min(groundwater_depth + 20, 40.0))},
+    }
+
+def candidate_grid(groundwater_depth: float, steps: int = OPTIMIZER_GRID_STEPS) -> tuple:
+    # steps x steps candidates per structure type; a type whose depth range is
+    # empty at this groundwater level gets no feasible candidates
+    axes, feasible = {}, np.ones((steps * steps, 4), dtype=bool)
+    for structure, ranges in search_ranges(groundwater_depth).items():
+        (name_a, (low_a, high_a)), (name_b, (low_b, high_b)) = ranges.items()
+        if high_a < low_a or high_b < low_b:
+            feasible[:, structure] = False
+        grid_a, grid_b = np.meshgrid(
+            np.linspace(low_a, max(high_a, low_a), steps), np.linspace(low_b, max(high_b, low_b), steps), indexing="ij"
+        )
+        axes[structure] = {name_a: grid_a.ravel(), name_b: grid_b.ravel()}
+
+    n = steps * steps
+    dimensions = {
+        "pit": axes[PIT],
+        "trench": {"width": np.full(n, TRENCH_WIDTH_M), **axes[TRENCH]},
+        "shaft": axes[SHAFT],
+        "well": axes[WELL],
+    }
+    raw_volume = np.empty((n, 4))
+    raw_volume[:, PIT] = dimensions["pit"]["side_length"] ** 2 * dimensions["pit"]["depth"]
+    raw_volume[:, TRENCH] = TRENCH_WIDTH_M * dimensions["trench"]["depth"] * dimensions["trench"]["length"]
+    raw_volume[:, SHAFT] = np.pi * (dimensions["shaft"]["diameter"] / 2) ** 2 * dimensions["shaft"]["depth"]
+    raw_volume[:, WELL] = np.pi * (dimensions["well"]["diameter"] / 2) ** 2 * dimensions["well"]["depth"]
+    dimensions["volume_m3"] = round_like_python(raw_volume, 2)
+    return dimensions, feasible
+
+def score_candidates(precipitation, roof_area_sqm: float, groundwater_depth: float, soil_infiltration: float, location_factor: float, steps: int = OPTIMIZER_GRID_STEPS) -> dict:
+    dimensions, feasible = candidate_grid(groundwater_depth, steps)
+    volume_m3 = dimensions["volume_m3"]
+    aquifer = aquifer_characteristics(groundwater_depth)
+    capacity_liters = np.trunc(volume_m3 * aquifer["porosity"] * 1000 * aquifer["recharge_efficiency"]).astype(np.int64)
+    total_cost = structure_costs(volume_m3, location_factor)["total_cost"]
+    subsidy = government_subsidy(total_cost)
+    net_investment = total_cost - subsidy
+
+    drain = infiltration_area_m2(dimensions) * soil_infiltration * 24 / 1000
+    balance = simulate(precipitation, roof_area_sqm, capacity_liters / 1000, drain)
+    recharge = balance["recharge_m3_per_year"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cost_per_m3 = np.where(feasible & (recharge > 0), net_investment / (recharge * DESIGN_LIFE_YEARS), np.inf)
+
+    return {
+        "dimensions": dimensions,
+        "volume_m3": volume_m3,
+        "capacity_liters": capacity_liters,
+        "total_cost": total_cost,
+        "subsidy": subsidy,
+        "net_investment": net_investment,
+        "drain_m3_per_day": drain,
+        "balance": balance,
+        "cost_per_m3": cost_per_m3,
+    }
+
+def describe_candidate(scores: dict, k: int, structure: int) -> dict:
+    balance = scores["balance"]
+    return {
+        "structure": STRUCTURE_TYPES[structure],
+        "recommended_dimensions": format_dimensions(scores["dimensions"], structure, k),
+        "volume_m3": float(scores["volume_m3"][k, structure]),
+        "capacity_liters": int(scores["capacity_liters"][k, structure]),
+        "infiltration_liters_per_day": int(scores["drain_m3_per_day"][k, structure] * 1000),
+        "estimated_cost_inr": int(scores["total_cost"][k, structure]),
+        "subsidy_available_inr": int(scores["subsidy"][k, structure]),
+        "net_investment_inr": int(scores["net_investment"][k, structure]),
+        "realised_recharge_liters_per_year": int(balance["recharge_m3_per_year"][k, structure] * 1000),
+        "overflow_days_per_year": round(float(balance["overflow_days_per_year"][k, structure]), 1),
+        "capture_ratio": round(float(balance["capture_ratio"][k, structure]), 3),
+        "cost_per_m3_recharged_inr": round(float(scores["cost_per_m3"][k, structure]), 2),
+    }
+
+def optimize_site(precipitation, roof_area_sqm: float, groundwater_depth: float, soil_infiltration: float, location_factor: float, steps: int = OPTIMIZER_GRID_STEPS) -> dict:
+    scores = score_candidates(precipitation, roof_area_sqm, groundwater_depth, soil_infiltration, location_factor, steps)
+    cost_per_m3 = scores["cost_per_m3"]
+    best_per_structure = np.argmin(cost_per_m3, axis=0)
+    structures = {
+        STRUCTURE_TYPES[j]: describe_candidate(scores, int(best_per_structure[j]), j)
+        for j in range(4) if np.isfinite(cost_per_m3[best_per_structure[j], j])
+    }
+    return {
+        "objective": f"net investment per m³ recharged over {DESIGN_LIFE_YEARS} years",
+        "candidates_evaluated": int(np.isfinite(cost_per_m3).sum()),
+        "optimal": min(structures.values(), key=lambda s: s["cost_per_m3_recharged_inr"], default=None),
+        "structures": structures,
+    }
+
+class SizeOptimizer:
+    # One search per site, remembered in a small LRU since a session re-asks for
+    # the same site. The key holds every input that changes the answer. Searches
+    # run in worker threads, so the LRU and its stats sit behind a lock; the
+    # search itself runs outside it.
+    def __init__(self, max_entries: int = OPTIMIZER_CACHE_SIZE, steps: int = OPTIMIZER_GRID_STEPS):
+        self.max_entries = max_entries
+        self.steps = steps
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def key_for(self, climate_key: str, roof_area_sqm: float, groundwater_depth: float, soil_infiltration: float, location_factor: float) -> tuple:
+        return (climate_key, round(roof_area_sqm, 1), round(groundwater_depth, 2), round(soil_infiltration, 1), round(location_factor, 3), self.steps)
+
+    def optimize(self, climate_key: str, precipitation, roof_area_sqm: float, groundwater_depth: float, soil_infiltration: float, location_factor: float) -> dict:
+        key = self.key_for(climate_key, roof_area_sqm, groundwater_depth, soil_infiltration, location_factor)
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                return result
+            self.stats["misses"] += 1
+
+        result = optimize_site(precipitation, roof_area_sqm, groundwater_depth, soil_infiltration, location_factor, self.steps)
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.stats["evictions"] += 1
+        return result
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats, entries = dict(self.stats), len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "grid_steps": self.steps,
+            "candidates_per_site": self.steps * self.steps * 4,
+        }
+
+size_optimizer = SizeOptimizer()
@@ -0,0 +1,290 @@
+import os
+import sys
+import json
+import math
+import argparse
+import numpy as np
+
+SPATIAL_LAYERS_PATH = os.getenv(
+    "SPATIAL_LAYERS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "spatial_layers.json"),
+)
+SPATIAL_INDEX_CELL_DEG = float(os.getenv("SPATIAL_INDEX_CELL_DEG", "0.5"))
+# A cell's answer is only precomputed when every entry clears the cell's edges
+# by this much, far more than the rounding in the point-to-cell arithmetic
+CELL_MARGIN_DEG = 1e-9
+
+# Point-in-region layers for district, soil infiltration and aquifer lookups.
+# spatial_layers.json maps each layer name to {"default": value, "entries": [...]}.
+# An entry is {"value": ..., "bbox": {min_lat, max_lat, min_lon, max_lon}} (missing
+# bounds are open, edges are inclusive) or {"value": ..., "geometry": GeoJSON
+# Polygon/MultiPolygon}. Entries overlap freely: the first one listed that
+# contains the point wins, and points in no entry get the default.
+
+def polygon_rings(geometry: dict) -> list:
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        raise ValueError(f"Unsupported geometry type {geometry['type']}")
+    # GeoJSON positions are [lon, lat]; holes are rings too under the even-odd rule
+    return [np.asarray(ring, dtype=np.float64)[:, :2] for polygon in polygons for ring in polygon]
+
+def points_in_rings(rings: list, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    inside = np.zeros(len(latitudes), dtype=bool)
+    for ring in rings:
+        x0, y0 = ring[:, 0], ring[:, 1]
+        x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+        for ax, ay, bx, by in zip(x0, y0, x1, y1):
+            crosses = (ay > latitudes) != (by > latitudes)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x_at = ax + (latitudes - ay) * (bx - ax) / (by - ay)
+            inside ^= crosses & (longitudes < x_at)
+    return inside
+
+class SpatialLayer:
+    def __init__(self, name: str, entries: list, default, cell_deg: float = SPATIAL_INDEX_CELL_DEG):
+        self.name = name
+        self.default = default
+        n = len(entries)
+        self.min_lat, self.max_lat = np.full(n, -np.inf), np.full(n, np.inf)
+        self.min_lon, self.max_lon = np.full(n, -np.inf), np.full(n, np.inf)
+        self.rings = [None] * n
+        for i, entry in enumerate(entries):
+            if "geometry" in entry:
+                self.rings[i] = polygon_rings(entry["geometry"])
+                coordinates = np.concatenate(self.rings[i])
+                self.min_lon[i], self.min_lat[i] = coordinates.min(axis=0)
+                self.max_lon[i], self.max_lat[i] = coordinates.max(axis=0)
+            else:
+                bbox = entry.get("bbox", {})
+                self.min_lat[i] = bbox.get("min_lat", -np.inf)
+                self.max_lat[i] = bbox.get("max_lat", np.inf)
+                self.min_lon[i] = bbox.get("min_lon", -np.inf)
+                self.max_lon[i] = bbox.get("max_lon", np.inf)
+
+        # The default sits last, so a lookup result of -1 maps to it
+        values = [entry["value"] for entry in entries] + [default]
+        numeric = all(isinstance(v, (int, float)) for v in values)
+        self.values = np.asarray(values, dtype=np.float64 if numeric else object)
+        # An open bound is not tested at all, so it also accepts a NaN coordinate
+        # (the old chains' else branches did the same)
+        self.bounded = np.isfinite(np.stack([self.min_lat, self.max_lat, self.min_lon, self.max_lon]))
+        self._build_grid(cell_deg)
+
+    def _build_grid(self, cell_deg: float):
+        # Uniform grid over the finite entry bounds; each cell lists, in priority
+        # order, the entries whose box touches it. Points off the grid scan every entry.
+        bounds = lambda *arrays: [v for a in arrays for v in a if np.isfinite(v)]
+        lats, lons = bounds(self.min_lat, self.max_lat), bounds(self.min_lon, self.max_lon)
+        self.cell_deg = cell_deg
+        self.lat0, self.lon0 = float(min(lats)) if lats else 0.0, float(min(lons)) if lons else 0.0
+        self.n_rows = int(math.floor(((max(lats) if lats else 0.0) - self.lat0) / cell_deg)) + 1
+        self.n_cols = int(math.floor(((max(lons) if lons else 0.0) - self.lon0) / cell_deg)) + 1
+
+        # Cell ranges use the same arithmetic as point lookups, so a point on an
+        # entry's edge always lands in a cell that lists the entry
+        row_lo = self._grid_index(np.maximum(self.min_lat, self.lat0), self.lat0, self.n_rows)
+        row_hi = self._grid_index(np.minimum(self.max_lat, self.lat0 + self.n_rows * cell_deg), self.lat0, self.n_rows)
+        col_lo = self._grid_index(np.maximum(self.min_lon, self.lon0), self.lon0, self.n_cols)
+        col_hi = self._grid_index(np.minimum(self.max_lon, self.lon0 + self.n_cols * cell_deg), self.lon0, self.n_cols)
+
+        cells = [[] for _ in range(self.n_rows * self.n_cols)]
+        for i in range(len(self.rings)):
+            if row_lo[i] > row_hi[i] or col_lo[i] > col_hi[i]:
+                continue
+            for row in range(row_lo[i], row_hi[i] + 1):
+                for col in range(col_lo[i], col_hi[i] + 1):
+                    cells[row * self.n_cols + col].append(i)
+        self.cell_count = np.asarray([len(c) for c in cells], dtype=np.int64)
+        self.cell_start = np.concatenate([[0], np.cumsum(self.cell_count)[:-1]]).astype(np.int64)
+        self.cell_entries = np.asarray([i for c in cells for i in c], dtype=np.int64)
+
+        # Scalar lookups read plain tuples of (bounds..., rings, value) per cell,
+        # so a point costs a few float comparisons and no array work
+        candidates = [
+            (min_lat, max_lat, min_lon, max_lon, rings, value)
+            for min_lat, max_lat, min_lon, max_lon, rings, value in zip(
+                self.min_lat.tolist(), self.max_lat.tolist(), self.min_lon.tolist(), self.max_lon.tolist(), self.rings, self.values.tolist(),
+            )
+        ]
+        self._cell_candidates = [tuple(candidates[i] for i in c) for c in cells]
+        self._default = self.values.tolist()[-1]
+        self._cell_values = [
+            self._cell_value(self._cell_candidates[row * self.n_cols + col], row, col)
+            for row in range(self.n_rows) for col in range(self.n_cols)
+        ]
+        # The same for the unbounded strips and corners around the grid, keyed by
+        # (row, col) clamped to -1..n_rows and -1..n_cols. Their candidates are
+        # those of the nearest edge cell (see lookup).
+        self._outer_values = {
+            (row, col): self._cell_value(self._cell_candidates[self._edge_cell(row, col)], row, col)
+            for row in range(-1, self.n_rows + 1) for col in range(-1, self.n_cols + 1)
+            if not (0 <= row < self.n_rows and 0 <= col < self.n_cols)
+        }
+
+    def _edge_cell(self, row: int, col: int) -> int:
+        row = 0 if row < 0 else self.n_rows - 1 if row >= self.n_rows else row
+        col = 0 if col < 0 else self.n_cols - 1 if col >= self.n_cols else col
+        return row * self.n_cols + col
+
+    def _cell_span(self, index: int, origin: float, size: int) -> tuple:
+        # Cell extent along one axis, widened by the margin; unbounded off the grid
+        margin = CELL_MARGIN_DEG
+        lo = -math.inf if index < 0 else origin + index * self.cell_deg - margin
+        hi = math.inf if index >= size else origin + (index + 1) * self.cell_deg + margin
+        return lo, hi
+
+    def _cell_value(self, candidates: tuple, row: int, col: int):
+        # The value every point of the cell gets when that does not depend on
+        # where in the cell it lies: entries ahead of the winner miss the cell
+        # and the winner is a box that covers it. None when the cell must be walked.
+        lat_lo, lat_hi = self._cell_span(row, self.lat0, self.n_rows)
+        lon_lo, lon_hi = self._cell_span(col, self.lon0, self.n_cols)
+        for min_lat, max_lat, min_lon, max_lon, rings, value in candidates:
+            if max_lat < lat_lo or min_lat > lat_hi or max_lon < lon_lo or min_lon > lon_hi:
+                continue
+            if rings is None and min_lat <= lat_lo and max_lat >= lat_hi and min_lon <= lon_lo and max_lon >= lon_hi:
+                return (value,)
+            return None
+        return (self._default,)
+
+    def _grid_index(self, values: np.ndarray, origin: float, size: int) -> np.ndarray:
+        return np.clip(np.floor((values - origin) / self.cell_deg), 0, size - 1).astype(np.int64)
+
+    def cells_for(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        # -1 for points outside the grid (or NaN)
+        rows = np.floor((latitudes - self.lat0) / self.cell_deg)
+        cols = np.floor((longitudes - self.lon0) / self.cell_deg)
+        on_grid = (rows >= 0) & (rows < self.n_rows) & (cols >= 0) & (cols < self.n_cols)
+        cells = np.full(len(latitudes), -1, dtype=np.int64)
+        cells[on_grid] = rows[on_grid].astype(np.int64) * self.n_cols + cols[on_grid].astype(np.int64)
+        return cells
+
+    def contains(self, entries: np.ndarray, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        bounded = self.bounded[:, entries]
+        inside = (
+            ((latitudes >= self.min_lat[entries]) | ~bounded[0]) & ((latitudes <= self.max_lat[entries]) | ~bounded[1])
+            & ((longitudes >= self.min_lon[entries]) | ~bounded[2]) & ((longitudes <= self.max_lon[entries]) | ~bounded[3])
+        )
+        # Polygon entries: the box test above is only a prefilter
+        for entry in set(entries[inside].tolist()):
+            if self.rings[entry] is not None:
+                rows = np.flatnonzero(inside & (entries == entry))
+                inside[rows] = points_in_rings(self.rings[entry], latitudes[rows], longitudes[rows])
+        return inside
+
+    def lookup_indices(self, latitudes, longitudes) -> np.ndarray:
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        found = np.full(len(latitudes), -1, dtype=np.int64)
+        cells = self.cells_for(latitudes, longitudes)
+
+        on_grid = np.flatnonzero(cells >= 0)
+        starts, counts = self.cell_start[cells[on_grid]], self.cell_count[cells[on_grid]]
+        pending = np.ones(len(on_grid), dtype=bool)
+        # Candidate k of every point's cell is tested together; a point stops at its first hit
+        for k in range(int(counts.max()) if len(counts) else 0):
+            active = np.flatnonzero(pending & (counts > k))
+            if not len(active):
+                break
+            entries = self.cell_entries[starts[active] + k]
+            rows = on_grid[active]
+            hit = self.contains(entries, latitudes[rows], longitudes[rows])
+            found[rows[hit]] = entries[hit]
+            pending[active[hit]] = False
+
+        off_grid = np.flatnonzero(cells < 0)
+        for entry in range(len(self.rings)):
+            if not len(off_grid):
+                break
+            hit = self.contains(np.full(len(off_grid), entry), latitudes[off_grid], longitudes[off_grid])
+            found[off_grid[hit]] = entry
+            off_grid = off_grid[~hit]
+        return found
+
+    def lookup_many(self, latitudes, longitudes) -> np.ndarray:
+        return self.values[self.lookup_indices(latitudes, longitudes)]
+
+    def lookup(self, latitude: float, longitude: float):
+        # Scalar path for single requests: walk the point's cell in plain Python
+        try:
+            row = math.floor((latitude - self.lat0) / self.cell_deg)
+            col = math.floor((longitude - self.lon0) / self.cell_deg)
+        except (ValueError, OverflowError):
+            # NaN or infinite coordinates; the array path applies open bounds to them
+            return self.lookup_many([latitude], [longitude])[0]
+        if 0 <= row < self.n_rows and 0 <= col < self.n_cols:
+            decided = self._cell_values[row * self.n_cols + col]
+            if decided is not None:
+                return decided[0]
+            candidates = self._cell_candidates[row * self.n_cols + col]
+        else:
+            # Off the grid only entries with an open bound can match, and the grid
+            # spans all finite bounds, so each of them is listed in the nearest edge cell
+            row = -1 if row < 0 else self.n_rows if row >= self.n_rows else row
+            col = -1 if col < 0 else self.n_cols if col >= self.n_cols else col
+            decided = self._outer_values[(row, col)]
+            if decided is not None:
+                return decided[0]
+            candidates = self._cell_candidates[self._edge_cell(row, col)]
+        for min_lat, max_lat, min_lon, max_lon, rings, value in candidates:
+            if min_lat <= latitude <= max_lat and min_lon <= longitude <= max_lon:
+                if rings is None or points_in_rings(rings, np.array([latitude]), np.array([longitude]))[0]:
+                    return value
+        return self._default
+
+    def get_stats(self) -> dict:
+        return {
+            "entries": len(self.rings),
+            "polygons": sum(r is not None for r in self.rings),
+            "grid": [self.n_rows, self.n_cols],
+            "cell_deg": self.cell_deg,
+            "max_candidates_per_cell": int(self.cell_count.max()) if len(self.cell_count) else 0,
+            "precomputed_cells": sum(value is not None for value in self._cell_values),
+            "precomputed_outer_cells": sum(value is not None for value in self._outer_values.values()),
+        }
+
+class SpatialIndex:
+    def __init__(self, layers: dict):
+        self.layers = layers
+
+    @classmethod
+    def load(cls, path: str = SPATIAL_LAYERS_PATH, cell_deg: float = SPATIAL_INDEX_CELL_DEG):
+        with open(path) as f:
+            spec = json.load(f)
+        return cls({name: SpatialLayer(name, layer["entries"], layer["default"], cell_deg) for name, layer in spec.items()})
+
+    def lookup(self, layer: str, latitude: float, longitude: float):
+        return self.layers[layer].lookup(latitude, longitude)
+
+    def lookup_many(self, layer: str, latitudes, longitudes) -> np.ndarray:
+        return self.layers[layer].lookup_many(latitudes, longitudes)
+
+    def get_stats(self) -> dict:
+        return {name: layer.get_stats() for name, layer in self.layers.items()}
+
+_index = None
+
+def get_spatial_index() -> SpatialIndex:
+    # The layers are required data, so a missing or broken file raises here
+    global _index
+    if _index is None:
+        _index = SpatialIndex.load()
+    return _index
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the district, soil and aquifer layers.")
+    parser.add_argument("latitude", type=float)
+    parser.add_argument("longitude", type=float)
+    parser.add_argument("--layers", default=SPATIAL_LAYERS_PATH)
+    args = parser.parse_args(argv)
+
+    index = SpatialIndex.load(args.layers)
+    for name in index.layers:
+        print(f"{name}: {index.lookup(name, args.latitude, args.longitude)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
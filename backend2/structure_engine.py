@@ -0,0 +1,350 @@
+import numpy as np
+
+# Array versions of evaluate_site_conditions, calculate_structure_dimensions,
+# calculate_realistic_structure_cost, get_government_subsidy and
+# calculate_accurate_rwh_savings. Every site is designed for all four structure
+# types at once; results reproduce the scalar functions in main.py exactly
+# (benchmarks/structure_engine_bench.py checks this).
+
+STRUCTURE_TYPES = ["Recharge Pit", "Recharge Trench", "Recharge Shaft", "Injection Well"]
+PIT, TRENCH, SHAFT, WELL = range(4)
+
+SPACE_LEVELS = ["limited", "moderate", "ample"]
+DEPTH_LEVELS = ["shallow", "moderate", "deep"]
+INFILTRATION_LEVELS = ["low", "moderate", "high"]
+RUNOFF_LEVELS = ["low", "moderate", "high"]
+
+# Rows follow the level lists above, columns follow STRUCTURE_TYPES
+SPACE_SCORES = np.array([[8, 4, 7, 9], [9, 7, 8, 6], [7, 9, 6, 5]])
+DEPTH_SCORES = np.array([[9, 8, 5, 2], [8, 7, 8, 6], [4, 5, 7, 9]])
+INFILTRATION_SCORES = np.array([[6, 7, 8, 9], [8, 8, 7, 6], [9, 9, 6, 4]])
+RUNOFF_SCORES = np.array([[9, 6, 7, 5], [7, 8, 8, 7], [5, 9, 7, 8]])
+
+REQUIRED_STORAGE_HOURS = 6
+
+# Per structure type: excavation, structural and filter media rates per m³,
+# fixed plumbing, labor and equipment costs, and the miscellaneous share
+COST_RATES = np.array([[200, 4000, 600], [180, 3500, 550], [800, 6000, 800], [1200, 8000, 700]])
+FIXED_COSTS = np.array([[3000, 3000, 4000], [4000, 6000, 7500], [6000, 9000, 15000], [12000, 16800, 32000]])
+MISC_RATES = np.array([0.15, 0.15, 0.18, 0.20])
+COST_COMPONENTS = ["excavation", "structural", "filter_media", "plumbing", "labor", "equipment", "miscellaneous"]
+
+SUBSIDY_RATES = np.array([0.4, 0.35, 0.3, 0.25])
+MAX_SUBSIDIES = np.array([25000, 35000, 50000, 75000])
+
+def round_like_python(values, ndigits: int) -> np.ndarray:
+    # np.round scales then rounds the product, which can differ from Python's
+    # correctly rounded round() when the scaled value sits next to .5. Those few
+    # elements are recomputed with round() so results stay bit-identical.
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    result = np.rint(scaled)
+    distance = np.abs(np.subtract(scaled, result, out=scaled), out=scaled)
+    result /= scale
+    near_tie = distance > 0.5 - 1e-6
+    if near_tie.any():
+        idx = np.flatnonzero(near_tie)
+        result.flat[idx] = [round(float(v), ndigits) for v in values.flat[idx]]
+    return result
+
+def categorize(values, low_threshold: float, high_threshold: float) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    return (values > low_threshold).astype(np.int8) + (values > high_threshold)
+
+def _build_score_table():
+    # One row per (space, depth, infiltration, runoff) combination
+    space, depth, infiltration, runoff = np.meshgrid(np.arange(3), np.arange(3), np.arange(3), np.arange(3), indexing="ij")
+    table = (
+        SPACE_SCORES[space.ravel()] + DEPTH_SCORES[depth.ravel()]
+        + INFILTRATION_SCORES[infiltration.ravel()] + RUNOFF_SCORES[runoff.ravel()]
+    )
+    # argmax picks the first maximum, matching max() over the scalar dict order
+    best = np.argmax(table, axis=1)
+    # Scores top out at 36 and there are four structure types; the narrow dtypes
+    # keep the per-site copies design_sites hands out small
+    return table.astype(np.int8), best.astype(np.int8), table[np.arange(len(table)), best] / 36.0
+
+SCORE_TABLE, BEST_STRUCTURE, CONFIDENCE = _build_score_table()
+# Structure-major copy; take() along its rows is cheaper than row fancy indexing
+SCORE_TABLE_BY_STRUCTURE = np.ascontiguousarray(SCORE_TABLE.T)
+
+def evaluate_sites(roof_area_sqm, groundwater_depth, soil_infiltration, daily_runoff) -> dict:
+    space = categorize(roof_area_sqm, 100, 200)
+    depth = categorize(groundwater_depth, 10, 25)
+    infiltration = categorize(soil_infiltration, 15, 25)
+    runoff = categorize(daily_runoff, 150, 300)
+
+    code = ((space * 3 + depth) * 3 + infiltration) * 3 + runoff
+
+    return {
+        "space_availability": space,
+        "depth_category": depth,
+        "infiltration_category": infiltration,
+        "runoff_category": runoff,
+        "structure_scores": SCORE_TABLE_BY_STRUCTURE.take(code, axis=1).T,
+        "recommended_structure": BEST_STRUCTURE[code],
+        "confidence_score": CONFIDENCE[code],
+    }
+
+def structure_dimensions(daily_runoff, peak_runoff, soil_infiltration, groundwater_depth) -> dict:
+    daily_runoff = np.asarray(daily_runoff, dtype=np.float64)
+    peak_runoff = np.asarray(peak_runoff, dtype=np.float64)
+    groundwater_depth = np.asarray(groundwater_depth, dtype=np.float64)
+    infiltration_volume_per_hour = np.asarray(soil_infiltration, dtype=np.float64) / 1000
+    peak_m3 = peak_runoff / 1000
+    daily_m3 = daily_runoff / 1000
+    n = len(daily_runoff)
+    # Filled structure-major, one contiguous row per STRUCTURE_TYPES entry, so
+    # every ufunc runs over all sites at once; callers get (sites, 4) views.
+    # Rows not yet filled double as scratch for the pit.
+    raw_volume = np.empty((4, n))
+    storage_m3 = infiltration_volume_per_hour * REQUIRED_STORAGE_HOURS
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pit_volume = np.multiply(storage_m3, 4, out=raw_volume[PIT])
+        np.subtract(peak_m3, pit_volume, out=pit_volume)
+        np.maximum(pit_volume, np.multiply(daily_m3, 0.3, out=raw_volume[SHAFT]), out=pit_volume)
+        pit_side = pit_volume / 2.5
+        np.sqrt(pit_side, out=pit_side)
+        np.minimum(3.5, pit_side, out=pit_side)
+        np.maximum(1.5, pit_side, out=pit_side)
+        pit_area = np.multiply(pit_side, pit_side, out=raw_volume[TRENCH])
+        pit_depth = pit_volume / pit_area
+        np.maximum(2.0, pit_depth, out=pit_depth)
+        np.minimum(np.subtract(groundwater_depth, 1, out=raw_volume[WELL]), pit_depth, out=pit_depth)
+        np.multiply(pit_area, pit_depth, out=raw_volume[PIT])
+
+        trench_depth = groundwater_depth * 0.8
+        np.minimum(trench_depth, 3.0, out=trench_depth)
+        trench_length = peak_m3 / storage_m3
+        trench_length /= 1.5
+        np.minimum(trench_length, 50.0, out=trench_length)
+        np.maximum(5.0, trench_length, out=trench_length)
+        np.multiply(1.5, trench_depth, out=raw_volume[TRENCH])
+        raw_volume[TRENCH] *= trench_length
+
+        shaft_depth = groundwater_depth - 2
+        np.minimum(shaft_depth, 25.0, out=shaft_depth)
+        shaft_diameter = infiltration_volume_per_hour * 24
+        np.divide(daily_m3, shaft_diameter, out=shaft_diameter)
+        shaft_diameter *= 4
+        shaft_diameter /= np.pi
+        np.sqrt(shaft_diameter, out=shaft_diameter)
+        np.minimum(2.0, shaft_diameter, out=shaft_diameter)
+        np.maximum(1.0, shaft_diameter, out=shaft_diameter)
+        np.divide(shaft_diameter, 2, out=raw_volume[SHAFT])
+        np.square(raw_volume[SHAFT], out=raw_volume[SHAFT])
+        np.multiply(np.pi, raw_volume[SHAFT], out=raw_volume[SHAFT])
+        raw_volume[SHAFT] *= shaft_depth
+
+    well_depth = groundwater_depth + 10
+    np.minimum(well_depth, 40.0, out=well_depth)
+    np.multiply(np.pi * (0.2 / 2) ** 2, well_depth, out=raw_volume[WELL])
+
+    return {
+        "volume_m3": round_like_python(raw_volume, 2).T,
+        "pit": {"side_length": pit_side, "depth": pit_depth},
+        "trench": {"width": np.broadcast_to(1.5, n), "depth": trench_depth, "length": trench_length},
+        "shaft": {"diameter": shaft_diameter, "depth": shaft_depth},
+        "well": {"diameter": np.broadcast_to(0.2, n), "depth": well_depth},
+    }
+
+def format_dimensions(dimensions: dict, structure: int, i: int) -> str:
+    if structure == PIT:
+        side, depth = dimensions["pit"]["side_length"][i], dimensions["pit"]["depth"][i]
+        return f"{side:.1f}m × {side:.1f}m × {depth:.1f}m"
+    if structure == TRENCH:
+        trench = dimensions["trench"]
+        return f"{trench['width'][i]:.1f}m width × {trench['depth'][i]:.1f}m depth × {trench['length'][i]:.1f}m length"
+    key = "shaft" if structure == SHAFT else "well"
+    return f"{dimensions[key]['diameter'][i]:.1f}m diameter × {dimensions[key]['depth'][i]:.1f}m depth"
+
+def cost_breakdown(volume_m3) -> dict:
+    volume_m3 = np.asarray(volume_m3, dtype=np.float64)
+    variable = [volume_m3 * COST_RATES[:, k] for k in range(3)]
+    fixed = [np.broadcast_to(FIXED_COSTS[:, k], volume_m3.shape) for k in range(3)]
+    miscellaneous = np.trunc((variable[0] + variable[1] + variable[2]) * MISC_RATES)
+    return dict(zip(COST_COMPONENTS, variable + fixed + [miscellaneous]))
+
+def _by_structure(values) -> np.ndarray:
+    # Views (..., 4) arrays structure-major. The transposed arrays design_sites
+    # returns come back contiguous, so each rate multiplies one long row.
+    return np.moveaxis(values, -1, 0) if np.ndim(values) else values
+
+def _per_structure(rates, ndim: int) -> np.ndarray:
+    return rates.reshape((len(rates),) + (1,) * (ndim - 1))
+
+def structure_costs(volume_m3, location_factor=1.0) -> dict:
+    # The per-component breakdown and the cost per m³ are only built on request
+    # (cost_breakdown, cost_per_m3); totals are accumulated in place in the
+    # scalar function's summation order.
+    volume_m3 = np.asarray(volume_m3, dtype=np.float64)
+    location_multiplier = np.maximum(0.85, np.minimum(1.35, np.asarray(location_factor, dtype=np.float64)))
+    if location_multiplier.ndim == 1:
+        location_multiplier = location_multiplier[:, None]
+        volume_m3 = np.broadcast_to(volume_m3, np.broadcast_shapes(volume_m3.shape, location_multiplier.shape))
+    volume = _by_structure(volume_m3)
+    # Float rates keep every ufunc on its unbuffered float64 loop; the integer
+    # rates are cast to float64 for the arithmetic either way
+    rates = [_per_structure(COST_RATES[:, k].astype(np.float64), volume.ndim) for k in range(3)]
+    fixed = [_per_structure(FIXED_COSTS[:, k].astype(np.float64), volume.ndim) for k in range(3)]
+
+    base_total = volume * rates[0]
+    scratch = volume * rates[1]
+    base_total += scratch
+    np.multiply(volume, rates[2], out=scratch)
+    base_total += scratch
+    np.multiply(base_total, _per_structure(MISC_RATES, volume.ndim), out=scratch)
+    np.trunc(scratch, out=scratch)
+    base_total += fixed[0]
+    base_total += fixed[1]
+    base_total += fixed[2]
+    base_total += scratch
+    base_total *= _by_structure(location_multiplier)
+    # The integer totals take over the scratch buffer; the cast truncates like int()
+    total_cost = scratch.view(np.int64)
+    np.copyto(total_cost, base_total, casting="unsafe")
+
+    return {
+        "total_cost": np.moveaxis(total_cost, 0, -1),
+        "location_factor_applied": np.broadcast_to(location_multiplier, volume_m3.shape),
+    }
+
+def cost_per_m3(total_cost, volume_m3) -> np.ndarray:
+    volume_m3 = np.asarray(volume_m3, dtype=np.float64)
+    per_m3 = np.zeros(np.broadcast_shapes(np.shape(total_cost), volume_m3.shape))
+    np.divide(total_cost, volume_m3, out=per_m3, where=volume_m3 > 0)
+    return per_m3.astype(np.int64)
+
+def government_subsidy(total_cost) -> np.ndarray:
+    total_cost = _by_structure(np.asarray(total_cost))
+    # astype truncates toward zero, like int() in the scalar function
+    subsidy = (total_cost * _per_structure(SUBSIDY_RATES, total_cost.ndim)).astype(np.int64)
+    return np.moveaxis(np.minimum(subsidy, _per_structure(MAX_SUBSIDIES, total_cost.ndim), out=subsidy), 0, -1)
+
+def aquifer_characteristics(groundwater_depth) -> dict:
+    groundwater_depth = np.asarray(groundwater_depth, dtype=np.float64)
+    band = (groundwater_depth >= 5).astype(np.int8)
+    band += groundwater_depth >= 15
+    band += groundwater_depth >= 30
+    return {
+        "band": band,
+        "porosity": np.array([0.25, 0.35, 0.4, 0.3])[band],
+        "recharge_efficiency": np.array([0.8, 0.7, 0.6, 0.5])[band],
+    }
+
+def _borewell_savings(groundwater_depth) -> tuple:
+    power_consumption_kwh_per_hour = np.where(groundwater_depth > 15, 3, 1) * 0.746
+    hours_without = np.where(groundwater_depth > 10, 8, 5)
+    hours_with = hours_without * 0.7
+    monthly_power_savings = (hours_without - hours_with) * power_consumption_kwh_per_hour * 7.5
+    electricity = np.trunc(monthly_power_savings * 12).astype(np.int64)
+
+    maintenance_without = np.where(groundwater_depth > 15, 8000, 5000)
+    maintenance = np.trunc(maintenance_without - maintenance_without * 0.75).astype(np.int64)
+    return electricity, maintenance
+
+# Borewell savings only change at 10 m and 15 m, so they are worked out once
+# for a depth in each band and looked up by categorize(depth, 10, 15)
+BOREWELL_ELECTRICITY_SAVINGS, BOREWELL_MAINTENANCE_SAVINGS = _borewell_savings(np.array([5.0, 12.0, 20.0]))
+
+def rwh_savings(runoff_liters, groundwater_depth, roof_area_sqm, location: str = "bengaluru") -> dict:
+    runoff_liters = np.asarray(runoff_liters)
+    roof_area_sqm = np.asarray(roof_area_sqm, dtype=np.float64)
+
+    depth_band = categorize(groundwater_depth, 10, 15)
+    electricity = BOREWELL_ELECTRICITY_SAVINGS[depth_band]
+    maintenance = BOREWELL_MAINTENANCE_SAVINGS[depth_band]
+
+    emergency_purchases = 4 if location.lower() in ['bengaluru', 'chennai'] else 2
+    tanker = int(emergency_purchases * 5000 * 150 / 1000)
+
+    # Each step truncates in place, as int() does in the scalar function
+    scratch = runoff_liters * 0.6
+    effective_recharge = np.trunc(scratch, out=scratch).astype(np.int64)
+    np.multiply(effective_recharge, 0.05, out=scratch)
+    environmental = np.trunc(scratch, out=scratch).astype(np.int64)
+
+    np.multiply(roof_area_sqm, 4000, out=scratch)
+    scratch *= 0.02
+    np.trunc(scratch, out=scratch)
+    scratch *= 0.08
+    property_benefit = np.trunc(scratch, out=scratch).astype(np.int64)
+
+    rebate = 2000 if location.lower() == 'bengaluru' else 1500 if location.lower() == 'chennai' else 0
+    total = electricity + maintenance
+    total += tanker
+    total += environmental
+    total += property_benefit
+    total += rebate
+
+    np.divide(total, 12, out=scratch)
+    return {
+        "borewell_electricity_savings": electricity,
+        "borewell_maintenance_savings": maintenance,
+        "emergency_water_savings": np.broadcast_to(tanker, total.shape),
+        "environmental_recharge_value": environmental,
+        "property_value_benefit": property_benefit,
+        "government_rebates": np.broadcast_to(rebate, total.shape),
+        "total_annual_savings": total,
+        "effective_recharge_liters": effective_recharge,
+        "monthly_average_savings": np.trunc(scratch, out=scratch).astype(np.int64),
+    }
+
+def payback_years(net_investment, annual_savings) -> np.ndarray:
+    annual_savings = np.asarray(annual_savings)
+    positive = annual_savings > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        years = round_like_python(np.asarray(net_investment) / np.where(positive, annual_savings, 1), 1)
+    if not positive.all():
+        years[~np.broadcast_to(positive, years.shape)] = np.inf
+    return years
+
+def design_sites(roof_area_sqm, groundwater_depth, soil_infiltration, runoff_liters, location_factor=1.0) -> dict:
+    roof_area_sqm = np.atleast_1d(np.asarray(roof_area_sqm, dtype=np.float64))
+    groundwater_depth = np.atleast_1d(np.asarray(groundwater_depth, dtype=np.float64))
+    soil_infiltration = np.atleast_1d(np.asarray(soil_infiltration, dtype=np.float64))
+    runoff_liters = np.atleast_1d(np.asarray(runoff_liters))
+    location_factor = np.broadcast_to(np.asarray(location_factor, dtype=np.float64), roof_area_sqm.shape)
+
+    daily_runoff = runoff_liters / 365
+    peak_runoff = daily_runoff * 2.5
+
+    evaluation = evaluate_sites(roof_area_sqm, groundwater_depth, soil_infiltration, daily_runoff)
+    dimensions = structure_dimensions(daily_runoff, peak_runoff, soil_infiltration, groundwater_depth)
+    volume_m3 = dimensions["volume_m3"]
+    aquifer = aquifer_characteristics(groundwater_depth)
+    capacity = volume_m3 * aquifer["porosity"][:, None]
+    capacity *= 1000
+    capacity *= aquifer["recharge_efficiency"][:, None]
+    capacity_liters = np.trunc(capacity, out=capacity).astype(np.int64)
+    costs = structure_costs(volume_m3, location_factor)
+    subsidy = government_subsidy(costs["total_cost"])
+    savings = rwh_savings(runoff_liters, groundwater_depth, roof_area_sqm)
+    net_investment = costs["total_cost"] - subsidy
+
+    return {
+        "daily_runoff": daily_runoff,
+        "peak_runoff": peak_runoff,
+        "evaluation": evaluation,
+        "dimensions": dimensions,
+        "volume_m3": volume_m3,
+        "aquifer": aquifer,
+        "capacity_liters": capacity_liters,
+        "costs": costs,
+        "subsidy": subsidy,
+        "net_investment": net_investment,
+        "savings": savings,
+        "payback_years": payback_years(net_investment, savings["total_annual_savings"][:, None]),
+    }
+
+def pareto_front(cost, capacity) -> np.ndarray:
+    # A structure is on the frontier unless another one at the same site costs
+    # no more and recharges no less, and is strictly better on one of the two
+    cost = np.asarray(cost)[..., None, :]
+    capacity = np.asarray(capacity)[..., None, :]
+    other_cost = np.swapaxes(cost, -1, -2)
+    other_capacity = np.swapaxes(capacity, -1, -2)
+    dominates = (other_cost <= cost) & (other_capacity >= capacity) & ((other_cost < cost) | (other_capacity > capacity))
+    return ~dominates.any(axis=-2)
@@ -0,0 +1,10 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tests never touch the on-disk caches next to the app or the OpenAI API
+os.environ.setdefault("OPENAI_API_KEY", "not-used")
+os.environ["CLIMATE_CACHE_PATH"] = ""
+os.environ["REPORT_CACHE_PATH"] = ""
+os.environ.setdefault("HTTP_MAX_RETRIES", "0")
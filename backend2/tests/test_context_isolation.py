@@ -0,0 +1,97 @@
+import random
+import asyncio
+import pytest
+
+import main
+import climate
+import climate_store
+import gwl_inference
+
+# Many tool sequences run concurrently in one event loop, with random pauses
+# between steps the way agent LLM round trips interleave them; every final
+# report must only contain its own request's data.
+
+REQUESTS = 120
+MAX_PAUSE_SECONDS = 0.01
+
+def site(index: int) -> tuple:
+    return 12.5 + (index % 40) * 0.05, 77.0 + (index // 40) * 0.05, 50.0 + index
+
+@pytest.fixture
+def distinct_rainfall(monkeypatch):
+    # A fresh in-memory climate cache where every cell has its own rainfall,
+    # so a report that mixes data from another request is detectable
+    cache = climate.ClimateCache(db_path="")
+    monkeypatch.setattr(climate, "climate_cache", cache)
+    monkeypatch.setattr(climate, "climate_series", climate.ClimateSeriesCache(db_path=""))
+    monkeypatch.setattr(climate_store, "_store", None)
+    monkeypatch.setattr(climate_store, "_store_checked", True)
+    for index in range(REQUESTS):
+        latitude, longitude, _ = site(index)
+        cache.put(latitude, longitude, {"annual_rainfall_mm": 600 + index * 7, "average_temperature_celsius": 27.0})
+    gwl_inference.load_gwl_models()
+
+async def run_tools(index: int) -> list:
+    latitude, longitude, roof_area = site(index)
+    main.new_agent_data_store()
+    env = await main.get_hydrogeological_data(latitude, longitude)
+    await asyncio.sleep(random.uniform(0, MAX_PAUSE_SECONDS))
+    harvest = await main.calculate_harvesting_potential(roof_area, env["annual_rainfall_mm"])
+    await asyncio.sleep(random.uniform(0, MAX_PAUSE_SECONDS))
+    structure = await main.recommend_recharge_structure(roof_area, env["groundwater_depth_meters"], harvest["runoff_liters"], latitude, longitude)
+    await asyncio.sleep(random.uniform(0, MAX_PAUSE_SECONDS))
+    report = await main.format_final_report(f"request-{index}", structure["annual_savings_inr"], structure["payback_period_years"])
+
+    errors = []
+    if env["annual_rainfall_mm"] != 600 + index * 7:
+        errors.append(f"request {index}: rainfall of another cell")
+    if report["environmental_data"]["runoff_liters"] != int(roof_area * env["annual_rainfall_mm"] * 0.85):
+        errors.append(f"request {index}: runoff from another request")
+    if report["environmental_data"]["annual_rainfall_mm"] != env["annual_rainfall_mm"]:
+        errors.append(f"request {index}: rainfall from another request")
+    if report["structure_data"].get("annual_savings_inr") != structure["annual_savings_inr"]:
+        errors.append(f"request {index}: structure data from another request")
+    return errors
+
+async def run_pipeline(index: int) -> list:
+    latitude, longitude, roof_area = site(index)
+    report = await main.run_recommendation_pipeline(latitude, longitude, roof_area)
+    rainfall = report["environmental_data"]["annual_rainfall_mm"]
+    if rainfall != 600 + index * 7 or report["environmental_data"]["runoff_liters"] != int(roof_area * rainfall * 0.85):
+        return [f"pipeline {index}: report mixed with another request"]
+    return []
+
+def test_concurrent_reports_keep_their_own_data(distinct_rainfall):
+    async def run_all():
+        results = await asyncio.gather(
+            *(run_tools(i) for i in range(REQUESTS)),
+            *(run_pipeline(i) for i in range(REQUESTS)),
+        )
+        return [error for errors in results for error in errors]
+
+    errors = asyncio.run(run_all())
+    assert not errors, f"{len(errors)} reports mixed data across requests: {errors[:10]}"
+
+def test_agent_lookup_reuses_the_endpoint_prefetch(distinct_rainfall, monkeypatch):
+    # The combined endpoint prefetches with the caller's district; the agent's
+    # tool call for the same point passes none and must not compute again
+    calls = []
+    compute = main.compute_hydrogeological_data
+
+    async def counting_compute(latitude, longitude, district=None):
+        calls.append(district)
+        return await compute(latitude, longitude, district)
+
+    monkeypatch.setattr(main, "compute_hydrogeological_data", counting_compute)
+    latitude, longitude, _ = site(0)
+
+    async def request():
+        main.new_agent_data_store()
+        prefetch = main.prefetch_hydrogeological_data(latitude, longitude, "Bengaluru Urban")
+        env = await main.get_hydrogeological_data(latitude, longitude)
+        return (await prefetch)["groundwater_depth_meters"], env, main.get_agent_data_store()["environmental_data"]
+
+    prefetched_depth, env, stored = asyncio.run(request())
+    assert calls == ["Bengaluru Urban"]
+    assert env["district"] == "Bengaluru Urban" and env["groundwater_depth_meters"] == prefetched_depth
+    assert stored is env
@@ -0,0 +1,36 @@
+import asyncio
+
+import gwl_inference
+from gwl_batcher import GWLMicroBatcher
+
+def test_process_workers_report_rows_served_to_the_parent():
+    batcher = GWLMicroBatcher(executor_kind="process", workers=1, window_ms=5)
+    before = dict(gwl_inference.gwl_stats)
+
+    async def predict_all():
+        return await asyncio.gather(*(batcher.predict("Bengaluru Urban", 12.9 + i * 0.01, 77.5) for i in range(8)))
+
+    try:
+        predictions = asyncio.run(predict_all())
+    finally:
+        batcher.shutdown()
+    served = sum(gwl_inference.gwl_stats.values()) - sum(before.values())
+    assert len(predictions) == 8
+    assert served == 8
+
+def test_process_workers_report_batch_rows_and_model_state():
+    # run() serves /predict-gwl/batch and /bulk/screen outside the micro-batches
+    batcher = GWLMicroBatcher(executor_kind="process", workers=1)
+    before = sum(gwl_inference.gwl_stats.values())
+
+    async def predict_batch():
+        return await batcher.run(gwl_inference.predict_gwl_batch, ["Bengaluru Urban"] * 5, [12.9 + i * 0.01 for i in range(5)], [77.5] * 5)
+
+    assert not batcher.models_loaded()
+    try:
+        predictions = asyncio.run(predict_batch())
+    finally:
+        batcher.shutdown()
+    assert len(predictions) == 5
+    assert sum(gwl_inference.gwl_stats.values()) - before == 5
+    assert batcher.models_loaded() == gwl_inference.load_gwl_models()
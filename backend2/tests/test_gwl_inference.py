@@ -0,0 +1,21 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import gwl_inference
+
+def test_concurrent_first_predictions_wait_for_the_load(monkeypatch):
+    # A slow model load: callers arriving while it runs must get the model,
+    # not the latitude fallback
+    for name in ("gwl_scorer", "gwl_preprocessor", "gwl_model"):
+        monkeypatch.setattr(gwl_inference, name, None)
+    monkeypatch.setattr(gwl_inference, "_load_attempted", False)
+    load = gwl_inference.GWLScorer.load.__func__
+
+    def slow_load(cls, path):
+        time.sleep(0.2)
+        return load(cls, path)
+
+    monkeypatch.setattr(gwl_inference.GWLScorer, "load", classmethod(slow_load))
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        loaded = [future.result() for future in [pool.submit(gwl_inference.ensure_gwl_models) for _ in range(4)]]
+    assert loaded == [True] * 4
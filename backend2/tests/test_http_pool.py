@@ -0,0 +1,59 @@
+import time
+import asyncio
+import httpx
+
+from http_pool import PooledHTTPClient, retry_after_seconds
+
+def client_with(handler, **options) -> PooledHTTPClient:
+    client = PooledHTTPClient(**options)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+def test_retry_after_is_read_as_seconds_or_a_date():
+    assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": "2"})) == 2.0
+    date = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 60))
+    assert 55 < retry_after_seconds(httpx.Response(429, headers={"Retry-After": date})) <= 60
+    assert retry_after_seconds(httpx.Response(429)) is None
+    assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": "soon"})) is None
+
+def test_rate_limited_request_waits_for_retry_after(monkeypatch):
+    sleeps = []
+
+    async def record_sleep(seconds):
+        sleeps.append(seconds)
+    monkeypatch.setattr(asyncio, "sleep", record_sleep)
+    responses = iter([httpx.Response(429, headers={"Retry-After": "3"}), httpx.Response(200)])
+    client = client_with(lambda request: next(responses), max_retries=2)
+
+    assert asyncio.run(client.get("http://upstream.test/archive")).status_code == 200
+    assert sleeps == [3.0]
+
+def test_retry_after_beyond_the_limit_returns_the_response():
+    client = client_with(lambda request: httpx.Response(429, headers={"Retry-After": "3600"}), max_retries=2)
+    assert asyncio.run(client.get("http://upstream.test/archive")).status_code == 429
+    assert client.stats["attempts"] == 1
+
+def test_cancelled_hedged_request_releases_its_attempts():
+    started = []
+
+    async def slow(request):
+        started.append(request)
+        await asyncio.sleep(10)
+        return httpx.Response(200)
+
+    async def cancel_midway():
+        client = client_with(slow, hedge_enabled=True, per_host_concurrency=2)
+        client._latencies.extend([0.001] * 50)
+        with_timeout = asyncio.wait_for(client.get("http://upstream.test/archive"), timeout=0.05)
+        try:
+            await with_timeout
+        except asyncio.TimeoutError:
+            pass
+        await asyncio.sleep(0.01)
+        semaphore = client._semaphore_for("http://upstream.test/archive")
+        return len(started), semaphore._value, [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+    attempts, free_slots, leftover = asyncio.run(cancel_midway())
+    assert attempts == 2
+    assert free_slots == 2
+    assert leftover == []
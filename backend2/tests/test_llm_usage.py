@@ -0,0 +1,25 @@
+from types import SimpleNamespace
+
+from agent import response_usage
+
+def generation(message):
+    return SimpleNamespace(message=message)
+
+def test_usage_of_a_plain_completion_comes_from_llm_output():
+    response = SimpleNamespace(
+        llm_output={"token_usage": {"prompt_tokens": 120, "completion_tokens": 30}, "model_name": "gpt-4o"},
+        generations=[[generation(SimpleNamespace())]],
+    )
+    assert response_usage(response) == {"prompt_tokens": 120, "completion_tokens": 30, "model": "gpt-4o"}
+
+def test_usage_of_a_streamed_completion_comes_from_the_message():
+    message = SimpleNamespace(
+        usage_metadata={"input_tokens": 562, "output_tokens": 51, "total_tokens": 613},
+        response_metadata={"model_name": "gpt-4o-2024-05-13"},
+    )
+    response = SimpleNamespace(llm_output=None, generations=[[generation(message)]])
+    assert response_usage(response) == {"prompt_tokens": 562, "completion_tokens": 51, "model": "gpt-4o-2024-05-13"}
+
+def test_stream_without_usage_counts_nothing():
+    response = SimpleNamespace(llm_output=None, generations=[[generation(SimpleNamespace(content="text"))]])
+    assert response_usage(response) == {"prompt_tokens": 0, "completion_tokens": 0, "model": "unknown"}
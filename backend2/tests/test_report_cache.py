@@ -0,0 +1,59 @@
+import asyncio
+
+import main
+import agent
+from report_cache import normalize_agent_input, report_key
+from timing import StageTimer
+
+PROMPT = "Recommend a structure at latitude 12.9716, longitude 77.5946, with an area of 120 square meters and district Bengaluru Urban."
+
+def test_same_site_written_differently_shares_a_key():
+    variant = PROMPT.replace("120", "120.0").replace("Bengaluru Urban", "bengaluru  urban").upper()
+    assert report_key(variant, "v1") == report_key(PROMPT, "v1")
+
+def test_text_after_the_district_is_part_of_the_key():
+    longer = PROMPT + " My budget is 5000 rupees, so only the cheapest option."
+    assert normalize_agent_input(longer)["district"] == "bengaluru urban"
+    assert report_key(longer, "v1") != report_key(PROMPT, "v1")
+
+def test_district_is_read_anywhere_in_the_prompt():
+    fields = normalize_agent_input("District Pune, latitude 18.5 longitude 73.8 area 80. Prefer a pit.")
+    assert fields["district"] == "pune"
+    assert fields["text"] == "district {district}, latitude {latitude} longitude {longitude} area {area}. prefer a pit."
+
+def test_unparsed_prompts_key_on_the_whole_text():
+    assert normalize_agent_input("What   is a Recharge pit?") == {"text": "what is a recharge pit?"}
+    assert report_key(PROMPT, "v1") != report_key(PROMPT, "v2")
+
+class SlowAgent:
+    # Stands in for the agent executor: one LLM step of 100 prompt tokens
+    def __init__(self):
+        self.runs = 0
+
+    async def ainvoke(self, inputs, config):
+        self.runs += 1
+        await asyncio.sleep(0.05)
+        for handler in config["callbacks"]:
+            if isinstance(handler, agent.TokenUsageHandler):
+                handler.report["llm_calls"] += 1
+                handler.report["prompt_tokens"] += 100
+        return {"output": "no report", "intermediate_steps": []}
+
+def test_joined_runs_record_their_wait_and_the_shared_usage(monkeypatch):
+    slow_agent = SlowAgent()
+    monkeypatch.setattr(main, "agent_executor", slow_agent)
+
+    async def request():
+        main.new_agent_data_store()
+        timer = StageTimer()
+        result = await main.run_agent_report(PROMPT + " Joined runs.", timer=timer)
+        return result["token_report"], [name for name, _, _ in timer.spans]
+
+    async def run_both():
+        return await asyncio.gather(request(), request())
+
+    (leader_report, leader_spans), (follower_report, follower_spans) = asyncio.run(run_both())
+    assert slow_agent.runs == 1
+    assert not leader_report["coalesced"] and "agent.report_flight_wait" not in leader_spans
+    assert follower_report["coalesced"] and follower_spans == ["agent.report_flight_wait"]
+    assert follower_report["prompt_tokens"] == leader_report["prompt_tokens"] == 100
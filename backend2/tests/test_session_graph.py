@@ -0,0 +1,37 @@
+import session_graph
+from session_graph import ComputationGraph, SessionStore
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_reading_a_session_keeps_it_alive(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_graph.time, "monotonic", clock)
+    store = SessionStore(max_entries=10, ttl_seconds=60)
+    first = store.create(ComputationGraph([]), {})
+    clock.now += 30
+    second = store.create(ComputationGraph([]), {})
+
+    clock.now += 20
+    assert store.get(first.id) is first
+    # 70 s after it was created but 50 s after it was last read
+    clock.now += 20
+    assert store.get(first.id) is first
+    # second was created 60 s ago and never read
+    clock.now += 20
+    assert store.get(second.id) is None
+    assert store.get(first.id) is first
+    assert store.stats["expired"] == 1
+
+def test_least_recently_read_session_is_evicted_first():
+    store = SessionStore(max_entries=2, ttl_seconds=3600)
+    first = store.create(ComputationGraph([]), {})
+    second = store.create(ComputationGraph([]), {})
+    store.get(first.id)
+    store.create(ComputationGraph([]), {})
+    assert store.get(second.id) is None
+    assert store.get(first.id) is first
@@ -0,0 +1,24 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import size_optimizer
+from size_optimizer import SizeOptimizer
+
+def test_concurrent_searches_keep_the_lru_consistent(monkeypatch):
+    def slow_search(precipitation, roof_area_sqm, *args):
+        time.sleep(0.001)
+        return {"roof_area_sqm": roof_area_sqm}
+    monkeypatch.setattr(size_optimizer, "optimize_site", slow_search)
+    optimizer = SizeOptimizer(max_entries=8, steps=4)
+
+    def search(i):
+        area = float(i % 20)
+        return area, optimizer.optimize("cell", None, area, 10.0, 12.0, 1.0)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(search, range(400)))
+
+    assert all(result["roof_area_sqm"] == area for area, result in results)
+    stats = optimizer.get_stats()
+    assert stats["hits"] + stats["misses"] == 400
+    assert stats["entries"] <= 8
@@ -0,0 +1,41 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+from spatial_index import SpatialIndex
+
+# The if/elif chains the index replaced live in the benchmark as the reference.
+# Import the module rather than its names, or pytest collects test_points.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+import spatial_index_bench
+
+@pytest.mark.parametrize("cell_deg", [0.1, 0.5, 3.0])
+def test_single_lookups_match_batch_lookups(cell_deg):
+    # Every box edge exactly and one ulp either side, plus off-grid points,
+    # where precomputed cells and edge-cell clamping could go wrong
+    index = SpatialIndex.load(cell_deg=cell_deg)
+    for name, layer in index.layers.items():
+        lats = np.array(sorted({v for v in np.concatenate([layer.min_lat, layer.max_lat]) if np.isfinite(v)} | {5.0, 36.0}))
+        lons = np.array(sorted({v for v in np.concatenate([layer.min_lon, layer.max_lon]) if np.isfinite(v)} | {66.0, 99.0}))
+        widen = lambda values: np.unique(np.concatenate([np.nextafter(values, -np.inf), values, np.nextafter(values, np.inf)]))
+        lat_grid, lon_grid = np.meshgrid(widen(lats), widen(lons), indexing="ij")
+        latitudes, longitudes = lat_grid.ravel(), lon_grid.ravel()
+        batch = index.lookup_many(name, latitudes, longitudes).tolist()
+        single = [index.lookup(name, lat, lon) for lat, lon in zip(latitudes.tolist(), longitudes.tolist())]
+        assert single == batch, name
+
+@pytest.mark.parametrize("cell_deg", [0.1, 0.5, 3.0])
+def test_lookups_match_the_legacy_chains(cell_deg):
+    # A seeded sample over and around India, every bbox edge exactly and one ulp
+    # either side, and off-grid and invalid points
+    index = SpatialIndex.load(cell_deg=cell_deg)
+    latitudes, longitudes = spatial_index_bench.test_points(index, 2000, seed=0)
+    for name, result in spatial_index_bench.check_equivalence(index, latitudes, longitudes).items():
+        assert result["mismatches"] == 0, (name, result["examples"])
+
+def test_invalid_coordinates_fall_back_to_open_bounds():
+    index = SpatialIndex.load()
+    for name in index.layers:
+        assert index.lookup(name, float("nan"), 77.5) == index.lookup_many(name, [np.nan], [77.5])[0]
+        assert index.lookup(name, 12.97, float("inf")) == index.lookup_many(name, [12.97], [np.inf])[0]
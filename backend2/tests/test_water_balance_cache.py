@@ -0,0 +1,43 @@
+import asyncio
+import numpy as np
+import pytest
+
+import main
+import climate
+import climate_store
+
+@pytest.fixture
+def empty_climate(monkeypatch):
+    series = climate.ClimateSeriesCache(db_path="")
+    monkeypatch.setattr(climate, "climate_series", series)
+    monkeypatch.setattr(climate_store, "_store", None)
+    monkeypatch.setattr(climate_store, "_store_checked", True)
+
+    fetched = []
+
+    async def record_fetch(latitude, longitude):
+        fetched.append((latitude, longitude))
+        raise ConnectionError("no network in tests")
+    monkeypatch.setattr(climate, "fetch_archive", record_fetch)
+    return series, fetched
+
+def recommend(**options):
+    main.new_agent_data_store()
+    return asyncio.run(main.recommend_recharge_structure(120.0, 12.0, 100000, 12.97, 77.59, **options))
+
+def test_recommendation_without_a_cached_series_skips_the_water_balance(empty_climate):
+    _, fetched = empty_climate
+    assert "water_balance" not in recommend()
+    assert fetched == []
+
+def test_size_optimization_may_fetch_the_series(empty_climate):
+    _, fetched = empty_climate
+    assert recommend(optimize=True)["size_optimization"]["optimal"] is None
+    assert len(fetched) == 1
+
+def test_recommendation_uses_an_already_cached_series(empty_climate):
+    series, fetched = empty_climate
+    rng = np.random.default_rng(0)
+    series.put(12.97, 77.59, np.where(rng.random(3650) < 0.3, rng.gamma(0.7, 12.0, 3650), 0.0))
+    assert recommend()["water_balance"]["realised_recharge_liters_per_year"] > 0
+    assert fetched == []
@@ -0,0 +1,208 @@
+import os
+import time
+import functools
+import threading
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() in ("1", "true", "yes")
+# Seconds; spans range from sub-millisecond lookups to a multi-step agent run
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class StageTimer:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.spans = []
+        self._open = {}
+
+    def start(self, name: str, key=None):
+        self._open[key if key is not None else name] = (name, time.perf_counter())
+
+    def end(self, name: str = None, key=None):
+        opened = self._open.pop(key if key is not None else name, None)
+        if opened is not None:
+            self.spans.append((opened[0], opened[1] - self.origin, time.perf_counter() - self.origin))
+
+    def add(self, name: str, started: float, ended: float):
+        # A finished span measured elsewhere (perf_counter values); safe for
+        # concurrent spans with the same name, unlike start/end
+        self.spans.append((name, started - self.origin, ended - self.origin))
+
+    async def track(self, name: str, awaitable):
+        self.start(name)
+        try:
+            return await awaitable
+        finally:
+            self.end(name)
+
+    def critical_path(self) -> list:
+        # Only innermost spans count: "agent" is covered by its "agent.*" steps.
+        # Walk back from the span that finished last, each time taking the
+        # latest-finishing span that ended before the current one started.
+        parents = {name for name, _, _ in self.spans if any(other.startswith(name + ".") for other, _, _ in self.spans)}
+        leaves = [span for span in self.spans if span[0] not in parents]
+        if not leaves:
+            return []
+        remaining = sorted(leaves, key=lambda span: span[2])
+        path = [remaining.pop()]
+        while True:
+            before = [span for span in remaining if span[2] <= path[-1][1] + 1e-6]
+            if not before:
+                break
+            path.append(before[-1])
+            remaining = [span for span in remaining if span[2] < before[-1][1] + 1e-6]
+        return [span[0] for span in reversed(path)]
+
+    def summary(self) -> dict:
+        total = time.perf_counter() - self.origin
+        return {
+            "total_ms": round(total * 1000, 1),
+            "stages": [
+                {"stage": name, "start_ms": round(start * 1000, 1), "end_ms": round(end * 1000, 1), "duration_ms": round((end - start) * 1000, 1)}
+                for name, start, end in sorted(self.spans, key=lambda span: span[1])
+            ],
+            "critical_path": self.critical_path(),
+        }
+
+    def server_timing(self) -> str:
+        # Server-Timing header value: one entry per span name, durations summed
+        totals = {}
+        for name, start, end in self.spans:
+            totals[name] = totals.get(name, 0.0) + (end - start)
+        entries = [f"{name.replace('.', '-')};dur={ms * 1000:.1f}" for name, ms in totals.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.origin) * 1000:.1f}")
+        return ", ".join(entries)
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in labels) + "}"
+
+class MetricsRegistry:
+    # Histograms and counters in the Prometheus text exposition format. Spans
+    # finish on the event loop and in worker threads, so updates take a lock.
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+
+    def describe(self, name: str, kind: str, text: str):
+        self._help[name] = (kind, text)
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram["counts"][i] += 1
+                    break
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def render(self) -> str:
+        with self._lock:
+            histograms = {key: {**h, "counts": list(h["counts"])} for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+        lines = []
+        for name in sorted({key[0] for key in histograms} | {key[0] for key in counters}):
+            kind, text = self._help.get(name, ("histogram" if any(key[0] == name for key in histograms) else "counter", name))
+            lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"]
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram["counts"]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', repr(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+                lines.append(f"{name}_sum{format_labels(labels)} {histogram['sum']}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+metrics.describe("rwh_span_duration_seconds", "histogram", "Duration of instrumented stages (tools, archive fetch, GWL inference, LLM calls).")
+metrics.describe("rwh_http_request_duration_seconds", "histogram", "End-to-end request latency by route.")
+metrics.describe("rwh_llm_tokens_total", "counter", "Tokens reported by the LLM, by model and kind.")
+
+# The timer of the request being served, set by TimingMiddleware; spans
+# recorded anywhere below an endpoint end up in its Server-Timing header
+request_timer_var: ContextVar[StageTimer] = ContextVar("request_timer")
+
+def record_span(name: str, started: float, ended: float):
+    metrics.observe("rwh_span_duration_seconds", ended - started, span=name)
+    timer = request_timer_var.get(None)
+    if timer is not None:
+        timer.add(name, started, ended)
+
+@asynccontextmanager
+async def span(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, started, time.perf_counter())
+
+def timed(name: str):
+    # Decorator form of span() for coroutine functions
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            async with span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+class TimingMiddleware:
+    # Plain ASGI middleware so streaming responses pass straight through. The
+    # route label is the path template (e.g. /sessions/{session_id}), which the
+    # router writes into the shared scope once it has matched.
+    def __init__(self, app, server_timing: bool = SERVER_TIMING_ENABLED):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timer = StageTimer()
+        token = request_timer_var.set(timer)
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timer.server_timing().encode()))
+                    # Lets a dashboard on another origin read the entries
+                    headers.append((b"timing-allow-origin", b"*"))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_timer_var.reset(token)
+            route = scope.get("route")
+            metrics.observe(
+                "rwh_http_request_duration_seconds",
+                time.perf_counter() - timer.origin,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status["code"],
+            )
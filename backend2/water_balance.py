@@ -0,0 +1,167 @@
+import numpy as np
+from structure_engine import PIT, TRENCH, SHAFT, WELL
+
+RUNOFF_COEFFICIENT = 0.85
+WET_DAY_MM = 1.0
+STORM_PERCENTILES = (50, 90, 99)
+DAYS_PER_YEAR = 365.25
+SCAN_MAX_SCENARIOS = 16
+
+# Daily water balance of a recharge structure, replayed over a full rainfall
+# series. Each day the roof runoff enters storage, up to one day of
+# infiltration drains to the aquifer, and anything above capacity overflows:
+#
+#     s[t] = clip(s[t-1] + inflow[t] - drain, 0, capacity)
+#
+# The clip makes this a sequential recursion, but s -> clip(s + a, lo, hi) maps
+# compose into maps of the same form, so every day's storage comes out of one
+# prefix scan over the series in log2(days) array steps. Scenarios (sites,
+# structures, sizes) run side by side in the second axis.
+
+def scanned_storage(net_inflow: np.ndarray, capacity: np.ndarray) -> np.ndarray:
+    # net_inflow is (days, scenarios); returns end-of-day storage, starting empty.
+    # Element t holds the map for days (t - step, t]; each pass composes it with
+    # the map that ends where it starts, in place
+    shift = np.array(net_inflow, dtype=np.float64)
+    lo = np.zeros_like(shift)
+    hi = np.broadcast_to(np.asarray(capacity, dtype=np.float64), shift.shape).copy()
+    new_lo, new_hi = np.empty_like(shift), np.empty_like(shift)
+    n_days = len(shift)
+    step = 1
+    while step < n_days:
+        m = n_days - step
+        next_lo, next_hi = new_lo[:m], new_hi[:m]
+        np.add(lo[:-step], shift[step:], out=next_lo)
+        np.maximum(next_lo, lo[step:], out=next_lo)
+        np.add(hi[:-step], shift[step:], out=next_hi)
+        np.maximum(next_hi, lo[step:], out=next_hi)
+        np.minimum(next_hi, hi[step:], out=next_hi)
+        np.minimum(next_lo, next_hi, out=next_lo)
+        shift[step:] += shift[:-step]
+        lo[step:], hi[step:] = next_lo, next_hi
+        step *= 2
+    return np.minimum(np.maximum(shift, lo), hi)
+
+def scanned_totals(precipitation: np.ndarray, inflow_per_mm: np.ndarray, drain: np.ndarray, capacity: np.ndarray) -> dict:
+    inflow = precipitation * inflow_per_mm
+    storage = scanned_storage(inflow - drain, capacity)
+    previous = np.vstack([np.zeros((1, len(capacity))), storage[:-1]])
+    overflow = np.maximum(previous + inflow - drain - capacity, 0.0)
+    return {
+        "final_storage": storage[-1],
+        "overflow": overflow.sum(axis=0),
+        "overflow_days": (overflow > 1e-9).sum(axis=0),
+        "full_days": (storage >= capacity - 1e-9).sum(axis=0),
+    }
+
+def stepped_totals(precipitation: np.ndarray, inflow_per_mm: np.ndarray, drain: np.ndarray, capacity: np.ndarray) -> dict:
+    # Day by day across all scenarios, keeping only running totals. A day
+    # without rain in any scenario only drains, and a run of them collapses
+    # into one step: storage never exceeds capacity, so only the floor applies.
+    n = len(capacity)
+    level, overflow = np.zeros(n), np.zeros(n)
+    overflow_days, full_days = np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)
+    scratch, excess = np.empty(n), np.empty(n)
+    wet_days = np.flatnonzero((precipitation > 0).any(axis=1))
+    dry_before = np.diff(np.concatenate([[-1], wet_days, [len(precipitation)]])) - 1
+
+    def drain_for(days: int):
+        np.multiply(drain, days, out=scratch)
+        np.subtract(level, scratch, out=level)
+        np.maximum(level, 0.0, out=level)
+        # Storage only falls over the run, so if it is full now it was full throughout
+        np.add(full_days, days * (level >= capacity - 1e-9), out=full_days)
+
+    for day, dry in zip(wet_days.tolist(), dry_before.tolist()):
+        if dry:
+            drain_for(dry)
+        np.multiply(inflow_per_mm, precipitation[day], out=scratch)
+        level += scratch
+        level -= drain
+        np.subtract(level, capacity, out=excess)
+        np.maximum(excess, 0.0, out=excess)
+        overflow += excess
+        overflow_days += excess > 1e-9
+        np.maximum(level, 0.0, out=level)
+        np.minimum(level, capacity, out=level)
+        full_days += level >= capacity - 1e-9
+    if dry_before[-1]:
+        drain_for(int(dry_before[-1]))
+    return {"final_storage": level, "overflow": overflow, "overflow_days": overflow_days, "full_days": full_days}
+
+def simulate(precipitation_mm, roof_area_sqm, storage_m3, drain_m3_per_day, runoff_coefficient: float = RUNOFF_COEFFICIENT) -> dict:
+    # precipitation_mm: (days,) shared by every scenario, or (days, scenarios).
+    # The other arguments broadcast to the scenario shape, e.g. (sites, structures).
+    precipitation = np.nan_to_num(np.asarray(precipitation_mm, dtype=np.float64), nan=0.0)
+    roof_area_sqm, storage_m3, drain_m3_per_day = np.broadcast_arrays(
+        np.asarray(roof_area_sqm, dtype=np.float64),
+        np.asarray(storage_m3, dtype=np.float64),
+        np.asarray(drain_m3_per_day, dtype=np.float64),
+    )
+    shape = roof_area_sqm.shape
+    inflow_per_mm = roof_area_sqm.ravel() * (runoff_coefficient / 1000)
+    capacity, drain = storage_m3.ravel(), drain_m3_per_day.ravel()
+    if precipitation.ndim == 1:
+        precipitation = precipitation[:, None]
+    years = len(precipitation) / DAYS_PER_YEAR
+
+    # The scan needs a few (days, scenarios) arrays and log2(days) passes over
+    # them; past a couple of dozen scenarios the day loop is faster and keeps
+    # memory flat
+    if len(capacity) > SCAN_MAX_SCENARIOS:
+        totals = stepped_totals(precipitation, inflow_per_mm, drain, capacity)
+    else:
+        totals = scanned_totals(precipitation, inflow_per_mm, drain, capacity)
+
+    total_inflow = precipitation.sum(axis=0) * inflow_per_mm
+    # Whatever neither overflowed nor is still stored went into the ground
+    recharge = total_inflow - totals["overflow"] - totals["final_storage"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        capture_ratio = np.where(total_inflow > 0, recharge / total_inflow, 0.0)
+
+    per_scenario = {
+        "inflow_m3_per_year": total_inflow / years,
+        "recharge_m3_per_year": recharge / years,
+        "overflow_m3_per_year": totals["overflow"] / years,
+        "overflow_days_per_year": totals["overflow_days"] / years,
+        "full_days_per_year": totals["full_days"] / years,
+        "capture_ratio": capture_ratio,
+    }
+    result = {name: values.reshape(shape) for name, values in per_scenario.items()}
+    result["years"] = years
+    return result
+
+def storm_percentiles(precipitation_mm, percentiles=STORM_PERCENTILES, wet_day_mm: float = WET_DAY_MM) -> dict:
+    precipitation = np.asarray(precipitation_mm, dtype=np.float64)
+    precipitation = precipitation[~np.isnan(precipitation)]
+    wet = precipitation[precipitation >= wet_day_mm]
+    years = len(precipitation) / DAYS_PER_YEAR if len(precipitation) else 1.0
+    storms = {f"p{p}_mm": round(float(np.percentile(wet, p)), 1) if len(wet) else 0.0 for p in percentiles}
+    storms["max_mm"] = round(float(wet.max()), 1) if len(wet) else 0.0
+    storms["wet_days_per_year"] = round(len(wet) / years, 1)
+    return storms
+
+def infiltration_area_m2(dimensions: dict) -> np.ndarray:
+    # Wetted area through which each structure drains, from
+    # structure_engine.structure_dimensions: pit and trench floors, the shaft
+    # floor, and the screened wall of the injection well
+    pit, trench, shaft, well = dimensions["pit"], dimensions["trench"], dimensions["shaft"], dimensions["well"]
+    area = np.empty((len(pit["side_length"]), 4))
+    area[:, PIT] = pit["side_length"] ** 2
+    area[:, TRENCH] = trench["width"] * trench["length"]
+    area[:, SHAFT] = np.pi * (shaft["diameter"] / 2) ** 2
+    area[:, WELL] = np.pi * well["diameter"] * well["depth"]
+    return np.maximum(area, 0.0)
+
+def design_drain_m3_per_day(design: dict, soil_infiltration) -> np.ndarray:
+    # (sites, structures) daily infiltration of every structure in design_sites(...)
+    soil_infiltration = np.atleast_1d(np.asarray(soil_infiltration, dtype=np.float64))[:, None]
+    return infiltration_area_m2(design["dimensions"]) * soil_infiltration * 24 / 1000
+
+def simulate_designs(precipitation_mm, roof_area_sqm, design: dict, soil_infiltration) -> dict:
+    # All four structures of design_sites(...) for sites that share one rainfall series
+    roof_area_sqm = np.atleast_1d(np.asarray(roof_area_sqm, dtype=np.float64))[:, None]
+    drain = design_drain_m3_per_day(design, soil_infiltration)
+    result = simulate(precipitation_mm, roof_area_sqm, design["capacity_liters"] / 1000, drain)
+    result["drain_m3_per_day"] = drain
+    return result